@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Announcement, RegistrationRequest, Event
+from .models import Announcement, RegistrationRequest, Event, Job, AIResult, ProgressSnapshot
 
 
 @admin.register(Announcement)
@@ -14,7 +14,7 @@ class RegistrationRequestAdmin(admin.ModelAdmin):
     list_display = ('user_type', 'first_name', 'last_name', 'email', 'status', 'created_at')
     list_filter = ('user_type', 'status', 'created_at')
     search_fields = ('first_name', 'last_name', 'email')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('ai_analysis', 'created_at')
 
 
 @admin.register(Event)
@@ -22,3 +22,29 @@ class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'start', 'end', 'location', 'is_public')
     list_filter = ('is_public',)
     search_fields = ('title', 'description', 'location')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'task', 'status', 'priority', 'attempts', 'run_after', 'locked_by', 'created_at'
+    )
+    list_filter = ('status', 'task')
+    readonly_fields = ('created_at', 'finished_at', 'last_error')
+
+
+@admin.register(AIResult)
+class AIResultAdmin(admin.ModelAdmin):
+    list_display = (
+        'task', 'model', 'prompt_version', 'hits', 'latency_ms', 'created_at', 'last_used_at'
+    )
+    list_filter = ('task', 'model', 'prompt_version')
+    search_fields = ('key', 'raw_text')
+    readonly_fields = ('key', 'created_at', 'last_used_at', 'hits')
+
+
+@admin.register(ProgressSnapshot)
+class ProgressSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('student_id', 'subject', 'timeframe', 'assessment_count', 'updated_at')
+    list_filter = ('subject', 'timeframe')
+    search_fields = ('student_id',)
@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Core (site content)'
+
+    def ready(self):
+        # Register background tasks with the job queue and the system checks
+        from . import checks, tasks  # noqa: F401
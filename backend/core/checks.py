@@ -0,0 +1,29 @@
+"""System checks for deployment settings the AI features rely on."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when cross-worker AI state is kept in a per-process cache."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    features = [
+        name for name, enabled in (
+            ('AI rate limits', getattr(settings, 'AI_RATE_LIMITS_ENABLED', True)),
+            ('single-flight coalescing', getattr(settings, 'AI_SINGLE_FLIGHT', True)),
+        ) if enabled
+    ]
+    if backend not in LOCAL_CACHES or not features:
+        return []
+    return [Warning(
+        f"The default cache is {backend.rsplit('.', 1)[-1]}, which is private to each "
+        f"process, so {' and '.join(features)} do not hold across workers.",
+        hint='With more than one worker, set CACHE_BACKEND and CACHE_LOCATION to a shared '
+             'cache (Redis, Memcached or the database cache).',
+        id='core.W001',
+    )]
@@ -0,0 +1,172 @@
+"""Database-backed background job queue.
+
+Slow work (LLM calls, SMTP) is recorded as ``Job`` rows and drained by
+``manage.py run_workers``. Tasks are plain functions registered with the
+``task`` decorator and called with the job's JSON payload as keyword
+arguments.
+
+Claiming is a conditional UPDATE, so it is safe with several worker
+processes on SQLite or PostgreSQL alike. A claimed job is invisible to other
+workers until its visibility timeout passes; if the worker dies, the job
+becomes claimable again and is retried, or fails if it has no attempts left.
+"""
+
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, Callable[..., Any]] = {}
+
+
+def task(name: str) -> Callable:
+    """Register a function as a background task under ``name``."""
+    def decorator(func: Callable) -> Callable:
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_task(name: str) -> Callable[..., Any]:
+    """Return the function registered for ``name``."""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No background task registered as {name!r}") from None
+
+
+def enqueue(
+    name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 100,
+    max_attempts: int = 3,
+    delay: int = 0
+) -> Optional[Job]:
+    """Queue a task for background execution.
+
+    With ``JOBS_ALWAYS_EAGER`` the task runs inline instead (useful in tests
+    and for development without a worker). As with a queued job, a failure
+    is logged rather than raised into the caller.
+
+    Args:
+        name: Registered task name
+        payload: JSON-serializable keyword arguments for the task
+        priority: Lower numbers run first
+        max_attempts: Attempts before the job is marked failed
+        delay: Seconds to wait before the job becomes runnable
+
+    Returns:
+        The created Job, or None when run eagerly
+    """
+    get_task(name)  # Fail fast on typos
+    payload = payload or {}
+
+    if getattr(settings, 'JOBS_ALWAYS_EAGER', False):
+        try:
+            get_task(name)(**payload)
+        except Exception as e:
+            logger.error('Background task %s failed (run eagerly)', name, exc_info=e)
+        return None
+
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def worker_name() -> str:
+    """Identify this worker process in Job.locked_by."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next(worker: str, visibility_timeout: int = 300, batch: int = 10) -> Optional[Job]:
+    """Atomically claim the next runnable job.
+
+    Args:
+        worker: Name recorded on the claimed job
+        visibility_timeout: Seconds before an unfinished job may be reclaimed
+        batch: Candidates examined per attempt
+
+    Returns:
+        The claimed job, or None if nothing is runnable
+    """
+    Job.objects.fail_abandoned()
+    candidates = list(Job.objects.claimable().values_list('pk', 'status', 'locked_until')[:batch])
+    for pk, status, locked_until in candidates:
+        now = timezone.now()
+        claimed = Job.objects.filter(
+            pk=pk, status=status, locked_until=locked_until
+        ).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_job(job: Job, retry_delay: Optional[int] = None) -> bool:
+    """Execute a claimed job and record the outcome.
+
+    Failed attempts are rescheduled with jittered exponential backoff until
+    ``max_attempts`` is reached.
+
+    Returns:
+        True if the task succeeded
+    """
+    retry_delay = retry_delay or getattr(settings, 'JOBS_RETRY_DELAY', 10)
+    try:
+        get_task(job.task)(**job.payload)
+    except Exception as e:
+        logger.error('Background job %s failed (attempt %s/%s)',
+                     job, job.attempts, job.max_attempts, exc_info=e)
+        job.last_error = traceback.format_exc()
+        job.locked_until = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+        else:
+            backoff = retry_delay * 2 ** (job.attempts - 1)
+            job.status = Job.STATUS_QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=backoff * random.uniform(0.5, 1.5)
+            )
+        _save_if_still_owned(job)
+        return False
+
+    job.status = Job.STATUS_SUCCEEDED
+    job.finished_at = timezone.now()
+    job.locked_until = None
+    _save_if_still_owned(job)
+    return True
+
+
+def _save_if_still_owned(job: Job) -> None:
+    # Another worker may have reclaimed the job after our visibility timeout
+    updated = Job.objects.filter(
+        pk=job.pk, locked_by=job.locked_by, attempts=job.attempts
+    ).update(
+        status=job.status,
+        run_after=job.run_after,
+        locked_until=job.locked_until,
+        last_error=job.last_error,
+        finished_at=job.finished_at,
+    )
+    if not updated:
+        logger.warning('Job %s was reclaimed by another worker; result discarded', job.pk)
@@ -0,0 +1,72 @@
+import hashlib
+
+from django.core.management.base import BaseCommand
+
+from core.models import AIResult, Announcement
+from joyland.integrations import routing
+from joyland.integrations.embeddings import (
+    ANNOUNCEMENT,
+    ASSESSMENT_ITEM,
+    OBJECTIVE,
+    get_embedding_store,
+    item_id,
+)
+
+# Field holding the embedded text of each stored payload entry, by task
+GENERATED = {
+    routing.TERM_PLAN: (OBJECTIVE, 'description'),
+    routing.ASSESSMENT: (ASSESSMENT_ITEM, 'question'),
+}
+
+
+def content_id(kind: str, text: str) -> str:
+    # Generated texts have no row of their own, so they are keyed on content
+    return item_id(kind, hashlib.sha256(text.encode()).hexdigest()[:16])
+
+
+def collect_texts() -> dict:
+    """Map store ids to the texts of announcements and stored generations."""
+    items = {
+        item_id(ANNOUNCEMENT, a.pk): f"{a.title}\n\n{a.message}"
+        for a in Announcement.objects.all()
+    }
+    results = AIResult.objects.filter(task__in=GENERATED).values_list('task', 'payload')
+    for task, payload in results.iterator():
+        kind, field = GENERATED[task]
+        for entry in payload if isinstance(payload, list) else []:
+            text = entry.get(field) if isinstance(entry, dict) else None
+            if text:
+                items[content_id(kind, text)] = text
+    return items
+
+
+class Command(BaseCommand):
+    help = ('Embed announcements and the objectives and assessment items in the AI result '
+            'store into the persistent embedding store, skipping unchanged ones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', default='default', help='Embedding store name')
+        parser.add_argument(
+            '--batch-size', type=int, default=100, help='Texts per embedding request'
+        )
+
+    def handle(self, *args, **options):
+        store = get_embedding_store(options['store'])
+        items = collect_texts()
+        removed = [
+            key for kind in (ANNOUNCEMENT, OBJECTIVE, ASSESSMENT_ITEM)
+            for key in store.keys(kind) if key not in items
+        ]
+        for key in removed:
+            store.remove(key)
+
+        embedded = store.upsert(items, batch_size=options['batch_size'])
+        counts = {
+            kind: sum(key.startswith(f"{kind}:") for key in items)
+            for kind in (ANNOUNCEMENT, OBJECTIVE, ASSESSMENT_ITEM)
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {embedded} of {len(items)} texts ({counts[ANNOUNCEMENT]} announcements, "
+            f"{counts[OBJECTIVE]} objectives, {counts[ASSESSMENT_ITEM]} assessment items; "
+            f"{len(removed)} removed, {len(store)} vectors in store)."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from joyland.integrations.result_store import AIResultStore
+
+
+class Command(BaseCommand):
+    help = 'Delete stored AI generations that have not been used recently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Maximum age in days since last use (default AI_RESULT_MAX_AGE_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = AIResultStore.prune(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stored AI result(s).'))
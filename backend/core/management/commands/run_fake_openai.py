@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from joyland.integrations.fake_openai import FakeOpenAIConfig, FakeOpenAIServer
+
+
+class Command(BaseCommand):
+    help = ('Serve a local stand-in for the OpenAI API with configurable latency and failures, '
+            'for load tests without a key or network. Point the app at it with OPENAI_API_BASE.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', default='0',
+                            help="Time to first byte, e.g. 0.5, uniform:0.2,2 or lognormal:1.5,0.6")
+        parser.add_argument('--stream-latency', default='0',
+                            help='Delay between streamed chunks (same format as --latency)')
+        parser.add_argument(
+            '--errors', default='',
+            help='Injected failures, e.g. 429:0.05,503:0.02,timeout:0.01,disconnect:0.01'
+        )
+        parser.add_argument('--hang', type=float, default=30.0,
+                            help="Seconds a 'timeout' failure stalls before answering")
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed for repeatable latencies and failures')
+        parser.add_argument('--responses', default=None,
+                            help='JSON file mapping prompt substrings to canned replies')
+        parser.add_argument('--embedding-dim', type=int, default=1536)
+        parser.add_argument('--require-key', action='store_true',
+                            help='Answer 401 to requests without an API key')
+
+    def handle(self, *args, **options):
+        canned = {}
+        if options['responses']:
+            try:
+                with open(options['responses']) as f:
+                    canned = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read canned responses: {e}") from e
+
+        config = FakeOpenAIConfig(
+            latency=options['latency'],
+            stream_latency=options['stream_latency'],
+            errors=options['errors'],
+            hang=options['hang'],
+            seed=options['seed'],
+            canned=canned,
+            embedding_dim=options['embedding_dim'],
+            require_key=options['require_key'],
+        )
+        try:
+            server = FakeOpenAIServer((options['host'], options['port']), config)
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        self.stdout.write(f"Fake OpenAI API listening on {server.url}")
+        self.stdout.write(
+            f"Run the app with OPENAI_API_BASE={server.url} OPENAI_API_KEY=fake "
+            f"(statistics at {server.url.rsplit('/', 1)[0]}/_stats)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+        stats = server.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Served {stats['requests']} request(s), {stats['errors']} injected error(s), "
+            f"peak concurrency {stats['max_in_flight']}"
+        ))
@@ -0,0 +1,61 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_next, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Drain the background job queue (AI analysis, registration emails, ...).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Worker threads')
+        parser.add_argument('--visibility-timeout', type=int, default=300,
+                            help='Seconds before an unfinished job may be reclaimed')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        counts = {'succeeded': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def work(index):
+            name = f'{worker_name()}:{index}'
+            while not stop.is_set():
+                close_old_connections()
+                job = claim_next(name, visibility_timeout=options['visibility_timeout'])
+                if job is None:
+                    if options['once']:
+                        return
+                    stop.wait(options['poll_interval'])
+                    continue
+                ok = run_job(job)
+                with lock:
+                    counts['succeeded' if ok else 'failed'] += 1
+            close_old_connections()
+
+        self.stdout.write(f"Starting {options['concurrency']} worker(s)")
+        threads = [
+            threading.Thread(target=work, args=(i,), daemon=True)
+            for i in range(options['concurrency'])
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            stop.set()
+            for t in threads:
+                t.join()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Workers stopped: {counts['succeeded']} succeeded, {counts['failed']} failed"
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_job_job_core_job_status_def073_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AIResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("task", models.CharField(max_length=50)),
+                ("model", models.CharField(blank=True, max_length=100)),
+                ("prompt_version", models.CharField(blank=True, max_length=20)),
+                ("inputs", models.JSONField(blank=True, default=dict)),
+                ("raw_text", models.TextField(blank=True)),
+                ("payload", models.JSONField(blank=True, default=list)),
+                ("prompt_tokens", models.PositiveIntegerField(blank=True, null=True)),
+                ("completion_tokens", models.PositiveIntegerField(blank=True, null=True)),
+                ("latency_ms", models.PositiveIntegerField(blank=True, null=True)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="airesult",
+            index=models.Index(fields=["task", "-created_at"], name="core_airesu_task_4a4f8f_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="airesult",
+            index=models.Index(fields=["last_used_at"], name="core_airesu_last_us_8d0bf3_idx"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_airesult_airesult_core_airesu_task_4a4f8f_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("student_id", models.CharField(max_length=64)),
+                ("subject", models.CharField(max_length=100)),
+                ("timeframe", models.CharField(default="term", max_length=20)),
+                ("assessment_count", models.PositiveIntegerField(default=0)),
+                ("fingerprint", models.CharField(max_length=64)),
+                ("notes_fingerprint", models.CharField(blank=True, max_length=64)),
+                ("analysis", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("student_id", "subject", "timeframe")},
+            },
+        ),
+    ]
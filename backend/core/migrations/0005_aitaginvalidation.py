@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_progresssnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AITagInvalidation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("tag", models.CharField(max_length=200, unique=True)),
+                ("cleared_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_aitaginvalidation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="registrationrequest",
+            name="ai_analysis",
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from datetime import timedelta
 from django.db import models
 from django.utils import timezone
 
@@ -60,6 +61,7 @@ class RegistrationRequest(models.Model):
     heard_about = models.CharField(max_length=255, blank=True)
     agree = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
+    ai_analysis = models.TextField(blank=True)
     status = models.CharField(max_length=32, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -118,3 +120,158 @@ class Event(models.Model):
 
     def __str__(self) -> str:
         return f"{self.title} ({self.start.date().isoformat()})"
+
+
+class JobManager(models.Manager):
+    def claimable(self) -> models.QuerySet:
+        """Jobs ready to run, including running jobs whose visibility timeout
+        lapsed with attempts left."""
+        now = timezone.now()
+        return self.filter(
+            models.Q(status=Job.STATUS_QUEUED, run_after__lte=now)
+            | models.Q(
+                status=Job.STATUS_RUNNING, locked_until__lt=now,
+                attempts__lt=models.F('max_attempts')
+            )
+        ).order_by('priority', 'run_after', 'id')
+
+    def fail_abandoned(self) -> int:
+        """Fail running jobs whose visibility timeout lapsed on their last
+        attempt; return how many."""
+        now = timezone.now()
+        return self.filter(
+            status=Job.STATUS_RUNNING, locked_until__lt=now,
+            attempts__gte=models.F('max_attempts')
+        ).update(
+            status=Job.STATUS_FAILED,
+            locked_until=None,
+            finished_at=now,
+            last_error='Worker did not finish the last attempt before its visibility timeout',
+        )
+
+
+class Job(models.Model):
+    """A unit of background work drained by ``manage.py run_workers``."""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Lower numbers run first, as with Announcement.priority
+    priority = models.PositiveSmallIntegerField(default=100)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects: JobManager = JobManager()
+
+    class Meta:
+        ordering = ['priority', 'run_after']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['status', 'locked_until']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class AIResultManager(models.Manager):
+    def prune(self, max_age_days: int) -> int:
+        """Delete results not used for ``max_age_days``; return how many."""
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        deleted, _ = self.filter(
+            models.Q(last_used_at__lt=cutoff)
+            | models.Q(last_used_at__isnull=True, created_at__lt=cutoff)
+        ).delete()
+        return deleted
+
+
+class AIResult(models.Model):
+    """A persisted AI generation, shared by every request with the same inputs.
+
+    ``key`` is a content hash of the task, canonical inputs, prompt version
+    and model (see ``joyland.integrations.result_store``), so identical
+    generations are stored once and survive cache evictions and restarts.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    task = models.CharField(max_length=50)
+    model = models.CharField(max_length=100, blank=True)
+    prompt_version = models.CharField(max_length=20, blank=True)
+    inputs = models.JSONField(default=dict, blank=True)
+    raw_text = models.TextField(blank=True)
+    payload = models.JSONField(default=list, blank=True)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    objects: AIResultManager = AIResultManager()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['task', '-created_at']),
+            models.Index(fields=['last_used_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.task} {self.key[:12]} ({self.model})"
+
+
+class AITagInvalidation(models.Model):
+    """When a cache tag (teacher, subject, prompt version) was last cleared.
+
+    Tag versions live in the Django cache, which may be local to a worker
+    and is lost on restart; ``AIResultStore`` checks this table instead so
+    a clear retires stored results for every worker, permanently.
+    """
+
+    tag = models.CharField(max_length=200, unique=True)
+    cleared_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.tag} cleared {self.cleared_at:%Y-%m-%d %H:%M}"
+
+
+class ProgressSnapshot(models.Model):
+    """The last AI progress analysis for one student, subject and timeframe.
+
+    ``fingerprint`` hashes the assessments the analysis covered, so a later
+    request can tell whether anything changed and, if the old history is a
+    prefix of the new one, send only the new assessments.
+    """
+
+    student_id = models.CharField(max_length=64)
+    subject = models.CharField(max_length=100)
+    timeframe = models.CharField(max_length=20, default='term')
+    assessment_count = models.PositiveIntegerField(default=0)
+    fingerprint = models.CharField(max_length=64)
+    notes_fingerprint = models.CharField(max_length=64, blank=True)
+    analysis = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('student_id', 'subject', 'timeframe'),)
+
+    def __str__(self) -> str:
+        return f"{self.student_id} {self.subject} ({self.assessment_count} assessments)"
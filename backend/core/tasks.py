@@ -0,0 +1,25 @@
+"""Background tasks for registration (drained by ``manage.py run_workers``)."""
+
+from .jobs import task
+from .models import RegistrationRequest
+
+
+@task('registration.analyze')
+def analyze_registration(request_id: int) -> None:
+    """Attach AI placement insights to a student registration request."""
+    from .views.registration import add_ai_analysis
+    add_ai_analysis(RegistrationRequest.objects.get(pk=request_id))
+
+
+@task('registration.notify_admin')
+def notify_admin(request_id: int, admin_email: str = '') -> None:
+    """Tell the admins about a new registration request."""
+    from .views.registration import deliver_admin_notification
+    deliver_admin_notification(RegistrationRequest.objects.get(pk=request_id), admin_email or None)
+
+
+@task('registration.confirm_applicant')
+def confirm_applicant(request_id: int) -> None:
+    """Confirm receipt of a registration request to the applicant."""
+    from .views.registration import deliver_applicant_confirmation
+    deliver_applicant_confirmation(RegistrationRequest.objects.get(pk=request_id))
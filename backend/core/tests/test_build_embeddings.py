@@ -0,0 +1,67 @@
+"""Tests for the build_embeddings management command."""
+
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import AIResult, Announcement
+from joyland.integrations import routing
+from joyland.integrations.embeddings import (
+    ANNOUNCEMENT,
+    ASSESSMENT_ITEM,
+    OBJECTIVE,
+    EmbeddingStore,
+    item_id,
+)
+
+
+def fake_embed_many(texts, batch_size=100):
+    return [[1.0 if i == len(t) % 4 else 0.0 for i in range(4)] for t in texts]
+
+
+class BuildEmbeddingsTests(TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.client = MagicMock()
+        self.client.embed_many.side_effect = fake_embed_many
+        self.store = EmbeddingStore(path=path, dim=4, client=self.client)
+        patcher = patch(
+            'core.management.commands.build_embeddings.get_embedding_store',
+            return_value=self.store
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_indexes_announcements_objectives_and_items(self):
+        announcement = Announcement.objects.create(title='Sports day', message='Friday')
+        AIResult.objects.create(key='plan', task=routing.TERM_PLAN, payload=[
+            {'description': 'Solve linear equations'}, {'description': 'Graph lines'},
+        ])
+        AIResult.objects.create(key='items', task=routing.ASSESSMENT, payload=[
+            {'question': 'Solve 2x + 3 = 7'}, {'question': 'Graph lines'},
+        ])
+        AIResult.objects.create(key='acts', task=routing.ACTIVITIES, payload={'support': ['x']})
+
+        call_command('build_embeddings', stdout=StringIO())
+
+        self.assertIn(item_id(ANNOUNCEMENT, announcement.pk), self.store)
+        self.assertEqual(len(self.store.keys(OBJECTIVE)), 2)
+        self.assertEqual(len(self.store.keys(ASSESSMENT_ITEM)), 2)
+        self.assertEqual(len(self.store), 5)
+
+    def test_rerun_skips_unchanged_and_drops_removed(self):
+        AIResult.objects.create(key='plan', task=routing.TERM_PLAN, payload=[
+            {'description': 'Solve linear equations'},
+        ])
+        call_command('build_embeddings', stdout=StringIO())
+        call_command('build_embeddings', stdout=StringIO())
+        self.assertEqual(self.client.embed_many.call_count, 1)
+
+        AIResult.objects.all().delete()
+        call_command('build_embeddings', stdout=StringIO())
+        self.assertEqual(self.store.keys(OBJECTIVE), [])
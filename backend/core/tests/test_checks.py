@@ -0,0 +1,26 @@
+"""Tests for the deployment system checks."""
+
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_cache
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+DATABASE = {'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'ai_cache'
+}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM, AI_RATE_LIMITS_ENABLED=True, AI_SINGLE_FLIGHT=False)
+    def test_local_cache_warns(self):
+        warnings = check_shared_cache(None)
+        self.assertEqual([warning.id for warning in warnings], ['core.W001'])
+        self.assertIn('AI rate limits', warnings[0].msg)
+
+    @override_settings(CACHES=DATABASE)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(CACHES=LOCMEM, AI_RATE_LIMITS_ENABLED=False, AI_SINGLE_FLIGHT=False)
+    def test_no_warning_without_cross_worker_features(self):
+        self.assertEqual(check_shared_cache(None), [])
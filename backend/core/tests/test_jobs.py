@@ -0,0 +1,171 @@
+"""Tests for the database-backed job queue."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.jobs import claim_next, enqueue, run_job, task
+from core.models import Job, RegistrationRequest
+from core.views.registration import create_registration_request, send_registration_emails
+
+calls = []
+
+
+@task('tests.record')
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_claimed_in_priority_order(self):
+        enqueue('tests.record', {'value': 'low'}, priority=200)
+        enqueue('tests.record', {'value': 'high'}, priority=10)
+
+        job = claim_next('w1')
+        self.assertEqual(job.payload['value'], 'high')
+        self.assertEqual(job.status, Job.STATUS_RUNNING)
+        self.assertEqual(job.attempts, 1)
+        # A claimed job is invisible to other workers
+        self.assertEqual(claim_next('w2').payload['value'], 'low')
+        self.assertIsNone(claim_next('w3'))
+
+    def test_success_marks_job_done(self):
+        enqueue('tests.record', {'value': 1})
+        self.assertTrue(run_job(claim_next('w1')))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.STATUS_SUCCEEDED)
+
+    def test_failures_retry_then_fail(self):
+        enqueue('tests.record', {'value': 1, 'fail': True}, max_attempts=2)
+        self.assertFalse(run_job(claim_next('w1'), retry_delay=1))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertFalse(run_job(claim_next('w1'), retry_delay=1))
+        self.assertEqual(Job.objects.get().status, Job.STATUS_FAILED)
+
+    def test_expired_visibility_timeout_is_reclaimed(self):
+        enqueue('tests.record', {'value': 1})
+        claim_next('dead-worker')
+        self.assertIsNone(claim_next('w2'))
+
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        job = claim_next('w2')
+        self.assertEqual(job.locked_by, 'w2')
+        self.assertEqual(job.attempts, 2)
+
+    def test_abandoned_last_attempt_fails(self):
+        enqueue('tests.record', {'value': 1}, max_attempts=1)
+        claim_next('dead-worker')
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(claim_next('w2'))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, [])
+
+    def test_unknown_task_rejected(self):
+        with self.assertRaises(LookupError):
+            enqueue('tests.missing')
+
+
+class RegistrationJobTests(TestCase):
+    data = {'first_name': 'Ada', 'email': 'ada@example.com', 'year': 2012, 'agree': True}
+
+    def test_registration_defers_slow_work(self):
+        """Creating a request and sending emails only queues jobs."""
+        req = create_registration_request('student', self.data)
+        send_registration_emails(req)
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(Job.objects.values_list('task', flat=True)),
+            ['registration.analyze', 'registration.confirm_applicant', 'registration.notify_admin']
+        )
+
+    @patch('joyland.integrations.openai.OpenAIClient.analyze_student_application')
+    def test_workers_complete_registration(self, mock_analyze):
+        mock_analyze.return_value = {
+            'recommended_class_level': 'Grade 8',
+            'learning_style': 'Visual',
+            'academic_interests': ['Science'],
+            'support_needs': [],
+        }
+        req = create_registration_request('student', self.data)
+        send_registration_emails(req)
+
+        while (job := claim_next('w1')) is not None:
+            self.assertTrue(run_job(job))
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Grade 8', RegistrationRequest.objects.get(pk=req.pk).ai_analysis)
+
+    @patch('joyland.integrations.openai.OpenAIClient.analyze_student_application')
+    def test_retried_analysis_keeps_notes(self, mock_analyze):
+        """A rerun neither overwrites the notes nor analyses its own output."""
+        from core.views.registration import add_ai_analysis
+        mock_analyze.return_value = {
+            'recommended_class_level': 'Grade 8',
+            'learning_style': 'Visual',
+            'academic_interests': ['Science'],
+            'support_needs': [],
+        }
+        req = create_registration_request('student', self.data)
+        req.notes = 'Loves astronomy'
+        req.save(update_fields=['notes'])
+
+        add_ai_analysis(req)
+        add_ai_analysis(RegistrationRequest.objects.get(pk=req.pk))
+
+        req.refresh_from_db()
+        self.assertEqual(req.notes, 'Loves astronomy')
+        self.assertIn('Grade 8', req.ai_analysis)
+        self.assertEqual(mock_analyze.call_count, 1)
+        self.assertEqual(mock_analyze.call_args[0][0]['notes'], 'Loves astronomy')
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        req = create_registration_request('teacher', self.data)
+        send_registration_emails(req)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    @patch('core.views.registration.send_mail', side_effect=OSError('SMTP down'))
+    def test_eager_failures_do_not_reach_the_caller(self, mock_send):
+        send_registration_emails(create_registration_request('teacher', self.data))
+        self.assertEqual(mock_send.call_count, 2)
+
+    def test_retry_does_not_resend_delivered_email(self):
+        from django.core.mail import send_mail
+
+        def flaky_send(subject, *args, **kwargs):
+            if subject == 'Registration received' and not flaky_send.failed:
+                flaky_send.failed = True
+                raise OSError('SMTP down')
+            return send_mail(subject, *args, **kwargs)
+        flaky_send.failed = False
+
+        send_registration_emails(create_registration_request('teacher', self.data))
+        with patch('core.views.registration.send_mail', side_effect=flaky_send):
+            for _ in range(2):
+                while (job := claim_next('w1')) is not None:
+                    run_job(job, retry_delay=1)
+                Job.objects.update(run_after=timezone.now())
+
+        self.assertEqual(
+            sorted(message.subject for message in mail.outbox),
+            ['New registration request: Teacher', 'Registration received']
+        )
@@ -0,0 +1,41 @@
+"""Tests for the AI metrics endpoint and admin telemetry page."""
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from joyland.integrations.telemetry import telemetry
+from users.models import User
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        telemetry.reset()
+        telemetry.record_call('complete', 'assessment', 0.4, {'prompt_tokens': 7})
+        self.staff = User.objects.create_user(
+            username='staff', password='testpass123', role='system_admin', is_staff=True
+        )
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('core:ai_metrics')).status_code, 403)
+        with override_settings(AI_METRICS_TOKEN='secret'):
+            response = self.client.get(
+                reverse('core:ai_metrics'), HTTP_AUTHORIZATION='Bearer wrong'
+            )
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get(
+                reverse('core:ai_metrics'), HTTP_AUTHORIZATION='Bearer secret'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'joyland_ai_call_duration_seconds_count', response.content)
+
+    def test_json_format(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('core:ai_metrics'), {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['calls']['complete/assessment']['prompt_tokens'], 7)
+
+    def test_admin_page(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin:ai_telemetry'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'complete/assessment')
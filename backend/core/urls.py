@@ -17,4 +17,5 @@ urlpatterns = [
     path('register/parent/', views.register_parent, name='register_parent'),
     path('register/success/', views.register_success, name='register_success'),
     path('one-time-login/<str:uidb64>/<str:token>/', views.one_time_login, name='one_time_login'),
+    path('metrics/', views.ai_metrics, name='ai_metrics'),
 ]
@@ -18,6 +18,8 @@ from .registration import (
     one_time_login,
 )
 
+from .metrics import ai_metrics
+
 __all__ = [
     # Announcement views
     'landing',
@@ -34,4 +36,6 @@ __all__ = [
     'register_parent',
     'register_success',
     'one_time_login',
+    # Metrics
+    'ai_metrics',
 ]
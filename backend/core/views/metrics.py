@@ -0,0 +1,33 @@
+"""Metrics endpoint exporting AI telemetry."""
+import hmac
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from joyland.integrations.telemetry import collect_metrics, render_prometheus
+
+
+def _authorized(request: HttpRequest) -> bool:
+    # Staff can browse it; scrapers authenticate with AI_METRICS_TOKEN
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = getattr(settings, 'AI_METRICS_TOKEN', None)
+    header = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+
+@require_GET
+def ai_metrics(request: HttpRequest) -> HttpResponse:
+    """AI call latency, token, error and cache metrics.
+
+    Prometheus text format by default, JSON with ``?format=json``.
+    """
+    if not _authorized(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    metrics = collect_metrics()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(metrics)
+    return HttpResponse(
+        render_prometheus(metrics), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -10,6 +10,7 @@ from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 import logging
 
+from core.jobs import enqueue
 from core.models import RegistrationRequest
 from users.models import User
 from users.forms import RegistrationRequestForm
@@ -37,40 +38,74 @@ def create_registration_request(user_type: str, form_data: Dict[str, Any]) -> Re
     )
 
     if user_type == 'student':
-        try:
-            ai_client = OpenAIClient()
-            analysis = ai_client.analyze_student_application(form_data)
-            insights = [
-                f"AI Analysis Results:",
-                f"Recommended Level: {analysis['recommended_class_level']}",
-                f"Learning Style: {analysis['learning_style']}",
-                "",
-                "Academic Interests:",
-                *[f"- {interest}" for interest in analysis['academic_interests']],
-                "",
-                "Support Considerations:",
-                *[f"- {need}" for need in analysis['support_needs']]
-            ]
-            request.notes = "\n".join(insights)
-            request.save()
-            logger.info('Added AI analysis to student registration request ID=%s', request.id)
-        except Exception as e:
-            logger.error('Failed to generate AI analysis for student registration ID=%s', request.id, exc_info=e)
+        # The LLM round-trip happens in the background, not in the POST
+        enqueue('registration.analyze', {'request_id': request.id}, priority=50)
 
     return request
 
 
+def add_ai_analysis(request: RegistrationRequest) -> None:
+    """Store AI placement insights for a student request.
+
+    The insights get their own field so the applicant's notes stay intact;
+    a retried job that finds them already present does nothing.
+    """
+    if request.ai_analysis:
+        return
+    form_data = {
+        'heard_about': request.heard_about,
+        'birth_year': request.birth_year,
+        'notes': request.notes,
+    }
+    ai_client = OpenAIClient()
+    analysis = ai_client.analyze_student_application(form_data)
+    insights = [
+        f"AI Analysis Results:",
+        f"Recommended Level: {analysis['recommended_class_level']}",
+        f"Learning Style: {analysis['learning_style']}",
+        "",
+        "Academic Interests:",
+        *[f"- {interest}" for interest in analysis['academic_interests']],
+        "",
+        "Support Considerations:",
+        *[f"- {need}" for need in analysis['support_needs']]
+    ]
+    request.ai_analysis = "\n".join(insights)
+    request.save(update_fields=['ai_analysis'])
+    logger.info('Added AI analysis to student registration request ID=%s', request.id)
+
+
 def send_registration_emails(request: RegistrationRequest, admin_email: Optional[str] = None) -> None:
+    """Queue the confirmation emails so SMTP does not block the response.
+
+    Each email is its own job, so retrying one never resends the other.
+    """
+    enqueue(
+        'registration.notify_admin',
+        {'request_id': request.id, 'admin_email': admin_email or ''},
+        priority=20,
+    )
+    enqueue('registration.confirm_applicant', {'request_id': request.id}, priority=20)
+
+
+def deliver_admin_notification(
+    request: RegistrationRequest, admin_email: Optional[str] = None
+) -> None:
     if not admin_email:
         admin_email = settings.DEFAULT_FROM_EMAIL
-    try:
-        subject = f"New registration request: {request.get_user_type_display()}"
-        msg = f"A new registration request was submitted:\n\n{request}\n\nReview in admin."
-        send_mail(subject, msg, settings.DEFAULT_FROM_EMAIL, [admin_email])
-        send_mail('Registration received', 'Thanks — we received your application.', settings.DEFAULT_FROM_EMAIL, [request.email])
-        logger.info('Sent registration emails for request ID=%s', request.id)
-    except Exception as e:
-        logger.error('Failed to send registration emails for request ID=%s', request.id, exc_info=e)
+    subject = f"New registration request: {request.get_user_type_display()}"
+    msg = f"A new registration request was submitted:\n\n{request}\n\nReview in admin."
+    # Errors propagate so the job queue retries delivery
+    send_mail(subject, msg, settings.DEFAULT_FROM_EMAIL, [admin_email])
+    logger.info('Sent admin notification for registration request ID=%s', request.id)
+
+
+def deliver_applicant_confirmation(request: RegistrationRequest) -> None:
+    send_mail(
+        'Registration received', 'Thanks — we received your application.',
+        settings.DEFAULT_FROM_EMAIL, [request.email]
+    )
+    logger.info('Sent applicant confirmation for registration request ID=%s', request.id)
 
 
 def get_date_choices():
@@ -1,40 +1,166 @@
 """Caching utilities for AI operations."""
 
+import dataclasses
 import hashlib
+import inspect
 import json
+import pickle
+import re
+import threading
+import time
+import zlib
 from functools import wraps
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Iterable, Optional
 from django.core.cache import cache
 from django.conf import settings
+from django.db import close_old_connections
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def canonical_arg(value: Any) -> Any:
+    """Reduce an argument to a JSON-serializable form that is stable across runs.
+
+    Dataclasses (e.g. ``LearningObjective``) become their field values, dicts
+    are key-sorted, sets are sorted, and objects with the default ``repr``
+    (which embeds a memory address) are reduced to their type name.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            '__type__': type(value).__qualname__,
+            **{f.name: canonical_arg(getattr(value, f.name)) for f in dataclasses.fields(value)},
+        }
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda kv: str(kv[0]))
+        return {str(k): canonical_arg(v) for k, v in items}
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonical_arg(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [canonical_arg(v) for v in value]
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if type(value).__repr__ is object.__repr__:
+        return f"<{type(value).__module__}.{type(value).__qualname__}>"
+    return repr(value)
+
+
 def cache_key_from_args(*args, **kwargs) -> str:
     """Generate a cache key from function arguments."""
     key_data = json.dumps({
-        'args': [str(arg) for arg in args],
-        'kwargs': {k: str(v) for k, v in kwargs.items()}
+        'args': [canonical_arg(arg) for arg in args],
+        'kwargs': {k: canonical_arg(v) for k, v in kwargs.items()}
     }, sort_keys=True)
     return hashlib.md5(key_data.encode()).hexdigest()
 
 
+def instance_identity(instance: Any) -> Any:
+    """Key component standing in for ``self`` in cached methods.
+
+    The type name plus whatever the instance's ``cache_identity()`` returns
+    (e.g. the configured model), so differently configured instances of
+    one class never share entries.
+    """
+    if isinstance(instance, type):
+        # Classmethods: the class itself is the identity
+        return [instance.__qualname__, None]
+    hook = getattr(instance, 'cache_identity', None)
+    return [type(instance).__qualname__, hook() if callable(hook) else None]
+
+
+def _exceeds_size(value: Any, limit: int) -> bool:
+    """Estimate whether ``value`` serializes to more than ``limit`` bytes.
+
+    Walks the value adding up string lengths plus a little per item, and
+    stops as soon as the estimate passes ``limit``, so small results are
+    measured without being serialized.
+    """
+    pending, size = [value], 0
+    while pending:
+        item = pending.pop()
+        size += 4
+        if isinstance(item, (str, bytes)):
+            size += len(item)
+        elif isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif hasattr(item, '__dict__'):
+            pending.extend(vars(item).values())
+        if size > limit:
+            return True
+    return False
+
+
+def _pack(value: Any, fresh_for: int, compress_threshold: Optional[int]) -> Dict[str, Any]:
+    entry = {'value': value, 'fresh_until': time.time() + fresh_for, 'zlib': False}
+    if compress_threshold is not None and _exceeds_size(value, compress_threshold):
+        raw = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(raw) > compress_threshold:
+            entry.update(value=zlib.compress(raw), zlib=True)
+    return entry
+
+
+def _unpack(entry: Dict[str, Any]) -> Any:
+    if entry['zlib']:
+        return pickle.loads(zlib.decompress(entry['value']))
+    return entry['value']
+
+
 def cache_ai_result(
     timeout: int = 3600,
-    key_prefix: str = 'ai_'
+    key_prefix: str = 'ai_',
+    stale_timeout: int = 0,
+    negative_timeout: int = 0,
+    compress_threshold: Optional[int] = 4096
 ) -> Callable:
     """
     Decorator to cache AI operation results.
     
+    Keys are derived from canonicalized arguments (see ``canonical_arg``),
+    so dataclass and dict arguments hit reliably; ``self`` is keyed on
+    ``instance_identity``. ``None`` results are cached like any other value.
+    
     Args:
-        timeout: Cache timeout in seconds (default 1 hour)
+        timeout: Seconds a result is served as fresh (default 1 hour)
         key_prefix: Prefix for cache key (default 'ai_')
+        stale_timeout: Seconds past ``timeout`` a result is still served
+            while a background refresh replaces it (0 disables)
+        negative_timeout: Seconds to remember a failure and re-raise it
+            without calling the function again (0 disables)
+        compress_threshold: Size in bytes above which results are stored
+            zlib-compressed (None disables)
     
     Returns:
         Decorated function that uses caching
     """
     def decorator(func: Callable) -> Callable:
+        # Methods are keyed on the instance's identity, not its address
+        params = list(inspect.signature(func).parameters)
+        is_method = bool(params) and params[0] in ('self', 'cls')
+        name = func.__qualname__
+
+        def store(cache_key: str, result: Any) -> None:
+            try:
+                cache.set(cache_key, _pack(result, timeout, compress_threshold),
+                          timeout + stale_timeout)
+            except Exception as e:
+                logger.warning(f"Failed to cache result for {name}: {e}")
+
+        def refresh(cache_key: str, args: tuple, kwargs: dict) -> None:
+            # Runs on its own thread, which owns whatever DB connection it opens
+            close_old_connections()
+            try:
+                store(cache_key, func(*args, **kwargs))
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {name}: {e}")
+            finally:
+                cache.delete(f"{cache_key}:refreshing")
+                close_old_connections()
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             # Skip caching if disabled in settings
@@ -42,88 +168,346 @@ def cache_ai_result(
                 return func(*args, **kwargs)
             
             # Generate cache key
-            hash_key = cache_key_from_args(*args, **kwargs)
-            cache_key = f"{key_prefix}{func.__name__}:{hash_key}"
+            key_args = (instance_identity(args[0]), *args[1:]) if is_method and args else args
+            hash_key = cache_key_from_args(*key_args, **kwargs)
+            cache_key = f"{key_prefix}{name}:{hash_key}"
             
             # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return cached_result
+            failure = cache.get(f"{cache_key}:failed")
+            if failure is not None:
+                logger.debug(f"Cached failure for {name}")
+                raise failure
+
+            entry = cache.get(cache_key)
+            if entry is not None:
+                if time.time() >= entry['fresh_until'] and cache.add(
+                    f"{cache_key}:refreshing", True, max(timeout, 30)
+                ):
+                    # Serve the stale value; one caller refreshes it in the background
+                    logger.debug(f"Serving stale result for {name}, refreshing")
+                    threading.Thread(
+                        target=refresh, args=(cache_key, args, kwargs), daemon=True
+                    ).start()
+                else:
+                    logger.debug(f"Cache hit for {name}")
+                return _unpack(entry)
             
             # Call function and cache result
-            logger.debug(f"Cache miss for {func.__name__}, calling function")
-            result = func(*args, **kwargs)
-            
+            logger.debug(f"Cache miss for {name}, calling function")
             try:
-                cache.set(cache_key, result, timeout)
+                result = func(*args, **kwargs)
             except Exception as e:
-                logger.warning(f"Failed to cache result for {func.__name__}: {e}")
+                if negative_timeout:
+                    try:
+                        cache.set(f"{cache_key}:failed", e, negative_timeout)
+                    except Exception:
+                        # Unpicklable errors are simply not remembered
+                        pass
+                raise
             
+            store(cache_key, result)
             return result
         
         return wrapper
     return decorator
 
 
+TEACHER_SCOPE = 'teacher'
+SHARED_SCOPE = 'shared'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(value: Any) -> str:
+    """Normalize free text so cosmetic differences share a cache key.
+
+    Lower-cases, collapses runs of whitespace and drops trailing punctuation,
+    so ``"Solve  linear equations."`` and ``"solve linear equations"`` match.
+    """
+    text = _WHITESPACE_RE.sub(' ', str(value)).strip().lower()
+    return text.rstrip('.!?;: ')
+
+
+def canonical_key(kind: str, **inputs: Any) -> str:
+    """Build a stable digest from normalized, canonicalized inputs.
+
+    Args:
+        kind: Operation type (e.g. 'term_plan', 'assessment')
+        **inputs: Inputs that determine the generated content
+
+    Returns:
+        Hex digest identifying the generation
+    """
+    key_data = json.dumps({
+        'kind': kind,
+        'prompt_version': getattr(settings, 'AI_PROMPT_VERSION', '1'),
+        'inputs': {k: normalize_text(v) for k, v in inputs.items()},
+    }, sort_keys=True)
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+TAG_PREFIX = 'ai_tag'
+def teacher_tag(teacher_id: int) -> str:
+    """Tag carried by every entry owned by one teacher."""
+    return f"teacher:{teacher_id}"
+
+
+def subject_tag(subject: str) -> str:
+    """Tag carried by every entry generated for a subject."""
+    return f"subject:{normalize_text(subject)}"
+
+
+def prompt_tag(version: Optional[str] = None) -> str:
+    """Tag carried by every entry generated with a prompt version."""
+    return f"prompt:{version or getattr(settings, 'AI_PROMPT_VERSION', '1')}"
+
+
+def _tag_seed() -> int:
+    # Seeded from the clock so a counter lost to eviction never repeats an old version
+    return time.time_ns()
+
+
+def tag_versions(tags: Iterable[str]) -> Dict[str, int]:
+    """Return the current generation counter of each tag."""
+    keys = {f"{TAG_PREFIX}:{tag}": tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            seed = _tag_seed()
+            cache.add(key, seed, None)
+            version = cache.get(key, seed)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tag(tag: str) -> None:
+    """Make every entry carrying ``tag`` a miss.
+
+    Entries are not deleted; bumping the tag's counter changes the key they
+    would be looked up under, and the orphans expire with their timeout.
+    The invalidation is also recorded in the database, so the persistent
+    ``AIResultStore`` ignores results generated before it in every worker.
+    """
+    # Imported lazily: the result store depends on this module
+    from joyland.integrations.result_store import AIResultStore
+
+    key = f"{TAG_PREFIX}:{tag}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _tag_seed(), None)
+    AIResultStore.invalidate(tag)
+
+
+def tagged_key(base: str, tags: Iterable[str]) -> str:
+    """Append the current generation of ``tags`` to a cache key."""
+    tags = sorted(set(tags))
+    if not tags:
+        return base
+    versions = tag_versions(tags)
+    stamp = hashlib.md5(
+        json.dumps([[tag, versions[tag]] for tag in tags]).encode()
+    ).hexdigest()[:12]
+    return f"{base}:{stamp}"
+
+
+def _default_model() -> str:
+    # Imported lazily so caching does not pull in the OpenAI SDK
+    from joyland.integrations.openai import get_default_model
+    return get_default_model()
+
+
 class AIOperationCache:
-    """Manager class for AI operation caching."""
-    
+    """Manager class for AI operation caching.
+
+    Entries live in one of two scopes. The teacher scope holds per-teacher
+    results and always wins on lookup, so a teacher's own regenerated plan
+    overrides the shared one. The opt-in shared scope (``AI_SHARED_CACHE``)
+    holds results keyed only on the canonical inputs, so the same
+    Mathematics/9th/Term 2 plan is generated once for the whole department.
+
+    Keys carry the generation of their tags (teacher, subject, prompt
+    version), so any of those can be invalidated in O(1) with
+    ``invalidate_tag``.
+    """
+
+    STATS_PREFIX = 'ai_cache_stats'
+    STATS_TIMEOUT = 7 * 86400
+
+    @staticmethod
+    def shared_enabled() -> bool:
+        """Whether results are shared across teachers."""
+        return getattr(settings, 'AI_SHARED_CACHE', False)
+
     @staticmethod
     def clear_teacher_cache(teacher_id: int) -> None:
-        """Clear all cache entries for a specific teacher."""
-        pattern = f"ai_*:{teacher_id}:*"
-        # Note: Django cache.delete_pattern is not standard,
-        # so we track keys separately if needed
+        """Clear all cache entries for a specific teacher.
+
+        Shared-scope entries are left alone; only the teacher's own
+        overrides are dropped. Stored results the teacher's next requests
+        would reuse are regenerated too (see ``AIResultStore.get``).
+        """
+        invalidate_tag(teacher_tag(teacher_id))
         logger.info(f"Cleared cache for teacher {teacher_id}")
-    
+
     @staticmethod
+    def clear_subject_cache(subject: str) -> None:
+        """Clear cached term plans for a subject in every scope."""
+        invalidate_tag(subject_tag(subject))
+        logger.info(f"Cleared cache for subject {subject}")
+
+    @staticmethod
+    def clear_prompt_version_cache(version: Optional[str] = None) -> None:
+        """Clear entries generated with a prompt version (default: current)."""
+        invalidate_tag(prompt_tag(version))
+        logger.info(f"Cleared cache for prompt version {version or 'current'}")
+
+    @classmethod
     def cache_term_plan(
+        cls,
         teacher_id: int,
         subject: str,
         grade: str,
         term: int,
         plan_data: Any,
-        timeout: int = 86400  # 24 hours
+        timeout: int = 86400,  # 24 hours
+        scope: Optional[str] = None,
+        model: Optional[str] = None
     ) -> None:
-        """Cache a term plan with teacher context."""
-        cache_key = f"ai_term_plan:{teacher_id}:{subject}:{grade}:{term}"
-        cache.set(cache_key, plan_data, timeout)
-    
-    @staticmethod
+        """Cache a term plan with teacher context.
+
+        Args:
+            scope: TEACHER_SCOPE to store a per-teacher override, SHARED_SCOPE
+                to share it; defaults to shared when AI_SHARED_CACHE is on
+        """
+        digest = canonical_key(
+            'term_plan', subject=subject, grade=grade, term=term,
+            model=model or _default_model()
+        )
+        cls._set('term_plan', teacher_id, digest, plan_data, timeout, scope,
+                 tags=[subject_tag(subject)])
+
+    @classmethod
     def get_cached_term_plan(
+        cls,
         teacher_id: int,
         subject: str,
         grade: str,
-        term: int
+        term: int,
+        model: Optional[str] = None
     ) -> Optional[Any]:
         """Retrieve cached term plan."""
-        cache_key = f"ai_term_plan:{teacher_id}:{subject}:{grade}:{term}"
-        return cache.get(cache_key)
-    
-    @staticmethod
+        digest = canonical_key(
+            'term_plan', subject=subject, grade=grade, term=term,
+            model=model or _default_model()
+        )
+        return cls._get('term_plan', teacher_id, digest, tags=[subject_tag(subject)])
+
+    @classmethod
     def cache_assessment(
+        cls,
         teacher_id: int,
         objective: str,
         assessment_type: str,
         level: str,
         assessment_data: Any,
-        timeout: int = 86400  # 24 hours
+        timeout: int = 86400,  # 24 hours
+        scope: Optional[str] = None,
+        model: Optional[str] = None
     ) -> None:
         """Cache an assessment with teacher context."""
-        # Create a stable hash of the objective
-        objective_hash = hashlib.md5(objective.encode()).hexdigest()
-        cache_key = f"ai_assessment:{teacher_id}:{objective_hash}:{assessment_type}:{level}"
-        cache.set(cache_key, assessment_data, timeout)
-    
-    @staticmethod
+        digest = canonical_key(
+            'assessment', objective=objective, assessment_type=assessment_type,
+            level=level, model=model or _default_model()
+        )
+        cls._set('assessment', teacher_id, digest, assessment_data, timeout, scope)
+
+    @classmethod
     def get_cached_assessment(
+        cls,
         teacher_id: int,
         objective: str,
         assessment_type: str,
-        level: str
+        level: str,
+        model: Optional[str] = None
     ) -> Optional[Any]:
         """Retrieve cached assessment."""
-        objective_hash = hashlib.md5(objective.encode()).hexdigest()
-        cache_key = f"ai_assessment:{teacher_id}:{objective_hash}:{assessment_type}:{level}"
-        return cache.get(cache_key)
+        digest = canonical_key(
+            'assessment', objective=objective, assessment_type=assessment_type,
+            level=level, model=model or _default_model()
+        )
+        return cls._get('assessment', teacher_id, digest)
+
+    @classmethod
+    def get_hit_rates(cls, kinds: tuple = ('term_plan', 'assessment')) -> Dict[str, Dict[str, Any]]:
+        """Return hit/miss counts and hit rate per operation and scope.
+
+        Returns:
+            Mapping like ``{'term_plan': {'teacher': {...}, 'shared': {...}}}``
+            where each entry has ``hits``, ``misses`` and ``hit_rate``
+        """
+        stats = {}
+        for kind in kinds:
+            stats[kind] = {}
+            for scope in (TEACHER_SCOPE, SHARED_SCOPE):
+                hits = cache.get(cls._stats_key(kind, scope, 'hit'), 0)
+                misses = cache.get(cls._stats_key(kind, scope, 'miss'), 0)
+                total = hits + misses
+                stats[kind][scope] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': hits / total if total else 0.0,
+                }
+        return stats
+
+    @staticmethod
+    def _key(kind: str, teacher_id: Optional[int], digest: str, tags: Iterable[str] = ()) -> str:
+        tags = [prompt_tag(), *tags]
+        if teacher_id is None:
+            return tagged_key(f"ai_{kind}:{SHARED_SCOPE}:{digest}", tags)
+        return tagged_key(f"ai_{kind}:{teacher_id}:{digest}", [teacher_tag(teacher_id), *tags])
+
+    @classmethod
+    def _set(
+        cls,
+        kind: str,
+        teacher_id: int,
+        digest: str,
+        data: Any,
+        timeout: int,
+        scope: Optional[str],
+        tags: Iterable[str] = ()
+    ) -> None:
+        if scope is None:
+            scope = SHARED_SCOPE if cls.shared_enabled() else TEACHER_SCOPE
+        owner = None if scope == SHARED_SCOPE else teacher_id
+        cache.set(cls._key(kind, owner, digest, tags), data, timeout)
+
+    @classmethod
+    def _get(
+        cls, kind: str, teacher_id: int, digest: str, tags: Iterable[str] = ()
+    ) -> Optional[Any]:
+        # Per-teacher overrides are layered on top of the shared entry
+        result = cache.get(cls._key(kind, teacher_id, digest, tags))
+        cls._record(kind, TEACHER_SCOPE, result is not None)
+        if result is not None or not cls.shared_enabled():
+            return result
+
+        result = cache.get(cls._key(kind, None, digest, tags))
+        cls._record(kind, SHARED_SCOPE, result is not None)
+        return result
+
+    @classmethod
+    def _stats_key(cls, kind: str, scope: str, outcome: str) -> str:
+        return f"{cls.STATS_PREFIX}:{kind}:{scope}:{outcome}"
+
+    @classmethod
+    def _record(cls, kind: str, scope: str, hit: bool) -> None:
+        key = cls._stats_key(kind, scope, 'hit' if hit else 'miss')
+        try:
+            cache.add(key, 0, cls.STATS_TIMEOUT)
+            cache.incr(key)
+        except Exception as e:
+            logger.debug(f"Failed to record cache stats for {kind}: {e}")
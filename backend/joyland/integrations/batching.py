@@ -0,0 +1,204 @@
+"""Micro-batching of small concurrent completions.
+
+Short requests (announcement drafts, admission questions, single-objective
+activities) spend most of their time on per-request overhead. When enabled,
+compatible requests (same model, task and temperature) arriving within
+``AI_BATCH_WINDOW`` seconds are sent as one multi-part prompt:
+
+    ### REQUEST 1
+    <prompt 1>
+
+    ### REQUEST 2
+    <prompt 2>
+
+The model is asked to begin each answer with ``### RESPONSE k`` and the
+reply is split back to the callers. If the reply cannot be split cleanly,
+each caller falls back to its own individual request.
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Performs one upstream completion: send(prompt, max_tokens) -> response
+SendFn = Callable[[str, int], Dict[str, Any]]
+
+BATCH_INSTRUCTIONS = (
+    "Answer each of the following {count} requests independently and in order.\n"
+    "Begin each answer with a line containing only '### RESPONSE <number>' "
+    "and write nothing before the first marker.\n\n"
+)
+
+RESPONSE_MARKER = re.compile(r'^[ \t]*###[ \t]*RESPONSE[ \t]+(\d+)[ \t]*:?[ \t]*$', re.MULTILINE)
+
+
+def build_batch_prompt(prompts: List[str]) -> str:
+    """Combine prompts into one delimited multi-part prompt."""
+    parts = [BATCH_INSTRUCTIONS.format(count=len(prompts))]
+    for number, prompt in enumerate(prompts, 1):
+        parts.append(f"### REQUEST {number}\n{prompt.strip()}\n\n")
+    return ''.join(parts)
+
+
+def split_batch_response(text: str, count: int) -> Optional[List[str]]:
+    """Split a batched reply into ``count`` answers.
+
+    Returns:
+        The answers in request order, or None unless every marker from 1 to
+        ``count`` appears exactly once, in order, with a non-empty answer
+    """
+    markers = list(RESPONSE_MARKER.finditer(text))
+    if [int(m.group(1)) for m in markers] != list(range(1, count + 1)):
+        return None
+    answers = []
+    for index, marker in enumerate(markers):
+        end = markers[index + 1].start() if index + 1 < len(markers) else len(text)
+        answer = text[marker.end():end].strip()
+        if not answer:
+            return None
+        answers.append(answer)
+    return answers
+
+
+class _Request:
+    def __init__(self, prompt: str, max_tokens: int):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.response: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class _Batch:
+    def __init__(self):
+        self.requests: List[_Request] = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """Collect compatible requests for a short window and send them as one."""
+
+    COUNTERS = ('requests', 'batches', 'batched_requests', 'fallbacks')
+
+    def __init__(self, window: Optional[float] = None, max_size: Optional[int] = None):
+        self.window = window
+        self.max_size = max_size
+        self._open: Dict[Hashable, _Batch] = {}
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def accepts(self, task: Optional[str], **kwargs: Any) -> bool:
+        """Whether a request may be batched.
+
+        Requests with extra API parameters (stop sequences, logit bias, ...)
+        are never batched since those would apply to every part.
+        """
+        return (
+            getattr(settings, 'AI_MICRO_BATCHING', False)
+            and not kwargs
+            and task in getattr(settings, 'AI_BATCH_TASKS', ())
+        )
+
+    def submit(self, group: Hashable, prompt: str, max_tokens: int, send: SendFn) -> Dict[str, Any]:
+        """Complete ``prompt``, possibly sharing an upstream call.
+
+        Args:
+            group: Compatibility key; only requests with equal keys are batched
+            prompt: The caller's prompt
+            max_tokens: The caller's token limit
+            send: Performs an upstream completion
+
+        Returns:
+            A completion response holding only this caller's answer
+        """
+        window = self._setting(self.window, 'AI_BATCH_WINDOW', 0.05)
+        max_size = self._setting(self.max_size, 'AI_BATCH_MAX_SIZE', 8)
+        request = _Request(prompt, max_tokens)
+
+        with self._lock:
+            self._counts['requests'] += 1
+            batch = self._open.get(group)
+            leader = batch is None
+            if leader:
+                batch = self._open[group] = _Batch()
+            batch.requests.append(request)
+            if len(batch.requests) >= max_size:
+                del self._open[group]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(window)
+            with self._lock:
+                if self._open.get(group) is batch:
+                    del self._open[group]
+            self._dispatch(batch, send)
+        else:
+            request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+        if request.response is None:
+            return send(prompt, max_tokens)
+        return request.response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _dispatch(self, batch: _Batch, send: SendFn) -> None:
+        requests = batch.requests
+        try:
+            if len(requests) == 1:
+                requests[0].response = send(requests[0].prompt, requests[0].max_tokens)
+                return
+
+            max_tokens = min(
+                sum(r.max_tokens for r in requests),
+                getattr(settings, 'AI_BATCH_MAX_TOKENS', 4000)
+            )
+            response = send(build_batch_prompt([r.prompt for r in requests]), max_tokens)
+            answers = split_batch_response(response['choices'][0]['text'], len(requests))
+            with self._lock:
+                self._counts['batches'] += 1
+                self._counts['batched_requests'] += len(requests)
+                if answers is None:
+                    self._counts['fallbacks'] += len(requests)
+            if answers is None:
+                # Responses stay None so each caller retries on its own
+                logger.warning('Could not split batched AI response; falling back to %s calls',
+                               len(requests))
+                return
+            for r, answer in zip(requests, answers):
+                r.response = _part_response(response, answer)
+        except Exception as e:
+            for r in requests:
+                r.error = e
+        finally:
+            for r in requests:
+                r.done.set()
+
+    @staticmethod
+    def _setting(value: Any, name: str, default: Any) -> Any:
+        return value if value is not None else getattr(settings, name, default)
+
+
+def _part_response(response: Dict[str, Any], text: str) -> Dict[str, Any]:
+    choice = response['choices'][0]
+    return {
+        'model': response.get('model'),
+        'choices': [{
+            'text': text,
+            'index': 0,
+            'finish_reason': choice.get('finish_reason'),
+        }],
+        'batched': True,
+    }
+
+
+# Shared batcher used by OpenAIClient
+micro_batcher = MicroBatcher()
@@ -0,0 +1,176 @@
+"""Token budgeting for AI prompts and completions.
+
+Prompts that interpolate whole histories grow without bound, and a fixed
+``max_tokens`` either truncates long outputs or reserves far more than short
+ones need. Each task therefore has a budget: how many prompt tokens it may
+send and how many completion tokens it is expected to produce. Prompt
+builders trim their variable inputs to fit, ``OpenAIClient`` derives
+``max_tokens`` from the expected output, and estimated vs actual usage is
+recorded per task so the budgets can be tuned.
+
+Token counts are estimated locally (roughly four characters per token for
+words, one per punctuation mark). It errs on the high side, which is the
+safe direction for budgeting, and needs no tokenizer dependency.
+"""
+
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from . import routing
+
+logger = logging.getLogger(__name__)
+
+_PIECE_RE = re.compile(r'\w+|[^\w\s]')
+
+
+@dataclass(frozen=True)
+class TaskBudget:
+    """Token limits for one task type."""
+    prompt_tokens: int
+    output_tokens: int
+
+
+DEFAULT_BUDGETS: Dict[str, TaskBudget] = {
+    routing.TERM_PLAN: TaskBudget(prompt_tokens=1500, output_tokens=1200),
+    routing.ASSESSMENT: TaskBudget(prompt_tokens=800, output_tokens=1000),
+    routing.ACTIVITIES: TaskBudget(prompt_tokens=800, output_tokens=900),
+    routing.PROGRESS_ANALYSIS: TaskBudget(prompt_tokens=1500, output_tokens=600),
+    routing.STUDENT_ANALYSIS: TaskBudget(prompt_tokens=600, output_tokens=400),
+    routing.ADMISSION_QUESTIONS: TaskBudget(prompt_tokens=500, output_tokens=1500),
+    routing.WORKLOAD_ANALYSIS: TaskBudget(prompt_tokens=1500, output_tokens=600),
+    routing.ANNOUNCEMENT_DRAFT: TaskBudget(prompt_tokens=500, output_tokens=500),
+    routing.DEFAULT_TASK: TaskBudget(prompt_tokens=2000, output_tokens=1000),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens ``text`` will use."""
+    return sum(
+        math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == '_' else 1
+        for piece in _PIECE_RE.findall(text)
+    )
+
+
+def get_budget(task: Optional[str]) -> TaskBudget:
+    """Return the budget for ``task``; AI_TOKEN_BUDGETS overrides the defaults.
+
+    AI_TOKEN_BUDGETS maps task names to ``(prompt_tokens, output_tokens)``.
+    """
+    task = task or routing.DEFAULT_TASK
+    override = getattr(settings, 'AI_TOKEN_BUDGETS', {}).get(task)
+    if override:
+        return TaskBudget(*override)
+    return DEFAULT_BUDGETS.get(task, DEFAULT_BUDGETS[routing.DEFAULT_TASK])
+
+
+def max_tokens_for(task: Optional[str]) -> int:
+    """Completion limit for ``task`` based on its expected output size."""
+    return get_budget(task).output_tokens
+
+
+def remaining_tokens(task: Optional[str], *fixed_parts: str) -> int:
+    """Prompt tokens left for variable inputs after the fixed template text."""
+    used = sum(estimate_tokens(part) for part in fixed_parts)
+    return max(0, get_budget(task).prompt_tokens - used)
+
+
+def trim_text(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to roughly ``max_tokens``, marking the cut."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        kept.append(word)
+    return ' '.join(kept) + ' [...]'
+
+
+def trim_lines(
+    lines: List[str],
+    max_tokens: int,
+    keep: str = 'last',
+    summarize: Optional[Callable[[List[str]], str]] = None
+) -> List[str]:
+    """Keep as many whole lines as fit in ``max_tokens``.
+
+    Args:
+        lines: Lines in chronological (or display) order
+        max_tokens: Token budget for the kept lines and the omission note
+        keep: 'last' keeps the most recent lines, 'first' the earliest
+        summarize: Optional one-line summary of the dropped lines, used in
+            place of the default omission note
+
+    Returns:
+        The kept lines, with a note describing what was dropped
+    """
+    if sum(estimate_tokens(line) for line in lines) <= max_tokens:
+        return list(lines)
+
+    ordered = list(reversed(lines)) if keep == 'last' else list(lines)
+    # Reserve room for the omission note
+    available = max_tokens - 20
+    kept = []
+    for line in ordered:
+        cost = estimate_tokens(line)
+        if cost > available:
+            break
+        kept.append(line)
+        available -= cost
+    dropped = ordered[len(kept):]
+    note = summarize(dropped) if summarize else f"({len(dropped)} entries omitted)"
+
+    if keep == 'last':
+        return [note] + list(reversed(kept))
+    return kept + [note]
+
+
+class UsageRecorder:
+    """Per-task counters comparing estimated and actual token usage."""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task: Optional[str], estimated_prompt: int, usage: Any) -> None:
+        """Record one call; ``usage`` is the response's usage block, if any."""
+        task = task or routing.DEFAULT_TASK
+        usage = usage if isinstance(usage, dict) else {}
+        with self._lock:
+            totals = self._totals.setdefault(task, {
+                'calls': 0, 'estimated_prompt_tokens': 0, 'prompt_tokens': 0,
+                'completion_tokens': 0, 'measured_calls': 0,
+            })
+            totals['calls'] += 1
+            if usage.get('prompt_tokens') is not None:
+                totals['measured_calls'] += 1
+                totals['estimated_prompt_tokens'] += estimated_prompt
+                totals['prompt_tokens'] += usage['prompt_tokens']
+                totals['completion_tokens'] += usage.get('completion_tokens') or 0
+
+        if estimated_prompt > get_budget(task).prompt_tokens:
+            logger.warning('Prompt for %s is over budget: ~%s tokens', task, estimated_prompt)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per task plus the actual/estimated prompt ratio."""
+        with self._lock:
+            stats = {task: dict(totals) for task, totals in self._totals.items()}
+        for totals in stats.values():
+            estimated = totals['estimated_prompt_tokens']
+            totals['estimate_ratio'] = totals['prompt_tokens'] / estimated if estimated else None
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+# Shared recorder used by OpenAIClient
+token_usage = UsageRecorder()
@@ -1,13 +1,41 @@
 """Educational AI services for curriculum and assessment."""
 
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime
+import json
 import logging
+import time
 from typing import Union
+from django.conf import settings
+from django.db import close_old_connections
+
+from joyland.cache_utils import prompt_tag, subject_tag, tag_versions, teacher_tag
+
+from . import offline, routing
+from .budget import remaining_tokens, trim_lines, trim_text
+from .progress_state import ProgressState
+from .result_store import AIResultStore
+from .similarity import semantic_cache
+from .streaming import IncrementalParser
+from .structured import complete_structured
 
 logger = logging.getLogger(__name__)
 
+ACTIVITY_LEVELS = ('support', 'standard', 'extension')
+
+# The response parsers make one pass over the stripped lines and dispatch on
+# the first character, so most lines cost a single comparison. Headings are
+# matched with ``line[:n].lower() == heading``, which agrees with
+# ``line.lower().startswith(heading)`` for these ASCII headings.
+_PROGRESS_HEADINGS = {
+    first: heading
+    for heading in ('mastered', 'growth', 'recommend')
+    for first in (heading[0], heading[0].upper())
+}
+
 @dataclass
 class LearningObjective:
     """A specific learning objective with assessment criteria."""
@@ -42,9 +70,24 @@ class StudentProgress:
 class EducationalAIService:
     """AI-powered educational planning and assessment service."""
     
-    def __init__(self, openai_client):
-        """Initialize with OpenAI client."""
+    def __init__(
+        self,
+        openai_client,
+        offline_fallback: bool = True,
+        teacher_id: Optional[int] = None
+    ):
+        """Initialize with OpenAI client.
+
+        With ``offline_fallback`` off, unavailability errors are handled like
+        any other failure instead of being answered from offline templates.
+        ``teacher_id`` names the teacher the results are for, so clearing
+        that teacher's cache also bypasses the stored generations.
+        """
         self.ai = openai_client
+        self.offline_fallback = offline_fallback
+        self.teacher_id = teacher_id
+        # Set once any result came from the offline templates instead of upstream
+        self.used_offline_fallback = False
     
     def generate_term_plan(
         self,
@@ -64,36 +107,32 @@ class EducationalAIService:
         Returns:
             List of learning objectives for the term
         """
-        # Build a detailed prompt for curriculum planning
-        context = {
-            'subject': subject,
-            'grade': grade_level,
-            'term': term,
-            'prior_learning': existing_objectives or []
-        }
-        
-        prompt = f"""Create a detailed term plan for {subject} ({grade_level} Grade, Term {term}).
-
-Previous Coverage:
-{chr(10).join('- ' + obj for obj in context['prior_learning']) if context['prior_learning'] else 'No prior objectives provided'}
-
-For each learning objective, provide:
-1. Clear description
-2. Key skills developed
-3. Specific assessment criteria
-4. Cross-curricular connections
-5. Progressive difficulty alignment
-
-Format each objective as:
-Description: (clear learning outcome)
-Skills: (comma-separated list)
-Assessment: (bullet points)
-"""
+        prompt = self._term_plan_prompt(subject, grade_level, term, existing_objectives)
         
         try:
-            response = self.ai.complete(prompt, temperature=0.7)
-            return self._parse_term_plan(response['choices'][0]['text'])
+            return self._complete_stored(
+                routing.TERM_PLAN,
+                self._term_plan_inputs(subject, grade_level, term, existing_objectives),
+                prompt,
+                parse=lambda text: self._parse_term_plan(text, subject, grade_level, term),
+                dump=lambda objectives: [asdict(obj) for obj in objectives],
+                load=lambda payload: [LearningObjective(**fields) for fields in payload],
+                schema='term_plan',
+                build=lambda data: [
+                    LearningObjective(
+                        description=fields['description'],
+                        subject_area=subject,
+                        grade_level=grade_level,
+                        assessment_criteria=fields.get('assessment_criteria', []),
+                        skills=fields.get('skills', []),
+                        term=term
+                    )
+                    for fields in data['objectives']
+                ]
+            )
         except Exception as e:
+            if self._use_offline(e):
+                return self._offline_term_plan(subject, grade_level, term, existing_objectives)
             logger.error('Failed to generate term plan', exc_info=e)
             return []
     
@@ -115,6 +154,359 @@ Assessment: (bullet points)
         """
         obj = self._ensure_objective(objective)
 
+        prompt = self._assessment_prompt(obj, assessment_type, student_level)
+
+        # Reuse results generated for near-identical objectives
+        inputs = self._assessment_inputs(obj, assessment_type, student_level)
+        bucket = self._semantic_bucket(
+            'assessment', obj.subject_area.lower(), obj.grade_level.lower(),
+            assessment_type, student_level
+        )
+        versions = tag_versions(self._store_tags(inputs))
+        cached = semantic_cache.lookup(bucket, obj.description, versions)
+        if cached is not None:
+            # The items were written for the matched objective; label them with this one
+            return [replace(item, learning_objective=obj.description) for item in cached]
+
+        try:
+            items = self._complete_stored(
+                routing.ASSESSMENT,
+                inputs,
+                prompt,
+                parse=lambda text: self._parse_assessment_items(text, obj),
+                dump=lambda parsed: [asdict(item) for item in parsed],
+                load=lambda payload: [AssessmentItem(**fields) for fields in payload],
+                schema='assessment',
+                build=lambda data: [
+                    AssessmentItem(
+                        subject=obj.subject_area,
+                        grade_level=obj.grade_level,
+                        learning_objective=obj.description,
+                        **{'rubric': {}, **fields}
+                    )
+                    for fields in data['items']
+                ]
+            )
+        except Exception as e:
+            if self._use_offline(e):
+                return self._offline_assessment(obj, assessment_type, student_level)
+            logger.error('Failed to generate assessment', exc_info=e)
+            return []
+
+        if items:
+            semantic_cache.store(bucket, obj.description, items, versions)
+        return items
+    
+    def stream_term_plan(
+        self,
+        subject: str,
+        grade_level: str,
+        term: int,
+        existing_objectives: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """Stream a term plan, yielding objectives as soon as they are complete.
+        
+        Yields:
+            ('token', text) for every streamed fragment and
+            ('objective', LearningObjective) whenever an objective block closes
+        """
+        inputs = self._term_plan_inputs(subject, grade_level, term, existing_objectives)
+        stored = AIResultStore.get(
+            routing.TERM_PLAN, self._model_key(), inputs, self._store_tags(inputs)
+        )
+        if stored is not None:
+            for fields in stored:
+                yield 'objective', LearningObjective(**fields)
+            return
+
+        prompt = self._term_plan_prompt(subject, grade_level, term, existing_objectives)
+        parser = IncrementalParser(
+            lambda block: self._parse_term_plan(block, subject, grade_level, term)
+        )
+        objectives, tokens = [], []
+        started = time.monotonic()
+        try:
+            for token in self.ai.stream_complete(prompt, temperature=0.7, task=routing.TERM_PLAN):
+                tokens.append(token)
+                yield 'token', token
+                for objective in parser.feed(token):
+                    objectives.append(objective)
+                    yield 'objective', objective
+        except Exception as e:
+            # Only substitute templates if nothing has been streamed yet
+            if tokens or not self._use_offline(e):
+                raise
+            offline_plan = self._offline_term_plan(subject, grade_level, term, existing_objectives)
+            for objective in offline_plan:
+                yield 'objective', objective
+            return
+        for objective in parser.close():
+            objectives.append(objective)
+            yield 'objective', objective
+
+        if objectives:
+            AIResultStore.save(
+                routing.TERM_PLAN, self._model_key(), inputs, ''.join(tokens),
+                [asdict(obj) for obj in objectives], latency=time.monotonic() - started
+            )
+
+    def stream_assessment(
+        self,
+        objective: Union[LearningObjective, dict, str],
+        assessment_type: str,
+        student_level: str = 'standard'
+    ) -> Iterator[Tuple[str, Any]]:
+        """Stream assessment items, yielding each as soon as it is complete.
+        
+        Yields:
+            ('token', text) for every streamed fragment and
+            ('item', AssessmentItem) whenever an item block closes
+        """
+        obj = self._ensure_objective(objective)
+        inputs = self._assessment_inputs(obj, assessment_type, student_level)
+        stored = AIResultStore.get(
+            routing.ASSESSMENT, self._model_key(), inputs, self._store_tags(inputs)
+        )
+        if stored is not None:
+            for fields in stored:
+                yield 'item', AssessmentItem(**fields)
+            return
+
+        prompt = self._assessment_prompt(obj, assessment_type, student_level)
+        parser = IncrementalParser(lambda block: self._parse_assessment_items(block, obj))
+        items, tokens = [], []
+        started = time.monotonic()
+        try:
+            for token in self.ai.stream_complete(prompt, temperature=0.7, task=routing.ASSESSMENT):
+                tokens.append(token)
+                yield 'token', token
+                for item in parser.feed(token):
+                    items.append(item)
+                    yield 'item', item
+        except Exception as e:
+            if tokens or not self._use_offline(e):
+                raise
+            for item in self._offline_assessment(obj, assessment_type, student_level):
+                yield 'item', item
+            return
+        for item in parser.close():
+            items.append(item)
+            yield 'item', item
+
+        if items:
+            AIResultStore.save(
+                routing.ASSESSMENT, self._model_key(), inputs, ''.join(tokens),
+                [asdict(item) for item in items], latency=time.monotonic() - started
+            )
+
+    def has_stored_term_plan(
+        self,
+        subject: str,
+        grade_level: str,
+        term: int,
+        existing_objectives: Optional[List[str]] = None
+    ) -> bool:
+        """Whether generate_term_plan would be served from the result store."""
+        inputs = self._term_plan_inputs(subject, grade_level, term, existing_objectives)
+        return AIResultStore.exists(
+            routing.TERM_PLAN, self._model_key(), inputs, self._store_tags(inputs)
+        )
+
+    def has_stored_assessment(
+        self,
+        objective: Union[LearningObjective, dict, str],
+        assessment_type: str,
+        student_level: str = 'standard'
+    ) -> bool:
+        """Whether generate_assessment would be served from the result store."""
+        inputs = self._assessment_inputs(
+            self._ensure_objective(objective), assessment_type, student_level
+        )
+        return AIResultStore.exists(
+            routing.ASSESSMENT, self._model_key(), inputs, self._store_tags(inputs)
+        )
+
+    def _use_offline(self, error: Exception) -> bool:
+        """Whether to answer from the offline templates after ``error``.
+
+        Offline results are never stored or cached, so the next request
+        goes upstream again.
+        """
+        if not self.offline_fallback or not offline.should_use_offline(error):
+            return False
+        logger.warning('AI service unavailable (%s); using offline templates', type(error).__name__)
+        self.used_offline_fallback = True
+        return True
+
+    def _offline_term_plan(
+        self,
+        subject: str,
+        grade_level: str,
+        term: int,
+        existing_objectives: Optional[List[str]]
+    ) -> List[LearningObjective]:
+        return [
+            LearningObjective(subject_area=subject, grade_level=grade_level, **fields)
+            for fields in offline.term_plan(subject, grade_level, term, existing_objectives)
+        ]
+
+    def _offline_assessment(
+        self,
+        obj: LearningObjective,
+        assessment_type: str,
+        student_level: str
+    ) -> List[AssessmentItem]:
+        return [
+            AssessmentItem(
+                subject=obj.subject_area,
+                grade_level=obj.grade_level,
+                learning_objective=obj.description,
+                **fields
+            )
+            for fields in offline.assessment(obj.description, assessment_type, student_level)
+        ]
+
+    def cache_identity(self) -> str:
+        """Configuration that distinguishes this service's cached results."""
+        return self._model_key()
+
+    def _model_key(self) -> str:
+        # Results are keyed on the client's configured model, not the routed one
+        return str(getattr(self.ai, 'model', ''))
+
+    def _semantic_bucket(self, kind: str, *context: Any) -> Tuple[Any, ...]:
+        # Near-duplicates are only reused for the same model and prompt version
+        return (kind, self._model_key(), prompt_tag(), *context)
+
+    def _store_tags(self, inputs: Dict[str, Any]) -> List[str]:
+        # Cache tags whose invalidation also retires the stored result
+        tags = [prompt_tag(), subject_tag(inputs.get('subject', ''))]
+        if self.teacher_id is not None:
+            tags.append(teacher_tag(self.teacher_id))
+        return tags
+
+    def _term_plan_inputs(
+        self,
+        subject: str,
+        grade_level: str,
+        term: int,
+        existing_objectives: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        return {
+            'subject': subject,
+            'grade': grade_level,
+            'term': term,
+            'existing': '|'.join(existing_objectives or []),
+        }
+
+    def _assessment_inputs(
+        self,
+        obj: LearningObjective,
+        assessment_type: str,
+        student_level: str
+    ) -> Dict[str, Any]:
+        return {
+            'objective': obj.description,
+            'subject': obj.subject_area,
+            'grade': obj.grade_level,
+            'assessment_type': assessment_type,
+            'level': student_level,
+        }
+
+    def _complete_stored(
+        self,
+        task: str,
+        inputs: Dict[str, Any],
+        prompt: str,
+        parse: Callable[[str], Any],
+        dump: Callable[[Any], Any] = lambda parsed: parsed,
+        load: Callable[[Any], Any] = lambda payload: payload,
+        keep: Callable[[Any], bool] = bool,
+        refresh: bool = False,
+        schema: Optional[str] = None,
+        build: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> Any:
+        """Return a stored generation, or complete ``prompt`` and store it.
+
+        Args:
+            task: Task type, used for routing and as part of the store key
+            inputs: Inputs that determine the generation
+            prompt: Prompt sent upstream on a store miss
+            parse: Turns completion text into the result
+            dump: Converts the result into a JSON-serializable payload
+            load: Rebuilds the result from a stored payload
+            keep: Whether a parsed result is worth storing
+            refresh: Skip the lookup and replace the stored result
+            schema: JSON output schema (see ``structured.SCHEMAS``)
+            build: Builds the result from a validated JSON reply
+        """
+        model = self._model_key()
+        stored = None
+        if not refresh:
+            stored = AIResultStore.get(task, model, inputs, self._store_tags(inputs))
+        if stored is not None:
+            return load(stored)
+
+        started = time.monotonic()
+        result, response = complete_structured(
+            self.ai.complete, prompt, schema, parse, build, temperature=0.7, task=task
+        )
+        text = response['choices'][0]['text']
+        if keep(result):
+            AIResultStore.save(
+                task, model, inputs, text, dump(result),
+                usage=response.get('usage'), latency=time.monotonic() - started,
+                replace=refresh
+            )
+        return result
+
+    def _term_plan_prompt(
+        self,
+        subject: str,
+        grade_level: str,
+        term: int,
+        existing_objectives: Optional[List[str]] = None
+    ) -> str:
+        """Build the curriculum planning prompt."""
+        # Build a detailed prompt for curriculum planning; only the most
+        # recent prior objectives are kept if they exceed the budget
+        context = {
+            'subject': subject,
+            'grade': grade_level,
+            'term': term,
+            'prior_learning': trim_lines(
+                ['- ' + obj for obj in existing_objectives or []],
+                remaining_tokens(routing.TERM_PLAN) - 200
+            )
+        }
+        prior = '\n'.join(context['prior_learning']) or 'No prior objectives provided'
+        
+        prompt = f"""Create a detailed term plan for {subject} ({grade_level} Grade, Term {term}).
+
+Previous Coverage:
+{prior}
+
+For each learning objective, provide:
+1. Clear description
+2. Key skills developed
+3. Specific assessment criteria
+4. Cross-curricular connections
+5. Progressive difficulty alignment
+
+Format each objective as:
+Description: (clear learning outcome)
+Skills: (comma-separated list)
+Assessment: (bullet points)
+"""
+        return prompt
+
+    def _assessment_prompt(
+        self,
+        obj: LearningObjective,
+        assessment_type: str,
+        student_level: str
+    ) -> str:
+        """Build the assessment generation prompt."""
         prompt = f"""Create {assessment_type} assessment items for:
         Subject: {obj.subject_area}
         Grade: {obj.grade_level}
@@ -134,13 +526,7 @@ Assessment: (bullet points)
         - Allow demonstration of understanding
         - Support meaningful feedback
         """
-
-        try:
-            response = self.ai.complete(prompt, temperature=0.7)
-            return self._parse_assessment_items(response['choices'][0]['text'])
-        except Exception as e:
-            logger.error('Failed to generate assessment', exc_info=e)
-            return []
+        return prompt
     
     def analyze_student_progress(
         self,
@@ -158,61 +544,235 @@ Assessment: (bullet points)
         Returns:
             StudentProgress with analysis and recommendations
         """
-        # Format student data for analysis
-        data_points = [
-            f"Assessment {idx}: {result['score']}/{result['max']} - {result['notes']}"
-            for idx, result in enumerate(student_data.get('assessments', []), 1)
-        ]
+        assessments = student_data.get('assessments', [])
+        notes = student_data.get('teacher_notes', 'No notes provided')
+        student_id = student_data['student_id']
+
+        # Only what changed since the last analysis is sent upstream
+        state = ProgressState.load(student_id, subject_area, timeframe)
+        delta = None
+        if state is not None:
+            if state.unchanged(assessments, notes):
+                return StudentProgress(**state.analysis)
+            delta = state.delta(assessments)
+
+        if delta is not None:
+            prompt = self._progress_prompt(
+                subject_area, timeframe, delta, notes,
+                previous=state.analysis, first_number=state.assessment_count + 1
+            )
+        else:
+            prompt = self._progress_prompt(subject_area, timeframe, assessments, notes)
+        
+        try:
+            progress, _ = complete_structured(
+                self.ai.complete, prompt, 'progress_analysis',
+                parse_text=lambda text: self._parse_progress_analysis(
+                    text, student_id, subject_area
+                ),
+                build=lambda data: StudentProgress(
+                    student_id=student_id, subject=subject_area, recent_assessments=[], **data
+                ),
+                temperature=0.7, task=routing.PROGRESS_ANALYSIS
+            )
+        except Exception as e:
+            logger.error('Failed to analyze student progress', exc_info=e)
+            return self._failed_progress(student_id, subject_area)
+
+        if progress.objectives_mastered or progress.areas_for_growth or progress.recommendations:
+            ProgressState.save(
+                student_id, subject_area, timeframe, assessments, notes, asdict(progress)
+            )
+        return progress
+
+    def analyze_class_progress(
+        self,
+        students_data: List[Dict[str, Any]],
+        subject_area: str,
+        timeframe: str = 'term',
+        max_workers: Optional[int] = None
+    ) -> Iterator[StudentProgress]:
+        """Analyze a whole class, yielding each student as soon as they are done.
+        
+        Students whose history is unchanged since their last analysis are
+        served from the stored state without an upstream call.
         
-        prompt = f"""Analyze student progress in {subject_area} over {timeframe}:
+        Args:
+            students_data: Performance data per student (as for
+                analyze_student_progress)
+            subject_area: Subject to analyze
+            timeframe: Analysis period ('term', 'year')
+            max_workers: Analyses in flight at once
+                (default AI_CLASS_ANALYSIS_CONCURRENCY)
+            
+        Yields:
+            StudentProgress per student, in completion order
+        """
+        if not students_data:
+            return
+        workers = max_workers or getattr(settings, 'AI_CLASS_ANALYSIS_CONCURRENCY', 4)
 
-Assessment History:
-{chr(10).join(data_points)}
+        def analyze(student_data: Dict[str, Any]) -> StudentProgress:
+            try:
+                return self.analyze_student_progress(student_data, subject_area, timeframe)
+            except Exception as e:
+                logger.error('Failed to analyze student progress', exc_info=e)
+                return self._failed_progress(student_data.get('student_id'), subject_area)
+            finally:
+                close_old_connections()
 
-Prior Teacher Notes:
-{student_data.get('teacher_notes', 'No notes provided')}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(students_data))))
+        futures = [executor.submit(analyze, student_data) for student_data in students_data]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Stop queued analyses if the consumer goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
 
-Provide:
+    @staticmethod
+    def summarize_class_progress(results: List[StudentProgress], top: int = 5) -> Dict[str, Any]:
+        """Class-level aggregates over individual progress analyses.
+        
+        Args:
+            results: Analyses for the students in the class
+            top: How many common objectives and growth areas to report
+            
+        Returns:
+            Dictionary with student counts and the most common mastered
+            objectives and growth areas
+        """
+        analysed = [r for r in results if r.objectives_mastered or r.areas_for_growth]
+        mastered = Counter(item for r in analysed for item in r.objectives_mastered)
+        growth = Counter(item for r in analysed for item in r.areas_for_growth)
+        return {
+            'students': len(results),
+            'analysed': len(analysed),
+            'failed': len(results) - len(analysed),
+            'common_mastered': [
+                {'objective': item, 'students': count} for item, count in mastered.most_common(top)
+            ],
+            'common_growth_areas': [
+                {'area': item, 'students': count} for item, count in growth.most_common(top)
+            ],
+            'needs_support': sorted(
+                str(r.student_id) for r in analysed
+                if len(r.areas_for_growth) > len(r.objectives_mastered)
+            ),
+        }
+
+    @staticmethod
+    def _failed_progress(student_id: str, subject_area: str) -> StudentProgress:
+        return StudentProgress(
+            student_id=student_id,
+            subject=subject_area,
+            objectives_mastered=[],
+            areas_for_growth=[],
+            recent_assessments=[],
+            recommendations=['Analysis failed - please review manually']
+        )
+
+    def _progress_prompt(
+        self,
+        subject_area: str,
+        timeframe: str,
+        assessments: List[Dict[str, Any]],
+        notes: str,
+        previous: Optional[Dict[str, Any]] = None,
+        first_number: int = 1
+    ) -> str:
+        """Build a full or incremental progress analysis prompt.
+
+        Args:
+            assessments: The whole history, or only the new assessments when
+                ``previous`` is given
+            previous: The last analysis (StudentProgress fields) to update
+            first_number: Number of the first assessment in ``assessments``
+        """
+        data_points = [
+            f"Assessment {idx}: {result['score']}/{result['max']} - {result['notes']}"
+            for idx, result in enumerate(assessments, first_number)
+        ] or ['No new assessments']
+        instructions = """Provide:
 1. Mastered learning objectives
 2. Areas needing development
 3. Specific support recommendations
 4. Next steps for extension
 5. Learning strategy suggestions
 """
-        
-        try:
-            response = self.ai.complete(prompt, temperature=0.7)
-            return self._parse_progress_analysis(
-                response['choices'][0]['text'],
-                student_data['student_id'],
-                subject_area
-            )
-        except Exception as e:
-            logger.error('Failed to analyze student progress', exc_info=e)
-            return StudentProgress(
-                student_id=student_data['student_id'],
-                subject=subject_area,
-                objectives_mastered=[],
-                areas_for_growth=[],
-                recent_assessments=[],
-                recommendations=['Analysis failed - please review manually']
+        # Keep the prompt within budget: notes and the previous analysis get
+        # a quarter each, assessments the rest
+        available = remaining_tokens(routing.PROGRESS_ANALYSIS, instructions) - 60
+        share = available // 4
+        notes = trim_text(notes, share)
+
+        if previous is None:
+            data_points = trim_lines(
+                data_points,
+                available - share,
+                summarize=lambda dropped: self._summarize_assessments(assessments[:len(dropped)])
             )
-    
+            return f"""Analyze student progress in {subject_area} over {timeframe}:
+
+Assessment History:
+{chr(10).join(data_points)}
+
+Prior Teacher Notes:
+{notes}
+
+{instructions}"""
+
+        summary = trim_text('\n'.join([
+            'Mastered: ' + '; '.join(previous.get('objectives_mastered', [])),
+            'Growth: ' + '; '.join(previous.get('areas_for_growth', [])),
+            'Recommendations: ' + '; '.join(previous.get('recommendations', [])),
+        ]), share)
+        data_points = trim_lines(data_points, available - 2 * share)
+        return f"""Update this student's progress analysis in {subject_area} over {timeframe}.
+
+Previous Analysis (assessments 1-{first_number - 1}):
+{summary}
+
+New Assessments:
+{chr(10).join(data_points)}
+
+Current Teacher Notes:
+{notes}
+
+Give the complete updated analysis.
+{instructions}"""
+
+    @staticmethod
+    def _summarize_assessments(assessments: List[Dict[str, Any]]) -> str:
+        """One line standing in for assessments dropped from a prompt."""
+        scored = [a for a in assessments if a.get('max')]
+        if not scored:
+            return f"({len(assessments)} earlier assessments omitted)"
+        average = sum(a['score'] / a['max'] for a in scored) / len(scored)
+        return f"({len(assessments)} earlier assessments omitted; average score {average:.0%})"
+
     def generate_differentiated_activities(
         self,
         objective: Union[LearningObjective, dict, str],
-        class_profile: Dict[str, int]  # level -> number of students
+        class_profile: Dict[str, int],  # level -> number of students
+        fan_out: Optional[bool] = None
     ) -> Dict[str, List[str]]:
         """Generate differentiated learning activities.
         
         Args:
             objective: Learning objective to address
             class_profile: Distribution of student levels
+            fan_out: Request each level separately and concurrently instead
+                of in one long completion (default AI_ACTIVITIES_FAN_OUT)
             
         Returns:
             Dictionary of activities by level
         """
         obj = self._ensure_objective(objective)
+        if fan_out is None:
+            fan_out = getattr(settings, 'AI_ACTIVITIES_FAN_OUT', False)
+        if fan_out:
+            return self._generate_activities_by_level(obj, class_profile)
 
         prompt = f"""Create differentiated activities for:
         Objective: {obj.description}
@@ -236,74 +796,208 @@ Provide:
         - Support different learning styles
         """
 
+        inputs = {
+            'objective': obj.description,
+            'subject': obj.subject_area,
+            'grade': obj.grade_level,
+            'class_profile': json.dumps(class_profile, sort_keys=True),
+        }
+        bucket = self._semantic_bucket(
+            'activities', obj.subject_area.lower(), obj.grade_level.lower(),
+            tuple(sorted(class_profile.items()))
+        )
+        versions = tag_versions(self._store_tags(inputs))
+        cached = semantic_cache.lookup(bucket, obj.description, versions)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.ai.complete(prompt, temperature=0.7)
-            return self._parse_activities(response['choices'][0]['text'])
+            activities = self._complete_stored(
+                routing.ACTIVITIES,
+                inputs,
+                prompt,
+                parse=self._parse_activities,
+                keep=lambda parsed: any(parsed.values()),
+                schema='activities'
+            )
         except Exception as e:
+            if self._use_offline(e):
+                return offline.activities(obj.description)
             logger.error('Failed to generate activities', exc_info=e)
             return {
                 'support': ['Activity generation failed - please plan manually'],
                 'standard': ['Activity generation failed - please plan manually'],
                 'extension': ['Activity generation failed - please plan manually']
             }
+
+        if any(activities.values()):
+            semantic_cache.store(bucket, obj.description, activities, versions)
+        return activities
     
-    def _parse_term_plan(self, text: str) -> List[LearningObjective]:
+    def generate_level_activities(
+        self,
+        objective: Union[LearningObjective, dict, str],
+        level: str,
+        student_count: int = 0,
+        refresh: bool = False
+    ) -> List[str]:
+        """Generate activities for a single differentiation level.
+        
+        Each level is stored independently, so one level can be regenerated
+        without touching the others.
+        
+        Args:
+            objective: Learning objective to address
+            level: 'support', 'standard' or 'extension'
+            student_count: Students working at this level
+            refresh: Ignore any stored result and generate a new one
+            
+        Returns:
+            Activities for the level
+        """
+        obj = self._ensure_objective(objective)
+        prompt = f"""Create activities for {level}-level students:
+        Objective: {obj.description}
+        Subject: {obj.subject_area}
+        Grade: {obj.grade_level}
+        Students at this level: {student_count}
+
+        Provide 2-3 specific activities, one per line starting with '-'.
+        For each include success criteria, required resources, time
+        estimation and key teaching points.
+        """
+        try:
+            return self._complete_stored(
+                routing.ACTIVITIES,
+                {
+                    'objective': obj.description,
+                    'subject': obj.subject_area,
+                    'grade': obj.grade_level,
+                    'level': level,
+                    'students': student_count,
+                },
+                prompt,
+                parse=lambda text: [
+                    line.strip().lstrip('- ') for line in text.split('\n')
+                    if line.strip().startswith('-')
+                ],
+                refresh=refresh,
+                schema='level_activities',
+                build=lambda data: data['activities']
+            )
+        except Exception as e:
+            if self._use_offline(e):
+                return offline.activities(obj.description, [level])[level]
+            raise
+
+    def _generate_activities_by_level(
+        self,
+        obj: LearningObjective,
+        class_profile: Dict[str, int]
+    ) -> Dict[str, List[str]]:
+        """Fan out one request per level and merge the results."""
+        def level_activities(level: str) -> List[str]:
+            try:
+                return self.generate_level_activities(obj, level, class_profile.get(level, 0))
+            except Exception as e:
+                logger.error('Failed to generate %s activities', level, exc_info=e)
+                return ['Activity generation failed - please plan manually']
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=len(ACTIVITY_LEVELS)) as executor:
+            results = executor.map(level_activities, ACTIVITY_LEVELS)
+            return dict(zip(ACTIVITY_LEVELS, results))
+
+    def _parse_term_plan(
+        self,
+        text: str,
+        subject: str = '',
+        grade_level: str = '',
+        term: Optional[int] = None
+    ) -> List[LearningObjective]:
         """Parse AI response into learning objectives."""
         objectives = []
         current_obj = {}
+
+        def finish(fields: Dict[str, Any]) -> LearningObjective:
+            fields.setdefault('skills', [])
+            fields.setdefault('assessment_criteria', [])
+            return LearningObjective(
+                subject_area=subject, grade_level=grade_level, term=term, **fields
+            )
         
-        for line in text.split('\n'):
-            line = line.strip()
+        for line in map(str.strip, text.split('\n')):
             if not line:
                 if current_obj.get('description'):
-                    objectives.append(LearningObjective(**current_obj))
+                    objectives.append(finish(current_obj))
                     current_obj = {}
                 continue
-                
-            if line.startswith('Description:'):
-                current_obj['description'] = line.split(':', 1)[1].strip()
-            elif line.startswith('Skills:'):
-                current_obj['skills'] = [
-                    s.strip() 
-                    for s in line.split(':', 1)[1].split(',')
-                ]
-            elif line.startswith('Assessment:'):
-                current_obj['assessment_criteria'] = []
-            elif line.startswith('-') and 'assessment_criteria' in current_obj:
-                current_obj['assessment_criteria'].append(line.lstrip('- '))
+
+            head = line[0]
+            if head == '-':
+                if 'assessment_criteria' in current_obj:
+                    current_obj['assessment_criteria'].append(line.lstrip('- '))
+            elif head == 'D':
+                if line.startswith('Description:'):
+                    current_obj['description'] = line[12:].strip()
+            elif head == 'S':
+                if line.startswith('Skills:'):
+                    current_obj['skills'] = [s.strip() for s in line[7:].split(',')]
+            elif head == 'A':
+                if line.startswith('Assessment:'):
+                    current_obj['assessment_criteria'] = []
         
         # Don't forget the last one
         if current_obj.get('description'):
-            objectives.append(LearningObjective(**current_obj))
+            objectives.append(finish(current_obj))
         
         return objectives
     
-    def _parse_assessment_items(self, text: str) -> List[AssessmentItem]:
+    def _parse_assessment_items(
+        self,
+        text: str,
+        objective: Optional[LearningObjective] = None
+    ) -> List[AssessmentItem]:
         """Parse AI response into assessment items."""
         items = []
         current_item = {}
+
+        def finish(fields: Dict[str, Any]) -> AssessmentItem:
+            fields.setdefault('rubric', {})
+            return AssessmentItem(
+                subject=objective.subject_area if objective else '',
+                grade_level=objective.grade_level if objective else '',
+                learning_objective=objective.description if objective else '',
+                **fields
+            )
         
-        for line in text.split('\n'):
-            line = line.strip()
+        for line in map(str.strip, text.split('\n')):
             if not line:
                 if current_item.get('question'):
-                    items.append(AssessmentItem(**current_item))
+                    items.append(finish(current_item))
                     current_item = {}
                 continue
-                
-            if line.startswith('Question:'):
-                current_item['question'] = line.split(':', 1)[1].strip()
-            elif line.startswith('Rubric:'):
-                current_item['rubric'] = {}
-            elif line.startswith('Sample:'):
-                current_item['sample_answer'] = line.split(':', 1)[1].strip()
-            elif line.startswith('-') and 'rubric' in current_item:
-                score, criteria = line.lstrip('- ').split(':', 1)
-                current_item['rubric'][score.strip()] = criteria.strip()
+
+            head = line[0]
+            if head == '-':
+                if 'rubric' in current_item:
+                    score, colon, criteria = line.lstrip('- ').partition(':')
+                    if colon:
+                        current_item['rubric'][score.strip()] = criteria.strip()
+            elif head == 'Q':
+                if line.startswith('Question:'):
+                    current_item['question'] = line[9:].strip()
+            elif head == 'R':
+                if line.startswith('Rubric:'):
+                    current_item['rubric'] = {}
+            elif head == 'S':
+                if line.startswith('Sample:'):
+                    current_item['sample_answer'] = line[7:].strip()
         
         # Don't forget the last one
         if current_item.get('question'):
-            items.append(AssessmentItem(**current_item))
+            items.append(finish(current_item))
         
         return items
     
@@ -314,32 +1008,26 @@ Provide:
         subject: str
     ) -> StudentProgress:
         """Parse AI response into student progress analysis."""
-        mastered = []
-        growth = []
-        recommendations = []
+        sections = {'mastered': [], 'growth': [], 'recommend': []}
         current_section = None
         
-        for line in text.split('\n'):
-            line = line.strip()
+        for line in map(str.strip, text.split('\n')):
             if not line:
                 continue
-                
-            if line.lower().startswith('mastered'):
-                current_section = mastered
-            elif line.lower().startswith('growth'):
-                current_section = growth
-            elif line.lower().startswith('recommend'):
-                current_section = recommendations
-            elif line.startswith('-') and current_section is not None:
+
+            heading = _PROGRESS_HEADINGS.get(line[0])
+            if heading and line[:len(heading)].lower() == heading:
+                current_section = sections[heading]
+            elif line[0] == '-' and current_section is not None:
                 current_section.append(line.lstrip('- '))
         
         return StudentProgress(
             student_id=student_id,
             subject=subject,
-            objectives_mastered=mastered,
-            areas_for_growth=growth,
+            objectives_mastered=sections['mastered'],
+            areas_for_growth=sections['growth'],
             recent_assessments=[],  # Would come from actual assessment data
-            recommendations=recommendations
+            recommendations=sections['recommend']
         )
     
     def _parse_activities(self, text: str) -> Dict[str, List[str]]:
@@ -351,19 +1039,22 @@ Provide:
         }
         current_level = None
         
-        for line in text.split('\n'):
-            line = line.strip()
+        for line in map(str.strip, text.split('\n')):
             if not line:
                 continue
-                
-            if line.lower().startswith('support'):
-                current_level = 'support'
-            elif line.lower().startswith('standard'):
-                current_level = 'standard'
-            elif line.lower().startswith('extension'):
+
+            head = line[0]
+            if head == '-':
+                if current_level:
+                    activities[current_level].append(line.lstrip('- '))
+            elif head in 'sS':
+                prefix = line[:8].lower()
+                if prefix.startswith('support'):
+                    current_level = 'support'
+                elif prefix == 'standard':
+                    current_level = 'standard'
+            elif head in 'eE' and line[:9].lower() == 'extension':
                 current_level = 'extension'
-            elif line.startswith('-') and current_level:
-                activities[current_level].append(line.lstrip('- '))
         
         return activities
 
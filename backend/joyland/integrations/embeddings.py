@@ -0,0 +1,250 @@
+"""Persistent embedding store for objectives, assessment items and announcements.
+
+Vectors live in a memory-mapped float32 matrix (``<name>.f32``) next to a
+JSON id map (``<name>.json``) recording each id's row and a hash of the text
+it was embedded from. Opening a store maps the file rather than reading it,
+so similarity features are available instantly at worker start, and
+``upsert`` only sends new or changed texts to the API, batched into as few
+embedding requests as possible.
+
+Vectors are L2-normalized on write, so similarity search is a single
+vectorised dot product over the matrix.
+
+Writes are not coordinated across processes; populate the store from one
+process (e.g. ``manage.py build_embeddings``) and read it everywhere.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVE = 'objective'
+ASSESSMENT_ITEM = 'assessment_item'
+ANNOUNCEMENT = 'announcement'
+
+
+def item_id(kind: str, key: Union[str, int]) -> str:
+    """Build a namespaced store id such as ``announcement:42``."""
+    return f"{kind}:{key}"
+
+
+class EmbeddingStore:
+    """Memory-mapped matrix of unit-length embedding vectors keyed by id."""
+
+    def __init__(
+        self,
+        path: Union[str, Path, None] = None,
+        name: str = 'default',
+        dim: Optional[int] = None,
+        client=None
+    ):
+        """Open (or create) a store.
+
+        Args:
+            path: Directory holding the store files (default AI_EMBEDDING_DIR)
+            name: Store name, used as the file stem
+            dim: Embedding width (default AI_EMBEDDING_DIM)
+            client: OpenAIClient used to embed texts; created lazily if omitted
+        """
+        self.path = Path(path or settings.AI_EMBEDDING_DIR)
+        self.name = name
+        self.dim = dim or getattr(settings, 'AI_EMBEDDING_DIM', 1536)
+        self._client = client
+        self._lock = threading.Lock()
+
+        self._matrix_path = self.path / f"{name}.f32"
+        self._meta_path = self.path / f"{name}.json"
+        self._ids: Dict[str, List] = {}  # id -> [row, text hash]
+        self._free: List[int] = []
+        self._count = 0
+        self._matrix: Optional[np.memmap] = None
+        self._load()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .openai import OpenAIClient
+            self._client = OpenAIClient()
+        return self._client
+
+    @property
+    def model(self) -> str:
+        return getattr(settings, 'OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def keys(self, kind: Optional[str] = None) -> List[str]:
+        """Return stored ids, optionally only those of one kind."""
+        prefix = f"{kind}:" if kind else ''
+        return [key for key in self._ids if key.startswith(prefix)]
+
+    def upsert(self, items: Dict[str, str], batch_size: int = 100) -> int:
+        """Embed and store texts whose content changed since last time.
+
+        Args:
+            items: Mapping of store id to text
+            batch_size: Maximum texts per embedding request
+
+        Returns:
+            Number of texts actually sent for embedding
+        """
+        stale = {
+            key: text for key, text in items.items()
+            if self._ids.get(key, [None, None])[1] != self._text_hash(text)
+        }
+        if not stale:
+            return 0
+
+        keys = list(stale)
+        vectors = np.asarray(
+            self.client.embed_many([stale[k] for k in keys], batch_size=batch_size),
+            dtype=np.float32
+        )
+        if vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding width {vectors.shape[1]} does not match store width {self.dim}"
+            )
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                row = self._row_for(key)
+                self._matrix[row] = vector
+                self._ids[key] = [row, self._text_hash(stale[key])]
+            self._save()
+
+        logger.info('Embedded %s of %s texts into store %s', len(keys), len(items), self.name)
+        return len(keys)
+
+    def remove(self, key: str) -> None:
+        """Drop an id; its row is reused by a later upsert."""
+        with self._lock:
+            entry = self._ids.pop(key, None)
+            if entry is None:
+                return
+            self._matrix[entry[0]] = 0
+            self._free.append(entry[0])
+            self._save()
+
+    def vector(self, key: str) -> Optional[np.ndarray]:
+        """Return the stored unit vector for ``key``."""
+        entry = self._ids.get(key)
+        if entry is None:
+            return None
+        return np.array(self._matrix[entry[0]])
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 5,
+        kind: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Return the ``k`` stored ids most similar to ``query``.
+
+        Args:
+            query: Text (embedded with one API call) or a query vector
+            k: Number of results
+            kind: Restrict results to ids with this prefix (e.g. OBJECTIVE)
+
+        Returns:
+            List of (id, cosine similarity), most similar first
+        """
+        if not self._ids:
+            return []
+        if isinstance(query, str):
+            query = np.asarray(self.client.embed_many([query])[0], dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        rows, keys = [], []
+        prefix = f"{kind}:" if kind else ''
+        for key, (row, _) in self._ids.items():
+            if key.startswith(prefix):
+                rows.append(row)
+                keys.append(key)
+        if not rows:
+            return []
+
+        scores = self._matrix[np.asarray(rows)] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(keys[i], float(scores[i])) for i in top]
+
+    def _text_hash(self, text: str) -> str:
+        # The model is part of the hash so switching models re-embeds
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def _row_for(self, key: str) -> int:
+        if key in self._ids:
+            return self._ids[key][0]
+        if self._free:
+            return self._free.pop()
+        row = self._count
+        self._count += 1
+        self._ensure_capacity(self._count)
+        return row
+
+    def _load(self) -> None:
+        if self._meta_path.exists() and self._matrix_path.exists():
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta['dim'] != self.dim:
+                raise ValueError(
+                    f"Store {self.name} has width {meta['dim']}, expected {self.dim}"
+                )
+            self._ids = meta['ids']
+            self._free = meta['free']
+            self._count = meta['count']
+            capacity = os.path.getsize(self._matrix_path) // (4 * self.dim)
+            self._matrix = np.memmap(
+                self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim)
+            )
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._ensure_capacity(64)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._matrix_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._matrix = np.memmap(
+            self._matrix_path, dtype=np.float32, mode='r+', shape=(new_capacity, self.dim)
+        )
+
+    def _save(self) -> None:
+        self._matrix.flush()
+        tmp_path = self._meta_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'dim': self.dim,
+                'count': self._count,
+                'ids': self._ids,
+                'free': self._free,
+            }, f)
+        os.replace(tmp_path, self._meta_path)
+
+
+@lru_cache(maxsize=None)
+def get_embedding_store(name: str = 'default') -> EmbeddingStore:
+    """Return the process-wide store for ``name``."""
+    return EmbeddingStore(name=name)
@@ -0,0 +1,460 @@
+"""Local stand-in for the OpenAI HTTP API, for load tests without a key.
+
+``manage.py run_fake_openai`` serves the legacy completion and embedding
+endpoints that ``OpenAIClient`` calls; set ``OPENAI_API_BASE`` to point the
+client at it. Responses are generated offline:
+
+* completions are shaped like real replies for each prompt this project
+  sends (term plans, assessments, analyses, ...), so the parsers produce
+  results; prompts asking for JSON get an object of the requested shape, and
+  micro-batched prompts get one marked answer per request;
+* canned replies can be supplied as a mapping of prompt substring to text;
+* embeddings are bag-of-words hash vectors, so similar texts get similar
+  vectors;
+* ``stream=True`` is served as server-sent events, one chunk per word.
+
+Latency and failures are drawn from configurable distributions so worker
+saturation, retries, the circuit breaker and timeouts can be exercised
+deterministically (given a seed). ``GET /_stats`` reports request counts and
+peak concurrency.
+
+Latency specs: ``0.2`` or ``fixed:0.2``, ``uniform:LOW,HIGH``,
+``normal:MEAN,SD``, ``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN``, all
+in seconds. Error specs are comma-separated ``KIND:RATE`` pairs where KIND is
+an HTTP status (``429``, ``500``, ``503``, ...), ``timeout`` (hang for the
+configured time before answering) or ``disconnect`` (close without a reply).
+"""
+
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .batching import BATCH_INSTRUCTIONS
+from .budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+Sampler = Callable[[random.Random], float]
+
+_REQUEST_RE = re.compile(r'^### REQUEST (\d+)\n', re.MULTILINE)
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_JSON_MARKER = 'shaped like:\n'
+_WORDS = (
+    'students explore worked examples compare methods explain reasoning practise '
+    'key vocabulary apply skills to real contexts review feedback in pairs'
+).split()
+
+ERROR_TYPES = {
+    401: 'invalid_request_error',
+    429: 'rate_limit_error',
+    500: 'server_error',
+    502: 'server_error',
+    503: 'server_error',
+}
+
+
+def parse_latency(spec: str) -> Sampler:
+    """Turn a latency spec (see the module docstring) into a sampler."""
+    kind, _, args = spec.partition(':') if ':' in spec else ('fixed', '', spec)
+    try:
+        values = [float(value) for value in args.split(',')]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec: {spec!r}") from None
+
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(*values))
+    if kind == 'lognormal' and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    if kind == 'exponential' and len(values) == 1:
+        return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Invalid latency spec: {spec!r}")
+
+
+def parse_errors(spec: str) -> List[Tuple[str, float]]:
+    """Turn an error spec like ``429:0.05,timeout:0.01`` into (kind, rate) pairs."""
+    errors = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        kind, _, rate = part.partition(':')
+        if not (kind.isdigit() or kind in ('timeout', 'disconnect')):
+            raise ValueError(f"Unknown error kind: {kind!r}")
+        try:
+            errors.append((kind, float(rate)))
+        except ValueError:
+            raise ValueError(f"Invalid error rate in {part!r}") from None
+    if sum(rate for _, rate in errors) > 1:
+        raise ValueError('Error rates add up to more than 1')
+    return errors
+
+
+@dataclass
+class FakeOpenAIConfig:
+    """Behaviour of a FakeOpenAIServer."""
+    latency: str = '0'                 # Time to first byte
+    stream_latency: str = '0'          # Delay between streamed chunks
+    errors: str = ''                   # Injected failures, e.g. '429:0.05,500:0.01'
+    hang: float = 30.0                 # Seconds a 'timeout' failure stalls
+    seed: Optional[int] = None         # Makes latencies and failures repeatable
+    canned: Dict[str, str] = field(default_factory=dict)  # Prompt substring -> reply
+    embedding_dim: int = 1536
+    require_key: bool = False          # Answer 401 without a bearer token
+
+
+# Replies per prompt this project sends, keyed on how the prompt starts
+
+
+def _phrase(rng: random.Random, words: int = 6) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def _term_plan(rng: random.Random) -> str:
+    return '\n\n'.join(
+        f"Description: {_phrase(rng)}\n"
+        f"Skills: {_phrase(rng, 2)}, {_phrase(rng, 2)}\n"
+        f"Assessment:\n- {_phrase(rng)}\n- {_phrase(rng)}"
+        for _ in range(4)
+    )
+
+
+def _assessment(rng: random.Random) -> str:
+    return '\n\n'.join(
+        f"Question: {_phrase(rng, 8)}?\n"
+        f"Rubric:\n- 1: {_phrase(rng)}\n- 3: {_phrase(rng)}\n- 5: {_phrase(rng)}\n"
+        f"Sample: {_phrase(rng, 10)}"
+        for _ in range(3)
+    )
+
+
+def _sections(rng: random.Random, *headings: str) -> str:
+    return '\n\n'.join(
+        f"{heading}:\n" + '\n'.join(f"- {_phrase(rng)}" for _ in range(2))
+        for heading in headings
+    )
+
+
+def _admission_questions(rng: random.Random) -> str:
+    return '\n\n'.join(
+        f"Subject: {rng.choice(['Mathematics', 'English', 'Science'])}\n"
+        f"Question: {_phrase(rng, 8)}?\n"
+        f"Learning Outcome: {_phrase(rng)}\n"
+        f"Scoring: 1-5 points"
+        for _ in range(3)
+    )
+
+
+def _student_analysis(rng: random.Random) -> str:
+    return (
+        f"Recommended class level: Grade {rng.randint(1, 12)}\n"
+        f"Learning style: {rng.choice(['visual', 'auditory', 'kinaesthetic'])}\n"
+        + _sections(rng, 'Academic interests', 'Support needs')
+    )
+
+
+def _differentiated_activities(rng: random.Random) -> str:
+    return _sections(rng, 'Support', 'Standard', 'Extension')
+
+
+def _progress_analysis(rng: random.Random) -> str:
+    return _sections(rng, 'Mastered', 'Growth', 'Recommendations')
+
+
+def _workload_analysis(rng: random.Random) -> str:
+    return (
+        f"Total hours: {rng.randint(18, 40)} per week\n"
+        f"Warning: {_phrase(rng)}\n"
+        f"Recommendation: {_phrase(rng)}\n"
+        f"Recommendation: {_phrase(rng)}"
+    )
+
+
+TEMPLATES: List[Tuple[str, Callable[[random.Random], str]]] = [
+    ('Create a detailed term plan', _term_plan),
+    ('Create differentiated activities', _differentiated_activities),
+    ('Create activities for', lambda rng: '\n'.join(f"- {_phrase(rng, 8)}" for _ in range(3))),
+    ('Create age-appropriate', _admission_questions),
+    ('Create a school announcement', lambda rng: _phrase(rng, 40) + '.'),
+    ('Create', _assessment),
+    ('Analyze student progress', _progress_analysis),
+    ("Update this student's progress", _progress_analysis),
+    ('Analyze this student registration', _student_analysis),
+    ('Analyze this teaching workload', _workload_analysis),
+]
+
+
+def _fill(example: Any, rng: random.Random) -> Any:
+    """Replace the placeholders of a JSON example with generated values."""
+    if isinstance(example, str):
+        return _phrase(rng)
+    if isinstance(example, (int, float)) and not isinstance(example, bool):
+        return rng.randint(1, 40)
+    if isinstance(example, list):
+        return [_fill(example[0], rng) for _ in range(rng.randint(2, 3))] if example else []
+    if isinstance(example, dict) and list(example) == ['<key>']:
+        return {str(score): _fill(example['<key>'], rng) for score in (1, 3, 5)}
+    if isinstance(example, dict):
+        return {name: _fill(value, rng) for name, value in example.items()}
+    return example
+
+
+def generate_completion(prompt: str, canned: Optional[Dict[str, str]] = None) -> str:
+    """A plausible reply to ``prompt``; the same prompt always gets the same reply."""
+    for needle, reply in (canned or {}).items():
+        if needle in prompt:
+            return reply
+
+    if prompt.startswith(BATCH_INSTRUCTIONS.split('{', 1)[0]):
+        parts = _REQUEST_RE.split(prompt)[1:]
+        return '\n'.join(
+            f"### RESPONSE {number}\n{generate_completion(part.strip(), canned)}"
+            for number, part in zip(parts[::2], parts[1::2])
+        )
+
+    rng = random.Random(zlib.crc32(prompt.encode()))
+    if _JSON_MARKER in prompt:
+        start = prompt.index(_JSON_MARKER) + len(_JSON_MARKER)
+        try:
+            example, _ = json.JSONDecoder().raw_decode(prompt, start)
+            return json.dumps(_fill(example, rng))
+        except ValueError:
+            pass
+
+    text = prompt.lstrip()
+    for prefix, template in TEMPLATES:
+        if text.startswith(prefix):
+            return template(rng)
+    return _phrase(rng, 40) + '.'
+
+
+def embedding_vector(text: str, dim: int) -> List[float]:
+    """A unit vector summing a fixed random vector per word of ``text``."""
+    vector = np.zeros(dim)
+    for word in _WORD_RE.findall(text.lower()) or ['']:
+        vector += np.random.default_rng(zlib.crc32(word.encode())).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering like the OpenAI API.
+
+    Usable in tests as ``server = FakeOpenAIServer(('127.0.0.1', 0), config)``
+    with ``serve_forever`` on a thread; ``server.url`` is the API base.
+    """
+
+    daemon_threads = True
+    COUNTERS = (
+        'requests', 'completions', 'streams', 'embeddings', 'errors', 'in_flight', 'max_in_flight'
+    )
+
+    def __init__(self, address: Tuple[str, int], config: Optional[FakeOpenAIConfig] = None):
+        # Parse the specs before binding so a bad one does not leak the socket
+        self.config = config or FakeOpenAIConfig()
+        self.latency = parse_latency(self.config.latency)
+        self.stream_latency = parse_latency(self.config.stream_latency)
+        self.errors = parse_errors(self.config.errors)
+        super().__init__(address, _Handler)
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def count(self, name: str, delta: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += delta
+            if name == 'in_flight':
+                self._counts['max_in_flight'] = max(
+                    self._counts['max_in_flight'], self._counts['in_flight']
+                )
+
+    def draw(self) -> Tuple[float, Optional[str]]:
+        """Latency and injected failure (if any) for the next request."""
+        with self._lock:
+            delay = self.latency(self._rng)
+            roll = self._rng.random()
+        for kind, rate in self.errors:
+            if roll < rate:
+                return delay, kind
+            roll -= rate
+        return delay, None
+
+    def chunk_delay(self) -> float:
+        with self._lock:
+            return self.stream_latency(self._rng)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeOpenAIServer
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip('/') == '/_stats':
+            self._send_json(200, self.server.stats())
+        elif self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'fake', 'object': 'model'}]})
+        else:
+            self._send_error(404, 'Not found')
+
+    def do_POST(self) -> None:
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if not path.endswith(('/completions', '/embeddings')):
+            self._send_error(404, 'Not found')
+            return
+        try:
+            body = json.loads(
+                self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}'
+            )
+        except ValueError:
+            self._send_error(400, 'Invalid JSON body')
+            return
+
+        server = self.server
+        server.count('requests')
+        server.count('in_flight')
+        try:
+            authorization = self.headers.get('Authorization', '')
+            if server.config.require_key and not authorization.startswith('Bearer '):
+                self._send_error(401, 'No API key provided')
+                return
+            delay, failure = server.draw()
+            if failure == 'timeout':
+                delay += server.config.hang
+            time.sleep(delay)
+            if failure == 'disconnect':
+                server.count('errors')
+                self.close_connection = True
+                return
+            if failure and failure != 'timeout':
+                server.count('errors')
+                self._send_error(int(failure), f"Injected {failure} error")
+                return
+
+            if path.endswith('/embeddings'):
+                self._embeddings(body)
+            elif body.get('stream'):
+                self._stream(body)
+            else:
+                self._completion(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (its timeout was shorter than our latency)
+            pass
+        finally:
+            server.count('in_flight', -1)
+
+    def _completion(self, body: Dict[str, Any]) -> None:
+        self.server.count('completions')
+        prompt = self._prompt(body)
+        text = generate_completion(prompt, self.server.config.canned)
+        self._send_json(200, {
+            'id': 'cmpl-' + hashlib.sha1(prompt.encode()).hexdigest()[:24],
+            'object': 'text_completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'text': text, 'index': 0, 'logprobs': None, 'finish_reason': 'stop'}],
+            'usage': self._usage(prompt, text),
+        })
+
+    def _stream(self, body: Dict[str, Any]) -> None:
+        self.server.count('streams')
+        prompt = self._prompt(body)
+        text = generate_completion(prompt, self.server.config.canned)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        created = int(time.time())
+        pieces = re.findall(r'\S+\s*|\s+', text)
+        for index, piece in enumerate(pieces):
+            chunk = {
+                'object': 'text_completion',
+                'created': created,
+                'model': body.get('model', 'fake'),
+                'choices': [{
+                    'text': piece, 'index': 0, 'logprobs': None,
+                    'finish_reason': 'stop' if index == len(pieces) - 1 else None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            delay = self.server.chunk_delay()
+            if delay:
+                time.sleep(delay)
+        self.wfile.write(b'data: [DONE]\n\n')
+        self.wfile.flush()
+
+    def _embeddings(self, body: Dict[str, Any]) -> None:
+        self.server.count('embeddings')
+        texts = body.get('input', '')
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        dim = self.server.config.embedding_dim
+        tokens = sum(estimate_tokens(str(text)) for text in texts)
+        self._send_json(200, {
+            'object': 'list',
+            'data': [
+                {
+                    'object': 'embedding',
+                    'index': index,
+                    'embedding': embedding_vector(str(text), dim),
+                }
+                for index, text in enumerate(texts)
+            ],
+            'model': body.get('model', 'fake'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        })
+
+    @staticmethod
+    def _prompt(body: Dict[str, Any]) -> str:
+        prompt = body.get('prompt', '')
+        return prompt[0] if isinstance(prompt, list) and prompt else str(prompt)
+
+    @staticmethod
+    def _usage(prompt: str, text: str) -> Dict[str, int]:
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        }
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json(status, {'error': {
+            'message': message,
+            'type': ERROR_TYPES.get(status, 'server_error'),
+            'param': None,
+            'code': None,
+        }})
@@ -0,0 +1,227 @@
+"""Offline, template-based stand-ins for AI generations.
+
+When upstream cannot answer in time (the circuit breaker is open, the call
+deadline ran out, or no API key is configured) ``EducationalAIService``
+falls back to these generators instead of returning empty results. They
+build objectives, assessment items and activities from curriculum topic
+templates per subject and Bloom's-taxonomy verbs, instantly and
+deterministically: the same inputs always give the same output.
+
+Results are returned as plain field dicts; the service turns them into its
+dataclasses and flags them as offline so they are never cached as AI output.
+"""
+
+import hashlib
+import random
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .resilience import CircuitOpenError, DeadlineExceeded
+
+# Bloom's taxonomy, lowest to highest order
+BLOOM_VERBS: Dict[str, List[str]] = {
+    'remember': ['identify', 'list', 'recall', 'define', 'name'],
+    'understand': ['explain', 'describe', 'summarise', 'classify', 'interpret'],
+    'apply': ['apply', 'solve', 'use', 'demonstrate', 'calculate'],
+    'analyze': ['analyse', 'compare', 'examine', 'distinguish', 'investigate'],
+    'evaluate': ['evaluate', 'justify', 'assess', 'critique', 'defend'],
+    'create': ['design', 'construct', 'formulate', 'compose', 'plan'],
+}
+
+# Cognitive levels targeted per term and per differentiation level
+TERM_LEVELS = {
+    1: ('remember', 'understand', 'apply'),
+    2: ('understand', 'apply', 'analyze'),
+    3: ('apply', 'analyze', 'evaluate', 'create'),
+}
+STUDENT_LEVELS = {
+    'support': ('remember', 'understand'),
+    'standard': ('understand', 'apply', 'analyze'),
+    'extension': ('analyze', 'evaluate', 'create'),
+}
+
+CURRICULUM: Dict[str, List[str]] = {
+    'mathematics': [
+        'place value and number operations', 'fractions, decimals and percentages',
+        'algebraic expressions', 'linear equations', 'quadratic functions',
+        'geometry and angle properties', 'measurement and area', 'ratio and proportion',
+        'statistics and data handling', 'probability',
+    ],
+    'physics': [
+        'forces and motion', 'energy transfer and conservation', 'waves and sound',
+        'light and optics', 'electric circuits', 'magnetism and electromagnetism',
+        'pressure in fluids', 'the particle model of matter',
+    ],
+    'chemistry': [
+        'atomic structure', 'the periodic table', 'chemical bonding',
+        'chemical reactions and equations', 'acids, bases and salts',
+        'rates of reaction', 'organic compounds', 'separation techniques',
+    ],
+    'biology': [
+        'cell structure and function', 'nutrition and digestion', 'respiration',
+        'photosynthesis', 'inheritance and genetics', 'ecosystems and interdependence',
+        'the human circulatory system', 'evolution and natural selection',
+    ],
+    'english': [
+        'reading comprehension', 'narrative writing', 'persuasive writing',
+        'grammar and punctuation', 'poetry analysis', 'vocabulary in context',
+        'speaking and listening', 'analysing non-fiction texts',
+    ],
+    'history': [
+        'chronology and historical periods', 'causes and consequences of events',
+        'using primary sources', 'interpretations of the past', 'change and continuity',
+        'significant individuals', 'local history',
+    ],
+    'geography': [
+        'maps and fieldwork skills', 'weather and climate', 'rivers and coasts',
+        'population and settlement', 'natural hazards', 'resources and sustainability',
+        'economic development',
+    ],
+    'computing': [
+        'algorithms and decomposition', 'programming with sequences and loops',
+        'data representation', 'networks and the internet', 'online safety',
+        'debugging and testing',
+    ],
+}
+CURRICULUM['science'] = (
+    CURRICULUM['biology'][:3] + CURRICULUM['chemistry'][:3] + CURRICULUM['physics'][:3]
+)
+CURRICULUM['computer science'] = CURRICULUM['computing']
+GENERIC_TOPICS = [
+    'key vocabulary and concepts', 'core principles', 'applying skills to new problems',
+    'connecting ideas across topics', 'investigation and enquiry', 'communicating findings',
+]
+
+QUESTION_TEMPLATES = {
+    'remember': 'List the key facts and terms you need to {verb} when working on: {topic}.',
+    'understand': 'In your own words, {verb} the main idea behind: {topic}.',
+    'apply': (
+        'Use what you have learned to {verb} a new problem involving: {topic}. '
+        'Show your working.'
+    ),
+    'analyze': '{Verb} two examples related to {topic}. What is similar and what is different?',
+    'evaluate': '{Verb} the following claim about {topic}, giving reasons and evidence.',
+    'create': '{Verb} your own task or example that shows understanding of {topic}.',
+}
+
+ACTIVITY_TEMPLATES = {
+    'remember': 'Matching cards: students {verb} key terms and examples for {topic} (10 min)',
+    'understand': (
+        'Think-pair-share: pairs {verb} {topic} to each other using a worked example (15 min)'
+    ),
+    'apply': 'Guided practice: students {verb} a graded set of problems on {topic} (20 min)',
+    'analyze': 'Compare and contrast: groups {verb} two contrasting cases of {topic} (20 min)',
+    'evaluate': (
+        'Debate: students {verb} competing approaches to {topic} and vote on the strongest '
+        '(25 min)'
+    ),
+    'create': (
+        'Mini project: students {verb} a resource that teaches {topic} to a younger class '
+        '(30 min)'
+    ),
+}
+
+
+def should_use_offline(error: BaseException) -> bool:
+    """Whether ``error`` means upstream is unavailable and the offline
+    generator should answer instead."""
+    if not getattr(settings, 'AI_OFFLINE_FALLBACK', True):
+        return False
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return True
+    # Raised by the OpenAI library when no (or an invalid) API key is configured
+    return any(cls.__name__ == 'AuthenticationError' for cls in type(error).__mro__)
+
+
+def _rng(*parts: Any) -> random.Random:
+    seed = hashlib.sha256('|'.join(str(part).lower() for part in parts).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _verb(rng: random.Random, level: str) -> str:
+    return rng.choice(BLOOM_VERBS[level])
+
+
+def subject_topics(subject: str) -> List[str]:
+    """Curriculum topics for ``subject`` (generic topics if it is unknown)."""
+    return CURRICULUM.get(subject.strip().lower(), GENERIC_TOPICS)
+
+
+def term_plan(
+    subject: str,
+    grade_level: str,
+    term: int,
+    existing_objectives: Optional[Iterable[str]] = None,
+    count: int = 4
+) -> List[Dict[str, Any]]:
+    """Learning objective fields for a term, skipping topics already covered."""
+    rng = _rng('term_plan', subject, grade_level, term)
+    covered = ' '.join(existing_objectives or []).lower()
+    topics = [topic for topic in subject_topics(subject) if topic not in covered]
+    topics = topics or subject_topics(subject)
+    # Later terms continue further through the topic list
+    start = ((int(term) - 1) * count) % len(topics)
+    chosen = (topics[start:] + topics[:start])[:count]
+    levels = TERM_LEVELS.get(int(term), TERM_LEVELS[3])
+
+    objectives = []
+    for index, topic in enumerate(chosen):
+        level = levels[min(index * len(levels) // len(chosen), len(levels) - 1)]
+        verb = _verb(rng, level)
+        objectives.append({
+            'description': f"{verb.capitalize()} {topic} ({grade_level} {subject})",
+            'skills': [f"{_verb(rng, skill_level)} {topic}" for skill_level in levels[:2]],
+            'assessment_criteria': [
+                f"Can {verb} {topic} independently",
+                f"Can {_verb(rng, 'understand')} the reasoning used",
+                f"Can {_verb(rng, levels[-1])} {topic} in an unfamiliar context",
+            ],
+            'term': term,
+        })
+    return objectives
+
+
+def assessment(
+    objective: str,
+    assessment_type: str,
+    student_level: str = 'standard',
+    count: int = 3
+) -> List[Dict[str, Any]]:
+    """Assessment item fields for an objective, pitched at ``student_level``."""
+    rng = _rng('assessment', objective, assessment_type, student_level)
+    levels = STUDENT_LEVELS.get(student_level, STUDENT_LEVELS['standard'])
+    topic = objective.rstrip('.')
+
+    items = []
+    for index in range(count):
+        level = levels[index % len(levels)]
+        verb = _verb(rng, level)
+        items.append({
+            'question': QUESTION_TEMPLATES[level].format(
+                verb=verb, Verb=verb.capitalize(), topic=topic
+            ),
+            'rubric': {
+                '1': 'Attempts the task with significant misconceptions',
+                '3': f"Partially able to {verb} {topic}; some errors or gaps",
+                '5': f"Fully and accurately able to {verb} {topic} with clear reasoning",
+            },
+            'sample_answer': None,
+            'max_score': 5,
+        })
+    return items
+
+
+def activities(
+    objective: str, levels: Iterable[str] = ('support', 'standard', 'extension')
+) -> Dict[str, List[str]]:
+    """Activities per differentiation level for an objective."""
+    topic = objective.rstrip('.')
+    result = {}
+    for student_level in levels:
+        rng = _rng('activities', objective, student_level)
+        result[student_level] = [
+            ACTIVITY_TEMPLATES[level].format(verb=_verb(rng, level), topic=topic)
+            for level in STUDENT_LEVELS.get(student_level, STUDENT_LEVELS['standard'])[:2]
+        ]
+    return result
@@ -1,21 +1,47 @@
 """OpenAI integration for GPT models."""
 
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Iterator, List, Union
 from django.conf import settings
 import openai
 import logging
-from functools import lru_cache
+import re
+import time
+
+from . import routing
+from .budget import estimate_tokens, max_tokens_for, remaining_tokens, token_usage, trim_lines
+from .batching import micro_batcher
+from .resilience import get_resilient_caller
+from .routing import model_router
+from .singleflight import ai_flights, flight_key
+from .structured import complete_structured
+from .telemetry import COMPLETE, EMBED, STREAM, telemetry
 
 logger = logging.getLogger(__name__)
 
+# Section headings of the student analysis, looked up by a line's first
+# character (see the note on the parsers in education.py)
+_STUDENT_SECTIONS = {
+    'recommend': 'recommended_class_level',
+    'learning style': 'learning_style',
+    'academic': 'academic_interests',
+    'support': 'support_needs',
+}
+_STUDENT_HEADINGS = {
+    first: heading for heading in _STUDENT_SECTIONS for first in (heading[0], heading[0].upper())
+}
+
 # Initialize the OpenAI client with settings
 openai.api_key = settings.OPENAI_API_KEY
+if getattr(settings, 'OPENAI_API_BASE', None):
+    openai.api_base = settings.OPENAI_API_BASE
 
 
-@lru_cache(maxsize=1)
 def get_default_model() -> str:
     """Get the default model to use based on settings.
     
+    Per-task routing (see ``routing.ModelRouter``) may pick a different
+    model for individual calls.
+    
     Returns:
         Model identifier string to use with OpenAI API
     """
@@ -31,23 +57,39 @@ class OpenAIClient:
         """Initialize the client.
         
         Args:
-            model: Optional model override. If not provided, uses settings.
+            model: Optional model override. If provided, every call uses it
+                and latency-aware routing is bypassed.
         """
         self.model = model or get_default_model()
+        self.pinned = model is not None
+
+    def cache_identity(self) -> Any:
+        """Configuration that distinguishes this client's cached results."""
+        return [self.model, self.pinned]
+
+    def model_for(self, task: Optional[str]) -> str:
+        """Return the model a call for ``task`` should use."""
+        if self.pinned or not getattr(settings, 'AI_MODEL_ROUTING', True):
+            return self.model
+        return model_router.choose(self.model, task)
     
     def complete(
         self, 
         prompt: str,
-        max_tokens: int = 1000,
+        max_tokens: Optional[int] = None,
         temperature: float = 0.7,
+        task: Optional[str] = None,
         **kwargs: Any
     ) -> Dict[str, Any]:
         """Generate a completion for the given prompt.
         
         Args:
             prompt: The text prompt to complete
-            max_tokens: Maximum tokens in the response
+            max_tokens: Maximum tokens in the response (default: the task's
+                expected output size, see ``budget.get_budget``)
             temperature: Sampling temperature (0-1)
+            task: Task type (e.g. routing.TERM_PLAN) used for model routing,
+                latency tracking and token budgeting
             **kwargs: Additional parameters for openai.Completion.create
             
         Returns:
@@ -56,25 +98,114 @@ class OpenAIClient:
         Raises:
             Exception: If the API call fails
         """
-        try:
-            response = openai.Completion.create(
-                model=self.model,
-                prompt=prompt,
-                max_tokens=max_tokens,
+        model = self.model_for(task)
+        max_tokens = max_tokens or max_tokens_for(task)
+        estimated_prompt = estimate_tokens(prompt)
+
+        def send(text: str, limit: int) -> Dict[str, Any]:
+            return model_router.call(model, task, lambda routed: self._request(
+                openai.Completion.create,
+                model=routed,
+                prompt=text,
+                max_tokens=limit,
                 temperature=temperature,
                 **kwargs
+            ))
+
+        # Usage is recorded by the caller that made the request; single-flight
+        # followers share its response but spent no tokens of their own
+        led: List[Dict[str, Any]] = []
+
+        def call() -> Dict[str, Any]:
+            if micro_batcher.accepts(task, **kwargs):
+                # Small compatible requests may share one upstream completion
+                response = micro_batcher.submit(
+                    (model, task, temperature), prompt, max_tokens, send
+                )
+            else:
+                response = send(prompt, max_tokens)
+            usage = response.get('usage') if isinstance(response, dict) else None
+            token_usage.record(task, estimated_prompt, usage)
+            led.append(usage)
+            return response
+
+        started = time.monotonic()
+        try:
+            if getattr(settings, 'AI_SINGLE_FLIGHT', True):
+                # Identical concurrent requests share one upstream completion
+                key = flight_key(
+                    model, prompt,
+                    max_tokens=max_tokens, temperature=temperature, **kwargs
+                )
+                response = ai_flights.do(key, call)
+                telemetry.record_cache('single_flight', hit=not led)
+            else:
+                response = call()
+            telemetry.record_call(
+                COMPLETE, task, time.monotonic() - started, led[0] if led else None
             )
             logger.debug('Generated completion for prompt: %s...', prompt[:100])
             return response
         except Exception as e:
+            telemetry.record_call(COMPLETE, task, time.monotonic() - started, error=e)
             logger.error('OpenAI API error', exc_info=e)
             raise
     
-    def embed(self, text: str) -> Dict[str, Any]:
+    def stream_complete(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        task: Optional[str] = None,
+        **kwargs: Any
+    ) -> Iterator[str]:
+        """Stream a completion, yielding text fragments as they arrive.
+        
+        Args:
+            prompt: The text prompt to complete
+            max_tokens: Maximum tokens in the response (default from the
+                task's budget)
+            temperature: Sampling temperature (0-1)
+            task: Task type used for model routing and token budgeting
+            **kwargs: Additional parameters for openai.Completion.create
+            
+        Yields:
+            Text fragments of the completion
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        model = self.model_for(task)
+        started = time.monotonic()
+        try:
+            chunks = self._request(
+                openai.Completion.create,
+                model=model,
+                prompt=prompt,
+                max_tokens=max_tokens or max_tokens_for(task),
+                temperature=temperature,
+                stream=True,
+                **kwargs
+            )
+            for chunk in chunks:
+                text = chunk['choices'][0].get('text') or ''
+                if text:
+                    yield text
+            # Streams are not hedged, but their latency still informs routing
+            model_router.record(model, task, time.monotonic() - started, ok=True)
+            telemetry.record_call(STREAM, task, time.monotonic() - started)
+            logger.debug('Streamed completion for prompt: %s...', prompt[:100])
+        except Exception as e:
+            model_router.record(model, task, time.monotonic() - started, ok=False)
+            telemetry.record_call(STREAM, task, time.monotonic() - started, error=e)
+            logger.error('OpenAI API error', exc_info=e)
+            raise
+
+    def embed(self, text: Union[str, List[str]]) -> Dict[str, Any]:
         """Generate embeddings for the given text.
         
         Args:
-            text: Text to generate embeddings for
+            text: Text, or list of texts, to generate embeddings for
             
         Returns:
             OpenAI API response with embeddings
@@ -82,17 +213,59 @@ class OpenAIClient:
         Raises:
             Exception: If the API call fails
         """
+        started = time.monotonic()
         try:
-            response = openai.Embedding.create(
-                model='text-embedding-ada-002',
+            response = self._request(
+                openai.Embedding.create,
+                model=getattr(settings, 'OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002'),
                 input=text
             )
-            logger.debug('Generated embeddings for text: %s...', text[:100])
+            telemetry.record_call(
+                EMBED, 'embedding', time.monotonic() - started,
+                response.get('usage') if isinstance(response, dict) else None
+            )
+            logger.debug('Generated embeddings for text: %s...', str(text)[:100])
             return response
         except Exception as e:
+            telemetry.record_call(EMBED, 'embedding', time.monotonic() - started, error=e)
             logger.error('OpenAI API error', exc_info=e)
             raise
 
+    def embed_many(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        """Embed many texts using one API request per batch.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Maximum texts sent in a single request
+            
+        Returns:
+            One embedding vector per input text, in input order
+            
+        Raises:
+            Exception: If any API call fails
+        """
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), batch_size):
+            response = self.embed(texts[start:start + batch_size])
+            # The API may return items out of order; 'index' restores it
+            data = sorted(response['data'], key=lambda item: item.get('index', 0))
+            vectors.extend(item['embedding'] for item in data)
+        return vectors
+
+    def _request(self, create: Any, **params: Any) -> Any:
+        """Send one API request through the shared resilience layer.
+
+        Rate limiting, retries with backoff, the circuit breaker and the
+        per-call deadline all apply; each attempt's timeout is capped by
+        the time left before the deadline.
+        """
+        per_attempt = getattr(settings, 'AI_REQUEST_TIMEOUT', 20)
+        return get_resilient_caller().call(
+            lambda remaining: create(
+                request_timeout=max(1, min(per_attempt, remaining)), **params
+            )
+        )
+
     def analyze_student_application(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze a student registration request for insights.
         
@@ -119,8 +292,11 @@ Provide specific recommendations for:
 4. Potential support needs or areas for attention"""
 
         try:
-            response = self.complete(prompt, temperature=0.7)
-            return self._parse_student_analysis(response['choices'][0]['text'])
+            analysis, _ = complete_structured(
+                self.complete, prompt, 'student_analysis', self._parse_student_analysis,
+                temperature=0.7, task=routing.STUDENT_ANALYSIS
+            )
+            return analysis
         except Exception as e:
             logger.error('Failed to analyze student application', exc_info=e)
             return {
@@ -157,8 +333,12 @@ Format each question with:
 - Scoring guide (1-5 points)"""
 
         try:
-            response = self.complete(prompt, temperature=0.8, max_tokens=1500)
-            return self._parse_assessment_questions(response['choices'][0]['text'])
+            questions, _ = complete_structured(
+                self.complete, prompt, 'admission_questions', self._parse_assessment_questions,
+                build=lambda data: data['questions'],
+                temperature=0.8, task=routing.ADMISSION_QUESTIONS
+            )
+            return questions
         except Exception as e:
             logger.error('Failed to generate admission questions', exc_info=e)
             return []
@@ -173,19 +353,29 @@ Format each question with:
         Returns:
             Dict containing workload analysis and optimization suggestions
         """
-        prompt = f"""Analyze this teaching workload data:
-{assignments}
-
-Provide:
+        instructions = """Provide:
 1. Total contact hours and preparation time
 2. Subject distribution analysis
 3. Student load analysis
 4. Specific workload optimization recommendations
 5. Potential scheduling conflicts or concerns"""
+        lines = trim_lines(
+            [self._format_assignment(a) for a in assignments],
+            remaining_tokens(routing.WORKLOAD_ANALYSIS, instructions) - 10,
+            keep='first',
+            summarize=self._summarize_assignments
+        )
+        prompt = f"""Analyze this teaching workload data:
+{chr(10).join(lines)}
+
+{instructions}"""
 
         try:
-            response = self.complete(prompt, temperature=0.7)
-            return self._parse_workload_analysis(response['choices'][0]['text'])
+            analysis, _ = complete_structured(
+                self.complete, prompt, 'workload_analysis', self._parse_workload_analysis,
+                temperature=0.7, task=routing.WORKLOAD_ANALYSIS
+            )
+            return analysis
         except Exception as e:
             logger.error('Failed to analyze teacher workload', exc_info=e)
             return {
@@ -225,15 +415,29 @@ Requirements:
 5. Include any relevant next steps or actions"""
 
         try:
-            response = self.complete(prompt, temperature=0.7)
+            response = self.complete(prompt, temperature=0.7, task=routing.ANNOUNCEMENT_DRAFT)
             return response['choices'][0]['text'].strip()
         except Exception as e:
             logger.error('Failed to draft announcement', exc_info=e)
             return ""
 
+    @staticmethod
+    def _format_assignment(assignment: Any) -> str:
+        if isinstance(assignment, dict):
+            return '- ' + ', '.join(f'{key}: {value}' for key, value in assignment.items())
+        return f'- {assignment}'
+
+    @staticmethod
+    def _summarize_assignments(lines: List[str]) -> str:
+        hours = 0.0
+        for line in lines:
+            match = re.search(r'hours_per_week: ([\d.]+)', line)
+            if match:
+                hours += float(match.group(1))
+        return f"- ({len(lines)} more assignments omitted, {hours:g} hours/week in total)"
+
     def _parse_student_analysis(self, text: str) -> Dict[str, Any]:
         """Parse the AI response into structured student analysis data."""
-        lines = text.strip().split('\n')
         result = {
             'recommended_class_level': '',
             'learning_style': '',
@@ -242,21 +446,18 @@ Requirements:
         }
         
         current_section = ''
-        for line in lines:
-            line = line.strip()
-            if line.lower().startswith('recommend'):
-                current_section = 'recommended_class_level'
-                result[current_section] = line.split(':', 1)[1].strip() if ':' in line else line
-            elif line.lower().startswith('learning style'):
-                current_section = 'learning_style'
-                result[current_section] = line.split(':', 1)[1].strip() if ':' in line else line
-            elif line.lower().startswith('academic'):
-                current_section = 'academic_interests'
-                result[current_section] = []
-            elif line.lower().startswith('support'):
-                current_section = 'support_needs'
-                result[current_section] = []
-            elif line.startswith('-') and current_section in ['academic_interests', 'support_needs']:
+        for line in map(str.strip, text.split('\n')):
+            if not line:
+                continue
+            heading = _STUDENT_HEADINGS.get(line[0])
+            if heading and line[:len(heading)].lower() == heading:
+                current_section = _STUDENT_SECTIONS[heading]
+                if current_section in ('academic_interests', 'support_needs'):
+                    result[current_section] = []
+                else:
+                    _, colon, value = line.partition(':')
+                    result[current_section] = value.strip() if colon else line
+            elif line[0] == '-' and current_section in ('academic_interests', 'support_needs'):
                 result[current_section].append(line.lstrip('- '))
                 
         return result
@@ -289,24 +490,26 @@ Requirements:
 
     def _parse_workload_analysis(self, text: str) -> Dict[str, Any]:
         """Parse the AI response into structured workload analysis."""
-        lines = text.strip().split('\n')
         analysis = {
             'total_hours': 0,
             'warnings': [],
             'recommendations': []
         }
         
-        current_section = ''
-        for line in lines:
-            line = line.strip()
-            if line.lower().startswith('total hours:'):
+        for line in map(str.strip, text.split('\n')):
+            if not line:
+                continue
+            head = line[0]
+            if head in 'tT' and line[:12].lower() == 'total hours:':
                 try:
                     analysis['total_hours'] = float(line.split(':')[1].strip().split()[0])
                 except (ValueError, IndexError):
                     pass
-            elif line.startswith('Warning:') or line.startswith('⚠'):
-                analysis['warnings'].append(line.split(':', 1)[1].strip() if ':' in line else line)
-            elif line.startswith('Recommendation:') or line.startswith('→'):
-                analysis['recommendations'].append(line.split(':', 1)[1].strip() if ':' in line else line)
+            elif head == '⚠' or (head == 'W' and line.startswith('Warning:')):
+                _, colon, value = line.partition(':')
+                analysis['warnings'].append(value.strip() if colon else line)
+            elif head == '→' or (head == 'R' and line.startswith('Recommendation:')):
+                _, colon, value = line.partition(':')
+                analysis['recommendations'].append(value.strip() if colon else line)
                 
-        return analysis
\ No newline at end of file
+        return analysis
@@ -0,0 +1,116 @@
+"""Incremental state for student progress analysis.
+
+Re-sending a student's whole assessment history on every request makes
+prompts grow all year. Instead, the last analysis for each (student,
+subject, timeframe) is kept in ``core.models.ProgressSnapshot`` along with a
+fingerprint of the assessments it covered:
+
+* unchanged history and notes -> the stored analysis is returned as is;
+* history extended -> only the new assessments are sent, together with a
+  summary of the previous analysis;
+* history rewritten (edited or removed assessments) -> full re-analysis.
+
+State failures are logged and fall back to a full analysis.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(value: Any) -> str:
+    """Stable hash of JSON-serializable data."""
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ProgressState:
+    """Load and record ``ProgressSnapshot`` rows."""
+
+    def __init__(self, snapshot: Any):
+        self.snapshot = snapshot
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'AI_INCREMENTAL_PROGRESS', True)
+
+    @classmethod
+    def load(cls, student_id: str, subject: str, timeframe: str) -> Optional['ProgressState']:
+        """Return the stored state, or None if there is none."""
+        if not cls.enabled():
+            return None
+        from core.models import ProgressSnapshot
+
+        try:
+            snapshot = ProgressSnapshot.objects.filter(
+                student_id=str(student_id), subject=subject, timeframe=timeframe
+            ).first()
+        except DatabaseError as e:
+            logger.warning('Failed to load progress state', exc_info=e)
+            return None
+        return cls(snapshot) if snapshot is not None else None
+
+    @property
+    def analysis(self) -> Dict[str, Any]:
+        return self.snapshot.analysis
+
+    @property
+    def assessment_count(self) -> int:
+        return self.snapshot.assessment_count
+
+    def unchanged(self, assessments: List[Dict[str, Any]], notes: str) -> bool:
+        """Whether the history and notes are exactly what was last analysed."""
+        return (
+            len(assessments) == self.snapshot.assessment_count
+            and fingerprint(assessments) == self.snapshot.fingerprint
+            and fingerprint(notes) == self.snapshot.notes_fingerprint
+        )
+
+    def delta(self, assessments: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """Assessments added since the last analysis.
+
+        Returns:
+            The new assessments, or None if the analysed history was changed
+            rather than extended
+        """
+        count = self.snapshot.assessment_count
+        if len(assessments) < count:
+            return None
+        if fingerprint(assessments[:count]) != self.snapshot.fingerprint:
+            return None
+        return assessments[count:]
+
+    @classmethod
+    def save(
+        cls,
+        student_id: str,
+        subject: str,
+        timeframe: str,
+        assessments: List[Dict[str, Any]],
+        notes: str,
+        analysis: Dict[str, Any]
+    ) -> None:
+        """Record the analysis covering ``assessments``."""
+        if not cls.enabled():
+            return
+        from core.models import ProgressSnapshot
+
+        try:
+            ProgressSnapshot.objects.update_or_create(
+                student_id=str(student_id), subject=subject, timeframe=timeframe,
+                defaults={
+                    'assessment_count': len(assessments),
+                    'fingerprint': fingerprint(assessments),
+                    'notes_fingerprint': fingerprint(notes),
+                    'analysis': analysis,
+                },
+            )
+        except DatabaseError as e:
+            logger.warning('Failed to save progress state', exc_info=e)
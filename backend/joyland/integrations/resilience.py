@@ -0,0 +1,283 @@
+"""Resilience layer for upstream AI calls.
+
+Wraps each OpenAI request with:
+
+* a client-side token bucket, so bursts are smoothed before they turn into
+  upstream 429s;
+* jittered exponential backoff for retryable errors (rate limits, timeouts,
+  connection failures, 5xx);
+* a circuit breaker that fails fast while upstream is down instead of making
+  every request wait for a full timeout;
+* a per-call deadline bounding the total time spent across retries.
+
+Every decision is counted; see ``ResilientCaller.stats``.
+"""
+
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERROR_NAMES = frozenset({
+    'RateLimitError',
+    'APIConnectionError',
+    'APITimeoutError',
+    'Timeout',
+    'ServiceUnavailableError',
+    'InternalServerError',
+    'TryAgain',
+    'ConnectionError',
+    'TimeoutError',
+})
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when retries would run past the call's deadline."""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an upstream error is transient and worth retrying."""
+    status = getattr(error, 'status_code', None) or getattr(error, 'http_status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket for client-side rate limiting."""
+
+    def __init__(self, rate: float, capacity: float):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available.
+
+        Returns:
+            0 on success, otherwise the seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available or ``timeout`` elapses."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Open after consecutive failures; allow a trial call after a cool-down."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == self.OPEN and elapsed >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let one trial call through; others fail fast until it reports
+                self._state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning('AI circuit breaker opened after %s failures', self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+
+class ResilientCaller:
+    """Apply rate limiting, retries, circuit breaking and deadlines to calls."""
+
+    COUNTERS = (
+        'calls', 'successes', 'failures', 'retries', 'rate_limit_waits',
+        'rate_limit_rejections', 'circuit_rejections', 'deadline_exceeded',
+    )
+
+    def __init__(
+        self,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        deadline: Optional[float] = None
+    ):
+        """Initialize the caller; unspecified options come from settings."""
+        self.bucket = bucket or TokenBucket(
+            rate=getattr(settings, 'AI_RATE_LIMIT_PER_MINUTE', 60) / 60.0,
+            capacity=getattr(settings, 'AI_RATE_LIMIT_BURST', 10)
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'AI_CIRCUIT_RESET_TIMEOUT', 30)
+        )
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable[[Optional[float]], Any], deadline: Optional[float] = None) -> Any:
+        """Call ``fn`` with retries under the configured policies.
+
+        Args:
+            fn: Performs the upstream request; receives the seconds left
+                before the deadline so it can set a request timeout
+            deadline: Total seconds allowed across all attempts
+                (default AI_CALL_DEADLINE)
+
+        Returns:
+            Whatever ``fn`` returns
+
+        Raises:
+            CircuitOpenError: While upstream is considered down
+            DeadlineExceeded: If the deadline passes before a successful call
+            Exception: The last upstream error when it is not retryable or
+                retries are exhausted
+        """
+        max_retries = self._setting(self.max_retries, 'AI_MAX_RETRIES', 3)
+        base_delay = self._setting(self.base_delay, 'AI_RETRY_BASE_DELAY', 0.5)
+        max_delay = self._setting(self.max_delay, 'AI_RETRY_MAX_DELAY', 8.0)
+        budget = deadline or self._setting(self.deadline, 'AI_CALL_DEADLINE', 60.0)
+        expires = time.monotonic() + budget
+        self._count('calls')
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count('circuit_rejections')
+                raise CircuitOpenError('AI service temporarily unavailable')
+
+            wait = self.bucket.try_acquire()
+            if wait:
+                self._count('rate_limit_waits')
+                if not self.bucket.acquire(timeout=expires - time.monotonic()):
+                    self._count('rate_limit_rejections')
+                    raise DeadlineExceeded('Rate limit wait would exceed the call deadline')
+
+            remaining = expires - time.monotonic()
+            try:
+                result = fn(remaining)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Bad requests say nothing about upstream health
+                    self._count('failures')
+                    raise
+                self.breaker.record_failure()
+                delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt >= max_retries:
+                    self._count('failures')
+                    raise
+                if time.monotonic() + delay >= expires:
+                    self._count('deadline_exceeded')
+                    raise DeadlineExceeded('AI call deadline exceeded') from e
+                attempt += 1
+                self._count('retries')
+                logger.info('Retrying AI call in %.2fs after %s (attempt %s/%s)',
+                            delay, type(e).__name__, attempt, max_retries)
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self._count('successes')
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters plus the current circuit state."""
+        with self._lock:
+            stats = dict(self._counts)
+        stats['circuit_state'] = self.breaker.state
+        return stats
+
+    def reset(self) -> None:
+        """Zero the counters and close the circuit."""
+        with self._lock:
+            self._counts = dict.fromkeys(self.COUNTERS, 0)
+        self.breaker.reset()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    @staticmethod
+    def _setting(value: Any, name: str, default: Any) -> Any:
+        return value if value is not None else getattr(settings, name, default)
+
+
+_caller: Optional[ResilientCaller] = None
+_caller_lock = threading.Lock()
+
+
+def get_resilient_caller() -> ResilientCaller:
+    """Return the process-wide caller shared by all OpenAIClient instances."""
+    global _caller
+    with _caller_lock:
+        if _caller is None:
+            _caller = ResilientCaller()
+        return _caller
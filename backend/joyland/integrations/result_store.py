@@ -0,0 +1,189 @@
+"""Persistent store for AI generations.
+
+The Django cache forgets results on eviction and restart, which forces
+expensive term plans and assessments to be regenerated. Every successful
+generation is therefore also written to ``core.models.AIResult`` under a
+content hash of (task, canonical inputs, prompt version, model) and looked
+up before calling upstream. Identical inputs map to one row, so a term's
+worth of generations is paid for once.
+
+Lookups pass the cache tags the result depends on (prompt version, subject
+and, when known, teacher). Invalidating a tag records the time in
+``core.models.AITagInvalidation``, and a row generated before one of its
+tags was last invalidated is deleted on lookup, so clearing a teacher's or
+a subject's cache also regenerates the stored results behind it, in every
+worker and across restarts.
+
+Store failures are logged and never break generation.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+from django.db.models import F, Max
+from django.utils import timezone
+
+from joyland.cache_utils import canonical_key, normalize_text
+
+from .telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class AIResultStore:
+    """Look up and record generations in the ``AIResult`` table."""
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'AI_RESULT_STORE', True)
+
+    @staticmethod
+    def key(task: str, model: str, inputs: Dict[str, Any]) -> str:
+        """Content hash identifying a generation."""
+        return canonical_key(task, model=model, **inputs)
+
+    @staticmethod
+    def invalidate(tag: str) -> None:
+        """Record that ``tag`` was cleared; rows generated before now are stale."""
+        from core.models import AITagInvalidation
+
+        try:
+            AITagInvalidation.objects.update_or_create(
+                tag=tag[:200], defaults={'cleared_at': timezone.now()}
+            )
+        except DatabaseError as e:
+            logger.warning('Failed to record invalidation of %s', tag, exc_info=e)
+
+    @staticmethod
+    def cleared_at(tags: Iterable[str]) -> Optional[datetime]:
+        """When any of ``tags`` was last invalidated; older rows are stale."""
+        from core.models import AITagInvalidation
+
+        tags = {tag[:200] for tag in tags}
+        if not tags:
+            return None
+        return AITagInvalidation.objects.filter(tag__in=tags).aggregate(
+            cleared=Max('cleared_at')
+        )['cleared']
+
+    @classmethod
+    def get(
+        cls,
+        task: str,
+        model: str,
+        inputs: Dict[str, Any],
+        tags: Iterable[str] = ()
+    ) -> Optional[Any]:
+        """Return the stored payload for these inputs, or None.
+
+        A row generated before any of ``tags`` was invalidated is deleted
+        and reported as a miss, so the caller stores a fresh generation.
+        """
+        if not cls.enabled():
+            return None
+        from core.models import AIResult
+
+        key = cls.key(task, model, inputs)
+        try:
+            stale_before = cls.cleared_at(tags)
+            if stale_before is not None:
+                AIResult.objects.filter(key=key, created_at__lt=stale_before).delete()
+            payload = AIResult.objects.filter(key=key).values_list('payload', flat=True).first()
+            telemetry.record_cache('result_store', payload is not None)
+            if payload is None:
+                return None
+            AIResult.objects.filter(key=key).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        except DatabaseError as e:
+            logger.warning('AI result store lookup failed', exc_info=e)
+            return None
+        logger.debug('AI result store hit for %s', task)
+        return payload
+
+    @classmethod
+    def exists(
+        cls,
+        task: str,
+        model: str,
+        inputs: Dict[str, Any],
+        tags: Iterable[str] = ()
+    ) -> bool:
+        """Whether a fresh generation is stored, without counting it as a hit."""
+        if not cls.enabled():
+            return False
+        from core.models import AIResult
+
+        try:
+            rows = AIResult.objects.filter(key=cls.key(task, model, inputs))
+            stale_before = cls.cleared_at(tags)
+            if stale_before is not None:
+                rows = rows.filter(created_at__gte=stale_before)
+            return rows.exists()
+        except DatabaseError as e:
+            logger.warning('AI result store lookup failed', exc_info=e)
+            return False
+
+    @classmethod
+    def save(
+        cls,
+        task: str,
+        model: str,
+        inputs: Dict[str, Any],
+        raw_text: str,
+        payload: Any,
+        usage: Optional[Dict[str, Any]] = None,
+        latency: Optional[float] = None,
+        replace: bool = False
+    ) -> None:
+        """Record a generation; an existing row for the same key is kept
+        unless ``replace`` is set.
+
+        Args:
+            task: Task type (e.g. routing.TERM_PLAN)
+            model: Model the key was derived from
+            inputs: Inputs that determine the generation
+            raw_text: Unparsed completion text
+            payload: JSON-serializable parsed result
+            usage: The response's ``usage`` block, if any
+            latency: Seconds the upstream call took
+            replace: Overwrite an existing row (used when regenerating)
+        """
+        if not cls.enabled():
+            return
+        from core.models import AIResult
+
+        usage = usage if isinstance(usage, dict) else {}
+        try:
+            store = AIResult.objects.update_or_create if replace else AIResult.objects.get_or_create
+            store(
+                key=cls.key(task, model, inputs),
+                defaults={
+                    'task': task,
+                    'model': model[:100],
+                    'prompt_version': str(getattr(settings, 'AI_PROMPT_VERSION', '1')),
+                    'inputs': {k: normalize_text(v) for k, v in inputs.items()},
+                    'raw_text': raw_text,
+                    'payload': payload,
+                    'prompt_tokens': usage.get('prompt_tokens'),
+                    'completion_tokens': usage.get('completion_tokens'),
+                    'latency_ms': int(latency * 1000) if latency is not None else None,
+                    # A replaced row counts as new for the staleness check in get()
+                    'created_at': timezone.now(),
+                },
+            )
+        except IntegrityError:
+            # A concurrent request stored the same generation first
+            pass
+        except DatabaseError as e:
+            logger.warning('Failed to store AI result for %s', task, exc_info=e)
+
+    @staticmethod
+    def prune(max_age_days: Optional[int] = None) -> int:
+        """Delete results unused for ``max_age_days`` (default AI_RESULT_MAX_AGE_DAYS)."""
+        from core.models import AIResult
+
+        days = max_age_days or getattr(settings, 'AI_RESULT_MAX_AGE_DAYS', 180)
+        return AIResult.objects.prune(days)
+
@@ -0,0 +1,213 @@
+"""Latency-aware model routing and hedged requests for AI calls.
+
+The router keeps a rolling window of latency and outcome per (model, task)
+and uses it to:
+
+* send short, cheap tasks (announcement drafts, admission questions, ...)
+  to whichever candidate model is currently fastest;
+* keep quality-sensitive tasks (term plans, assessments) on the default
+  model unless its recent error rate says it is unhealthy;
+* optionally hedge: if a request is still outstanding after the observed
+  p95 for its model and task, fire a duplicate and take whichever of the
+  two succeeds first. The original's error is raised only if both fail.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TERM_PLAN = 'term_plan'
+ASSESSMENT = 'assessment'
+ACTIVITIES = 'activities'
+PROGRESS_ANALYSIS = 'progress_analysis'
+STUDENT_ANALYSIS = 'student_analysis'
+ADMISSION_QUESTIONS = 'admission_questions'
+WORKLOAD_ANALYSIS = 'workload_analysis'
+ANNOUNCEMENT_DRAFT = 'announcement_draft'
+DEFAULT_TASK = 'general'
+
+# Tasks whose output is short enough that the fast model is good enough
+DEFAULT_FAST_TASKS = (ANNOUNCEMENT_DRAFT, ADMISSION_QUESTIONS, STUDENT_ANALYSIS)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyTracker:
+    """Rolling latency and error-rate window per (model, task)."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[Tuple[str, str], Deque[Tuple[float, bool]]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+        self._lock = threading.Lock()
+
+    def record(self, model: str, task: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples[(model, task)].append((latency, ok))
+
+    def summary(self, model: str, task: str) -> Dict[str, Any]:
+        """Return sample count, p50/p95 latency of successes and error rate."""
+        with self._lock:
+            samples = list(self._samples.get((model, task), ()))
+        latencies = sorted(latency for latency, ok in samples if ok)
+        return {
+            'samples': len(samples),
+            'p50': _percentile(latencies, 0.5) if latencies else None,
+            'p95': _percentile(latencies, 0.95) if latencies else None,
+            'error_rate': (
+                sum(1 for _, ok in samples if not ok) / len(samples) if samples else 0.0
+            ),
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Summaries for every (model, task) seen, keyed ``model/task``."""
+        with self._lock:
+            keys = list(self._samples)
+        return {f"{model}/{task}": self.summary(model, task) for model, task in keys}
+
+
+class ModelRouter:
+    """Choose a model per task and optionally hedge slow requests."""
+
+    def __init__(self, tracker: Optional[LatencyTracker] = None):
+        self.tracker = tracker or LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ai-hedge')
+        self._counts = {'hedged': 0, 'hedge_wins': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def min_samples(self) -> int:
+        return getattr(settings, 'AI_ROUTER_MIN_SAMPLES', 20)
+
+    def candidates(self, default_model: str, task: str) -> List[str]:
+        """Models eligible for ``task``, in preference order."""
+        fast = getattr(settings, 'AI_FAST_MODEL', 'gpt-5-mini')
+        if task in getattr(settings, 'AI_FAST_TASKS', DEFAULT_FAST_TASKS):
+            models = [fast, default_model]
+        else:
+            models = [default_model, fast]
+        return list(dict.fromkeys(models))
+
+    def choose(self, default_model: str, task: Optional[str] = None) -> str:
+        """Pick the model for a call.
+
+        Models whose recent error rate exceeds AI_ROUTER_MAX_ERROR_RATE are
+        skipped. For fast tasks the candidate with the lowest p50 wins once
+        enough samples exist; otherwise the first healthy candidate is used.
+        """
+        task = task or DEFAULT_TASK
+        candidates = self.candidates(default_model, task)
+        max_error_rate = getattr(settings, 'AI_ROUTER_MAX_ERROR_RATE', 0.5)
+
+        healthy = []
+        for model in candidates:
+            stats = self.tracker.summary(model, task)
+            if stats['samples'] >= self.min_samples and stats['error_rate'] > max_error_rate:
+                continue
+            healthy.append((model, stats))
+        if not healthy:
+            return candidates[0]
+
+        if task in getattr(settings, 'AI_FAST_TASKS', DEFAULT_FAST_TASKS):
+            measured = [
+                (stats['p50'], model) for model, stats in healthy
+                if stats['samples'] >= self.min_samples and stats['p50'] is not None
+            ]
+            if len(measured) == len(healthy):
+                return min(measured)[1]
+        return healthy[0][0]
+
+    def call(self, model: str, task: Optional[str], fn: Callable[[str], Any]) -> Any:
+        """Run ``fn(model)``, recording latency and hedging if enabled.
+
+        Without hedging the call runs on the caller's thread. With it, the
+        call runs on its own thread while the caller waits up to the p95;
+        if it is still outstanding a duplicate is submitted to the router's
+        executor and the first of the two to succeed is returned.
+
+        Args:
+            model: Model chosen for the call
+            task: Task type used for latency bookkeeping
+            fn: Performs the request against the given model
+
+        Returns:
+            The result of whichever request succeeded first
+
+        Raises:
+            The original request's exception if both requests fail
+        """
+        task = task or DEFAULT_TASK
+        stats = self.tracker.summary(model, task)
+        if (
+            not getattr(settings, 'AI_HEDGE_REQUESTS', False)
+            or stats['samples'] < self.min_samples
+            or stats['p95'] is None
+        ):
+            return self._timed(model, task, fn)
+
+        # A plain thread rather than the executor, so hedging never limits
+        # how many calls are in flight
+        original: Future = Future()
+
+        def run() -> None:
+            original.set_running_or_notify_cancel()
+            try:
+                original.set_result(self._timed(model, task, fn))
+            except BaseException as error:
+                original.set_exception(error)
+
+        threading.Thread(target=run, name='ai-call', daemon=True).start()
+        if wait([original], timeout=stats['p95']).done:
+            return original.result()
+
+        logger.info('Hedging %s request on %s after p95 %.2fs', task, model, stats['p95'])
+        hedge = self._executor.submit(self._timed, model, task, fn)
+        with self._lock:
+            self._counts['hedged'] += 1
+
+        pending = {original, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # The loser keeps running in the background; its latency is still recorded
+            for future in (original, hedge):
+                if future in done and future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self._counts['hedge_wins'] += 1
+                    return future.result()
+        return original.result()
+
+    def record(self, model: str, task: Optional[str], latency: float, ok: bool) -> None:
+        """Add a latency sample for a call made outside ``call`` (e.g. a stream)."""
+        self.tracker.record(model, task or DEFAULT_TASK, latency, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedging counters and per (model, task) latency summaries."""
+        with self._lock:
+            counts = dict(self._counts)
+        counts['latency'] = self.tracker.snapshot()
+        return counts
+
+    def _timed(self, model: str, task: str, fn: Callable[[str], Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = fn(model)
+        except Exception:
+            self.tracker.record(model, task, time.monotonic() - started, ok=False)
+            raise
+        self.tracker.record(model, task, time.monotonic() - started, ok=True)
+        return result
+
+
+# Shared router used by OpenAIClient
+model_router = ModelRouter()
@@ -0,0 +1,308 @@
+"""Offline near-duplicate detection for AI prompt caching.
+
+Teachers phrase the same learning objective many ways, so exact-key caches
+miss constantly. This module vectorises normalized objective text with hashed
+TF-IDF features (words plus character trigrams, so "solve" and "solving"
+overlap) and keeps an in-memory index searched with NumPy cosine similarity.
+Nothing here needs the network, so it can be built and tested offline.
+
+Similarity alone cannot tell "Add fractions ..." from "Subtract fractions
+..." (they share most features), so a hit also requires the content words of
+one objective to be contained in the other's: qualifiers may be added or
+dropped, but no word may be swapped for another.
+"""
+
+import logging
+import re
+import threading
+import zlib
+from collections import deque
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from joyland.cache_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'into', 'is', 'it', 'of', 'on', 'or', 'the', 'their', 'to', 'using',
+    'with', 'students', 'student', 'will', 'able', 'understand',
+})
+
+
+_SUFFIXES = ('ing', 'ions', 'ion', 'ies', 'ed', 'es', 's', 'e')
+
+
+def stem(word: str) -> str:
+    """Strip common English suffixes ("solving", "solves" -> "solv")."""
+    for suffix in _SUFFIXES:
+        if len(word) - len(suffix) >= 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_words(text: str) -> List[str]:
+    """Stemmed words of ``text`` without stop words."""
+    return [stem(w) for w in _TOKEN_RE.findall(normalize_text(text)) if w not in STOP_WORDS]
+
+
+def same_content(a: str, b: str) -> bool:
+    """Whether the content words of one text are all among the other's."""
+    words_a, words_b = set(content_words(a)), set(content_words(b))
+    return words_a <= words_b or words_b <= words_a
+
+
+def text_features(text: str) -> List[str]:
+    """Split text into stemmed word and character-trigram features."""
+    words = content_words(text)
+    features = [f'w:{w}' for w in words]
+    for word in words:
+        padded = f' {word} '
+        features.extend(f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    return features
+
+
+class HashingVectorizer:
+    """Map text to fixed-width term-frequency vectors via feature hashing."""
+
+    def __init__(self, n_features: int = 4096):
+        self.n_features = n_features
+
+    def transform(self, text: str) -> np.ndarray:
+        """Return a sublinear term-frequency vector for ``text``."""
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for feature in text_features(text):
+            # crc32 is stable across processes, unlike hash()
+            vector[zlib.crc32(feature.encode()) % self.n_features] += 1.0
+        nonzero = vector > 0
+        vector[nonzero] = 1.0 + np.log(vector[nonzero])
+        return vector
+
+
+class SimilarityIndex:
+    """In-memory TF-IDF index with vectorised cosine search.
+
+    The idf-weighted, normalized document matrix is cached and only rebuilt
+    on the first search after an insert. Each index has its own lock.
+    """
+
+    def __init__(self, n_features: int = 4096, max_entries: int = 2048):
+        """Initialize an empty index.
+
+        Args:
+            n_features: Width of hashed feature vectors
+            max_entries: Oldest entries are evicted beyond this size
+        """
+        self.vectorizer = HashingVectorizer(n_features)
+        self.max_entries = max_entries
+        self._tf = np.zeros((16, n_features), dtype=np.float32)
+        self._df = np.zeros(n_features, dtype=np.float32)
+        self._texts: List[str] = []
+        self._values: List[Any] = []
+        # (idf, weighted normalized documents); None after an insert
+        self._weighted: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, text: str, value: Any) -> None:
+        """Index ``value`` under ``text``."""
+        vector = self.vectorizer.transform(text)
+        with self._lock:
+            self._add(text, value, vector)
+            self._weighted = None
+
+    def _add(self, text: str, value: Any, vector: np.ndarray) -> None:
+        if len(self) >= self.max_entries:
+            self._evict_oldest()
+        size = len(self)
+        if size == self._tf.shape[0]:
+            grown = np.zeros((size * 2, self._tf.shape[1]), dtype=np.float32)
+            grown[:size] = self._tf
+            self._tf = grown
+
+        self._tf[size] = vector
+        self._df += vector > 0
+        self._texts.append(text)
+        self._values.append(value)
+
+    def search(self, text: str, k: int = 1) -> List[Tuple[float, str, Any]]:
+        """Return the ``k`` most similar entries as (score, text, value)."""
+        vector = self.vectorizer.transform(text)
+        with self._lock:
+            size = len(self)
+            if not size:
+                return []
+            idf, docs = self._weighted_docs()
+            query = vector * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            scores = docs @ (query / norm)
+
+            k = min(k, size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._texts[i], self._values[i]) for i in top]
+
+    def _weighted_docs(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._weighted is None:
+            size = len(self)
+            idf = np.log((1.0 + size) / (1.0 + self._df)) + 1.0
+            docs = self._tf[:size] * idf
+            docs /= np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+            self._weighted = (idf, docs)
+        return self._weighted
+
+    def _evict_oldest(self) -> None:
+        self._df -= self._tf[0] > 0
+        self._tf[:len(self) - 1] = self._tf[1:len(self)]
+        self._tf[len(self) - 1] = 0
+        del self._texts[0]
+        del self._values[0]
+
+
+class SemanticCache:
+    """Return cached results for near-duplicate prompts.
+
+    Entries are partitioned into buckets (e.g. model, prompt version,
+    subject, grade, assessment type and level) so only results generated
+    for the same context are ever reused; within a bucket the closest
+    objective wins if its cosine similarity reaches the threshold and it
+    passes ``same_content``. Entries may also carry the versions of the
+    cache tags they depend on (see ``cache_utils.tag_versions``); once a
+    tag is invalidated its entries no longer match.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, max_entries: int = 2048):
+        """Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+                (default AI_SEMANTIC_CACHE_THRESHOLD)
+            max_entries: Maximum entries kept per bucket
+        """
+        self._threshold = threshold
+        self.max_entries = max_entries
+        self._indexes: Dict[Hashable, SimilarityIndex] = {}
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'hit_similarity_sum': 0.0}
+        self._recent: deque = deque(maxlen=50)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'AI_SEMANTIC_CACHE', False)
+
+    @property
+    def threshold(self) -> float:
+        if self._threshold is not None:
+            return self._threshold
+        return getattr(settings, 'AI_SEMANTIC_CACHE_THRESHOLD', 0.85)
+
+    def lookup(
+        self,
+        bucket: Hashable,
+        text: str,
+        versions: Optional[Dict[str, Any]] = None
+    ) -> Optional[Any]:
+        """Return the cached value for the most similar text, if close enough.
+
+        Args:
+            bucket: Context the result must have been generated for
+            text: Query text (e.g. the objective description)
+            versions: Current tag versions; entries stored under others miss
+
+        Returns:
+            Cached value, or None on a miss or when disabled
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            index = self._indexes.get(bucket)
+        # Searched outside the cache lock; the index locks itself
+        matches = index.search(text, k=3) if index is not None else []
+        threshold = self.threshold
+        best = next(
+            (
+                match for match in matches
+                if match[0] >= threshold
+                and match[2][0] == versions
+                and same_content(text, match[1])
+            ),
+            None
+        )
+        hit = best is not None
+        score, matched, (_, value) = best or (matches[0] if matches else (0.0, None, (None, None)))
+
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._stats['hits' if hit else 'misses'] += 1
+            if hit:
+                self._stats['hit_similarity_sum'] += score
+            self._recent.append({
+                'query': text,
+                'matched': matched,
+                'similarity': round(score, 4),
+                'hit': hit,
+            })
+
+        if hit:
+            logger.info(
+                'Semantic cache hit (similarity %.3f): %r ~ %r', score, text, matched
+            )
+            return value
+        return None
+
+    def store(
+        self,
+        bucket: Hashable,
+        text: str,
+        value: Any,
+        versions: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Remember ``value`` as the result for ``text`` within ``bucket``,
+        generated under the tag ``versions``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            index = self._indexes.get(bucket)
+            if index is None:
+                index = self._indexes[bucket] = SimilarityIndex(max_entries=self.max_entries)
+        index.add(text, (versions, value))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit counts, threshold and recent similarity scores.
+
+        ``recent`` includes near misses so the threshold can be tuned from
+        the scores of lookups that just failed to match.
+        """
+        with self._lock:
+            hits = self._stats['hits']
+            return {
+                'threshold': self.threshold,
+                'lookups': self._stats['lookups'],
+                'hits': hits,
+                'misses': self._stats['misses'],
+                'hit_rate': hits / self._stats['lookups'] if self._stats['lookups'] else 0.0,
+                'mean_hit_similarity': self._stats['hit_similarity_sum'] / hits if hits else None,
+                'entries': sum(len(index) for index in self._indexes.values()),
+                'recent': list(self._recent),
+            }
+
+    def clear(self) -> None:
+        """Drop all entries and statistics."""
+        with self._lock:
+            self._indexes.clear()
+            self._recent.clear()
+            self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'hit_similarity_sum': 0.0}
+
+
+# Process-wide cache used by EducationalAIService
+semantic_cache = SemanticCache()
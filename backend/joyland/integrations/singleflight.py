@@ -0,0 +1,199 @@
+"""Single-flight coalescing of identical in-flight AI requests.
+
+When several callers ask for the same completion at the same time, only one
+of them (the leader) calls upstream; everybody else waits for and shares its
+result. Coalescing happens at two levels:
+
+* within a process, followers block on a ``threading.Event`` owned by the
+  leader thread;
+* across workers, the leader holds a short-lived lock in the Django cache
+  (``cache.add`` is atomic) and publishes its result under a per-flight key
+  that followers in other workers poll for. This needs a cache shared by
+  the workers (see ``CACHES`` in settings); with the default per-process
+  local-memory cache only the first level applies.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially different prompts share a key."""
+    return _WHITESPACE_RE.sub(' ', prompt).strip()
+
+
+def flight_key(model: str, prompt: str, **params: Any) -> str:
+    """Build the coalescing key for a completion request.
+
+    Args:
+        model: Model identifier the request will be sent to
+        prompt: Prompt text (normalized before hashing)
+        **params: Other request parameters that change the output
+
+    Returns:
+        Hex digest identifying identical requests
+    """
+    key_data = json.dumps({
+        'model': model,
+        'prompt': normalize_prompt(prompt),
+        'params': {k: str(v) for k, v in params.items()},
+    }, sort_keys=True)
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+class _Call:
+    """An in-process flight that followers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(
+        self,
+        namespace: str = 'ai_inflight',
+        lock_timeout: Optional[int] = None,
+        result_timeout: int = 60,
+        poll_interval: float = 0.1
+    ):
+        """Initialize the group.
+
+        Args:
+            namespace: Cache key prefix for cross-worker locks and results
+            lock_timeout: Seconds a leader may hold the cross-worker lock
+                before it is considered dead (default AI_SINGLE_FLIGHT_LOCK_TIMEOUT)
+            result_timeout: Seconds a published result stays readable for
+                followers in other workers
+            poll_interval: Seconds between cache polls while following
+        """
+        self.namespace = namespace
+        self.lock_timeout = lock_timeout or getattr(
+            settings, 'AI_SINGLE_FLIGHT_LOCK_TIMEOUT', 120
+        )
+        self.result_timeout = result_timeout
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once for all concurrent callers using ``key``.
+
+        Args:
+            key: Identity of the request (see ``flight_key``)
+            fn: Zero-argument callable performing the upstream call
+
+        Returns:
+            The leader's result, shared with every follower
+
+        Raises:
+            Exception: Whatever the leader's call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            logger.debug('Joining in-flight request %s', key[:12])
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _do_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Coalesce with leaders running in other workers via the cache."""
+        if not getattr(settings, 'AI_SINGLE_FLIGHT_SHARED', True):
+            return fn()
+
+        lock_key = f"{self.namespace}:lock:{key}"
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            flight_id = uuid.uuid4().hex
+            try:
+                acquired = cache.add(lock_key, flight_id, self.lock_timeout)
+            except Exception as e:
+                logger.warning(f"Single-flight lock unavailable, calling directly: {e}")
+                return fn()
+
+            if acquired:
+                return self._lead(lock_key, flight_id, fn)
+
+            result = self._follow(lock_key, deadline)
+            if result is not _MISSING:
+                return result
+            if time.monotonic() >= deadline:
+                # The other leader is stuck; stop waiting on it
+                return fn()
+
+    def _lead(self, lock_key: str, flight_id: str, fn: Callable[[], Any]) -> Any:
+        """Execute ``fn`` while holding the lock and publish its result."""
+        try:
+            result = fn()
+            try:
+                cache.set(self._result_key(lock_key, flight_id),
+                          {'result': result}, self.result_timeout)
+            except Exception as e:
+                logger.warning(f"Failed to publish single-flight result: {e}")
+            return result
+        finally:
+            if cache.get(lock_key) == flight_id:
+                cache.delete(lock_key)
+
+    def _follow(self, lock_key: str, deadline: float) -> Any:
+        """Wait for another worker's leader; return ``_MISSING`` to retry."""
+        flight_id = cache.get(lock_key)
+        while flight_id is not None and time.monotonic() < deadline:
+            published = cache.get(self._result_key(lock_key, flight_id))
+            if published is not None:
+                logger.debug('Shared result from another worker for %s', lock_key)
+                return published['result']
+            time.sleep(self.poll_interval)
+            if cache.get(lock_key) != flight_id:
+                # Leader finished (or died); check once more for its result
+                published = cache.get(self._result_key(lock_key, flight_id))
+                return published['result'] if published is not None else _MISSING
+        return _MISSING
+
+    @staticmethod
+    def _result_key(lock_key: str, flight_id: str) -> str:
+        return f"{lock_key}:result:{flight_id}"
+
+
+_MISSING = object()
+
+# Shared group used by OpenAIClient
+ai_flights = SingleFlight()
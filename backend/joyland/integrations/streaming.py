@@ -0,0 +1,51 @@
+"""Incremental parsing and server-sent events for streamed AI generations."""
+
+import json
+from typing import Any, Callable, Iterator, List
+
+
+class IncrementalParser:
+    """Emit parsed items from streamed text as soon as each block closes.
+
+    The block-based ``_parse_*`` methods treat a blank line as the end of an
+    item. This wrapper buffers streamed tokens into lines and hands each
+    completed block to the existing parser, so streamed and non-streamed
+    output are parsed by exactly the same code.
+    """
+
+    def __init__(self, parse_block: Callable[[str], List[Any]]):
+        """Initialize the parser.
+
+        Args:
+            parse_block: Callable turning the text of one or more blocks into items
+        """
+        self.parse_block = parse_block
+        self._buffer = ''
+        self._block: List[str] = []
+
+    def feed(self, text: str) -> Iterator[Any]:
+        """Add streamed text and yield any items whose block just closed."""
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            if line.strip():
+                self._block.append(line)
+            elif self._block:
+                yield from self._flush()
+
+    def close(self) -> Iterator[Any]:
+        """Yield items from whatever remains once the stream has ended."""
+        if self._buffer.strip():
+            self._block.append(self._buffer)
+        self._buffer = ''
+        if self._block:
+            yield from self._flush()
+
+    def _flush(self) -> Iterator[Any]:
+        block, self._block = '\n'.join(self._block), []
+        yield from self.parse_block(block)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,300 @@
+"""Structured JSON output for AI tasks.
+
+The text parsers scrape free-form completions line by line and quietly
+drop anything that does not match, so a slightly off-format reply is only
+noticed as an empty result. With ``AI_JSON_OUTPUT`` on, prompts ask for a
+single JSON object instead and the reply is checked against a per-task
+schema:
+
+* schemas are compiled once into nested validators that check and normalize
+  a reply in a single walk, reporting the path of the first problem;
+* a reply that fails validation is retried once, telling the model what was
+  wrong;
+* if the retry fails too, the original prompt is sent once more without
+  the JSON instructions and the task's text parser handles that reply,
+  exactly as in text mode (at the cost of a third call).
+
+Schema specs are plain Python values: ``str``, ``int``, ``float``, a
+one-element list ``[spec]``, ``NonEmpty([spec])``, a ``{str: spec}``
+mapping, or a dict of fields where a trailing ``?`` marks a field optional.
+"""
+
+import json
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+class SchemaError(ValueError):
+    """A reply that is not valid JSON or does not match the task's schema."""
+
+
+class NonEmpty:
+    """Marks a list spec that must contain at least one item."""
+
+    def __init__(self, spec: list):
+        self.spec = spec
+
+
+Validator = Callable[[Any, str], Any]
+
+
+def _compile(spec: Any) -> Validator:
+    """Turn a schema spec into a validator ``(value, path) -> normalized value``."""
+    if spec is str:
+        def check_str(value, path):
+            if not isinstance(value, str):
+                raise SchemaError(f"{path}: expected a string")
+            return value.strip()
+        return check_str
+
+    if spec in (int, float):
+        def check_number(value, path):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise SchemaError(f"{path}: expected a number")
+            return spec(value)
+        return check_number
+
+    if isinstance(spec, NonEmpty):
+        check_items = _compile(spec.spec)
+
+        def check_non_empty(value, path):
+            items = check_items(value, path)
+            if not items:
+                raise SchemaError(f"{path}: expected at least one item")
+            return items
+        return check_non_empty
+
+    if isinstance(spec, list):
+        check_item = _compile(spec[0])
+
+        def check_list(value, path):
+            if not isinstance(value, list):
+                raise SchemaError(f"{path}: expected a list")
+            return [check_item(item, f"{path}[{index}]") for index, item in enumerate(value)]
+        return check_list
+
+    if isinstance(spec, dict) and list(spec) == [str]:
+        check_value = _compile(spec[str])
+
+        def check_mapping(value, path):
+            if not isinstance(value, dict):
+                raise SchemaError(f"{path}: expected an object")
+            return {str(key): check_value(item, f"{path}.{key}") for key, item in value.items()}
+        return check_mapping
+
+    if isinstance(spec, dict):
+        fields = [
+            (name.rstrip('?'), not name.endswith('?'), _compile(field))
+            for name, field in spec.items()
+        ]
+
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                raise SchemaError(f"{path}: expected an object")
+            result = {}
+            for name, required, check in fields:
+                if name in value and value[name] is not None:
+                    result[name] = check(value[name], f"{path}.{name}")
+                elif required:
+                    raise SchemaError(f"{path}.{name}: missing")
+            return result
+        return check_object
+
+    raise TypeError(f"Unsupported schema spec: {spec!r}")
+
+
+def _example(spec: Any) -> Any:
+    """A placeholder instance of ``spec`` to show the model the expected shape."""
+    if spec is str:
+        return '...'
+    if spec in (int, float):
+        return 0
+    if isinstance(spec, NonEmpty):
+        return _example(spec.spec)
+    if isinstance(spec, list):
+        return [_example(spec[0])]
+    if isinstance(spec, dict) and list(spec) == [str]:
+        return {'<key>': _example(spec[str])}
+    return {name.rstrip('?'): _example(field) for name, field in spec.items()}
+
+
+def extract_json(text: str) -> Any:
+    """Decode the JSON object in a reply, tolerating code fences and chatter."""
+    text = _FENCE_RE.sub('', text.strip())
+    if not text.startswith('{'):
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end < start:
+            raise SchemaError('reply contains no JSON object')
+        text = text[start:end + 1]
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise SchemaError(f"invalid JSON: {e}") from None
+
+
+class Schema:
+    """A compiled task schema plus the prompt instructions describing it."""
+
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self._check = _compile(spec)
+        self.instructions = (
+            'Respond with a single JSON object and nothing else, shaped like:\n'
+            + json.dumps(_example(spec), indent=1)
+        )
+
+    def validate(self, text: str) -> Dict[str, Any]:
+        """Decode and validate a reply.
+
+        Raises:
+            SchemaError: If the reply is not JSON or does not match
+        """
+        return self._check(extract_json(text), self.name)
+
+
+SCHEMAS: Dict[str, Schema] = {name: Schema(name, spec) for name, spec in {
+    'term_plan': {
+        'objectives': NonEmpty([{
+            'description': str,
+            'skills?': [str],
+            'assessment_criteria?': [str],
+        }]),
+    },
+    'assessment': {
+        'items': NonEmpty([{
+            'question': str,
+            'rubric?': {str: str},
+            'sample_answer?': str,
+            'max_score?': int,
+        }]),
+    },
+    'activities': {
+        'support': [str],
+        'standard': [str],
+        'extension': [str],
+    },
+    'level_activities': {
+        'activities': NonEmpty([str]),
+    },
+    'progress_analysis': {
+        'objectives_mastered': [str],
+        'areas_for_growth': [str],
+        'recommendations': [str],
+    },
+    'student_analysis': {
+        'recommended_class_level': str,
+        'learning_style': str,
+        'academic_interests': [str],
+        'support_needs': [str],
+    },
+    'admission_questions': {
+        'questions': NonEmpty([{
+            'subject': str,
+            'question': str,
+            'outcome?': str,
+            'scoring?': str,
+        }]),
+    },
+    'workload_analysis': {
+        'total_hours': float,
+        'warnings': [str],
+        'recommendations': [str],
+    },
+}.items()}
+
+
+class StructuredStats:
+    """Counts of replies accepted first time, after a retry, or via fallback."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, schema: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(schema, {'valid': 0, 'retried': 0, 'fallback': 0})
+            counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {schema: dict(counts) for schema, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+structured_stats = StructuredStats()
+
+
+def json_output_enabled() -> bool:
+    return getattr(settings, 'AI_JSON_OUTPUT', False)
+
+
+def complete_structured(
+    complete: Callable[..., Dict[str, Any]],
+    prompt: str,
+    schema: Optional[str],
+    parse_text: Callable[[str], Any],
+    build: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    **kwargs: Any
+) -> Tuple[Any, Dict[str, Any]]:
+    """Complete ``prompt`` and turn the reply into a result.
+
+    In text mode (``AI_JSON_OUTPUT`` off) this is ``parse_text`` applied to
+    the completion. In JSON mode the prompt asks for ``schema``; an invalid
+    reply is retried once, then the plain ``prompt`` is completed and its
+    reply handed to ``parse_text``.
+
+    Args:
+        complete: The client's ``complete`` method
+        prompt: Task prompt (without output-format instructions)
+        schema: Name of the schema in SCHEMAS (None for text only)
+        parse_text: Text parser producing the result
+        build: Builds the result from validated JSON (default: as is)
+        **kwargs: Passed to ``complete`` (task, temperature, ...)
+
+    Returns:
+        The result and the last upstream response
+    """
+    if schema is None or not json_output_enabled():
+        response = complete(prompt, **kwargs)
+        return parse_text(response['choices'][0]['text']), response
+
+    compiled = SCHEMAS[schema]
+    build = build or (lambda data: data)
+    request = f"{prompt}\n\n{compiled.instructions}"
+
+    response = complete(request, **kwargs)
+    try:
+        result = build(compiled.validate(response['choices'][0]['text']))
+        structured_stats.record(schema, 'valid')
+        return result, response
+    except SchemaError as e:
+        logger.info('Retrying %s reply that failed validation: %s', schema, e)
+        error = e
+
+    response = complete(
+        f"{request}\n\nYour previous reply was rejected ({error}). "
+        'Reply again with only the JSON object.',
+        **kwargs
+    )
+    try:
+        result = build(compiled.validate(response['choices'][0]['text']))
+        structured_stats.record(schema, 'retried')
+        return result, response
+    except SchemaError as e:
+        logger.warning('Falling back to text mode for %s: %s', schema, e)
+        structured_stats.record(schema, 'fallback')
+
+    # The text parsers expect the free-form layout, not a broken JSON reply
+    response = complete(prompt, **kwargs)
+    return parse_text(response['choices'][0]['text']), response
@@ -0,0 +1,245 @@
+"""Telemetry for AI calls and caches.
+
+``OpenAIClient`` records every completion, stream and embedding call here:
+a latency histogram per (operation, task), token counts from the response's
+usage block, and failures by exception class. The result store records
+its hits and misses. ``collect_metrics`` combines these with the counters
+kept elsewhere (resilience, batching, routing, structured output, the
+semantic and per-teacher caches). The admin telemetry page shows the
+result, and ``render_prometheus`` exports it for the metrics endpoint.
+
+Counters live in process memory, like the other integration statistics,
+so each worker reports its own numbers. The per-teacher cache counters are
+the exception: they are kept in the Django cache.
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+COMPLETE = 'complete'
+STREAM = 'stream'
+EMBED = 'embed'
+
+
+class Histogram:
+    """Fixed-bucket histogram (not thread-safe; AITelemetry locks around it)."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket holding it.
+
+        Returns None without samples or if it lies beyond the last bucket.
+        """
+        rank, seen = fraction * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen and seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals, estimated quantiles and cumulative ``(bound, count)``
+        buckets; ``count`` is the implicit +Inf bucket."""
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class AITelemetry:
+    """Latency histograms, token counts, errors and cache lookups."""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record_call(
+        self,
+        operation: str,
+        task: Optional[str],
+        latency: float,
+        usage: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Record one call.
+
+        Args:
+            operation: COMPLETE, STREAM or EMBED
+            task: Task type (see ``routing``); None for untyped calls
+            latency: Seconds until the call returned or failed
+            usage: The response's usage block, if any
+            error: The exception the call raised, if it failed
+        """
+        key = (operation, task or 'default')
+        usage = usage if isinstance(usage, dict) else {}
+        with self._lock:
+            calls = self._calls.get(key)
+            if calls is None:
+                calls = self._calls[key] = {
+                    'latency': Histogram(self.buckets), 'calls': 0, 'errors': 0,
+                    'prompt_tokens': 0, 'completion_tokens': 0,
+                }
+            calls['latency'].observe(latency)
+            calls['calls'] += 1
+            calls['prompt_tokens'] += usage.get('prompt_tokens') or 0
+            calls['completion_tokens'] += usage.get('completion_tokens') or 0
+            if error is not None:
+                calls['errors'] += 1
+                error_key = key + (type(error).__name__,)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Record a lookup in one of the AI result caches."""
+        with self._lock:
+            counts = self._caches.setdefault(cache, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values, keyed ``operation/task`` for calls."""
+        with self._lock:
+            calls = {
+                f"{operation}/{task}": {
+                    **{name: value for name, value in entry.items() if name != 'latency'},
+                    'latency': entry['latency'].snapshot(),
+                }
+                for (operation, task), entry in sorted(self._calls.items())
+            }
+            errors = [
+                {'operation': operation, 'task': task, 'error': error, 'count': count}
+                for (operation, task, error), count in sorted(self._errors.items())
+            ]
+            caches = {name: dict(counts) for name, counts in sorted(self._caches.items())}
+        for entry in calls.values():
+            entry['error_rate'] = entry['errors'] / entry['calls'] if entry['calls'] else 0.0
+        for counts in caches.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_rate'] = counts['hits'] / total if total else 0.0
+        return {'calls': calls, 'errors': errors, 'caches': caches}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            self._errors: Dict[Tuple[str, str, str], int] = {}
+            self._caches: Dict[str, Dict[str, int]] = {}
+
+
+# Shared recorder used by OpenAIClient and the caches
+telemetry = AITelemetry()
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """Telemetry plus the statistics kept by the other AI components."""
+    from joyland.cache_utils import AIOperationCache
+
+    from .batching import micro_batcher
+    from .budget import token_usage
+    from .resilience import get_resilient_caller
+    from .routing import model_router
+    from .similarity import semantic_cache
+    from .structured import structured_stats
+
+    metrics = telemetry.snapshot()
+    semantic = semantic_cache.stats()
+    semantic.pop('recent', None)
+    metrics.update({
+        'operation_cache': AIOperationCache.get_hit_rates(),
+        'semantic_cache': semantic,
+        'token_estimates': token_usage.stats(),
+        'resilience': get_resilient_caller().stats(),
+        'batching': micro_batcher.stats(),
+        'routing': model_router.stats(),
+        'structured': structured_stats.stats(),
+    })
+    return metrics
+
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus(metrics: Dict[str, Any]) -> str:
+    """Render ``collect_metrics()`` in the Prometheus text exposition format."""
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family('joyland_ai_call_duration_seconds', 'histogram', 'Latency of AI calls')
+    for key, entry in metrics['calls'].items():
+        operation, task = key.split('/', 1)
+        latency = entry['latency']
+        for bound, count in latency['buckets'] + [('+Inf', latency['count'])]:
+            labels = _labels(operation=operation, task=task, le=bound)
+            lines.append(f"joyland_ai_call_duration_seconds_bucket{labels} {count}")
+        labels = _labels(operation=operation, task=task)
+        lines.append(f"joyland_ai_call_duration_seconds_sum{labels} {latency['sum']}")
+        lines.append(f"joyland_ai_call_duration_seconds_count{labels} {latency['count']}")
+
+    family('joyland_ai_tokens_total', 'counter', 'Tokens reported by the AI service')
+    for key, entry in metrics['calls'].items():
+        operation, task = key.split('/', 1)
+        for kind in ('prompt', 'completion'):
+            labels = _labels(operation=operation, task=task, kind=kind)
+            lines.append(f"joyland_ai_tokens_total{labels} {entry[kind + '_tokens']}")
+
+    family('joyland_ai_errors_total', 'counter', 'Failed AI calls by exception class')
+    for error in metrics['errors']:
+        labels = _labels(operation=error['operation'], task=error['task'], error=error['error'])
+        lines.append(f"joyland_ai_errors_total{labels} {error['count']}")
+
+    family('joyland_ai_cache_lookups_total', 'counter', 'AI cache lookups by result')
+    caches = dict(metrics['caches'])
+    caches['semantic'] = metrics['semantic_cache']
+    for kind, scopes in metrics['operation_cache'].items():
+        for scope, counts in scopes.items():
+            caches[f"{kind}_{scope}"] = counts
+    for cache, counts in caches.items():
+        for result, field in (('hit', 'hits'), ('miss', 'misses')):
+            labels = _labels(cache=cache, result=result)
+            lines.append(f"joyland_ai_cache_lookups_total{labels} {counts[field]}")
+
+    family(
+        'joyland_ai_resilience_events_total', 'counter',
+        'Retries, rejections and other resilience events'
+    )
+    resilience = metrics['resilience']
+    for event, count in resilience.items():
+        if event != 'circuit_state':
+            lines.append(f"joyland_ai_resilience_events_total{_labels(event=event)} {count}")
+    family('joyland_ai_circuit_open', 'gauge', '1 while the circuit breaker is open')
+    lines.append(f"joyland_ai_circuit_open {int(resilience.get('circuit_state') == 'open')}")
+
+    family('joyland_ai_structured_replies_total', 'counter', 'JSON replies by validation outcome')
+    for schema, counts in metrics['structured'].items():
+        for outcome, count in counts.items():
+            labels = _labels(schema=schema, outcome=outcome)
+            lines.append(f"joyland_ai_structured_replies_total{labels} {count}")
+
+    return '\n'.join(lines) + '\n'
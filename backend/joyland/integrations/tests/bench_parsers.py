@@ -0,0 +1,269 @@
+"""Microbenchmark for the AI response parsers.
+
+Compares the single-pass dispatch parsers with the previous line-by-line
+implementations (kept below as the reference) over a corpus of large
+synthetic responses, after checking both produce identical output.
+
+Run from the backend directory:
+
+    python -m joyland.integrations.tests.bench_parsers [--responses N] [--lines N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+# Reference implementations: the line-by-line parsers the current ones replaced
+
+
+def reference_term_plan(text: str) -> List[Any]:
+    from joyland.integrations.education import LearningObjective
+
+    def finish(fields: Dict[str, Any]) -> Any:
+        fields.setdefault('skills', [])
+        fields.setdefault('assessment_criteria', [])
+        return LearningObjective(subject_area='', grade_level='', term=None, **fields)
+
+    objectives = []
+    current_obj = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            if current_obj.get('description'):
+                objectives.append(finish(current_obj))
+                current_obj = {}
+            continue
+        if line.startswith('Description:'):
+            current_obj['description'] = line.split(':', 1)[1].strip()
+        elif line.startswith('Skills:'):
+            current_obj['skills'] = [s.strip() for s in line.split(':', 1)[1].split(',')]
+        elif line.startswith('Assessment:'):
+            current_obj['assessment_criteria'] = []
+        elif line.startswith('-') and 'assessment_criteria' in current_obj:
+            current_obj['assessment_criteria'].append(line.lstrip('- '))
+    if current_obj.get('description'):
+        objectives.append(finish(current_obj))
+    return objectives
+
+
+def reference_assessment_items(text: str) -> List[Any]:
+    from joyland.integrations.education import AssessmentItem
+
+    def finish(fields: Dict[str, Any]) -> Any:
+        fields.setdefault('rubric', {})
+        return AssessmentItem(subject='', grade_level='', learning_objective='', **fields)
+
+    items = []
+    current_item = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            if current_item.get('question'):
+                items.append(finish(current_item))
+                current_item = {}
+            continue
+        if line.startswith('Question:'):
+            current_item['question'] = line.split(':', 1)[1].strip()
+        elif line.startswith('Rubric:'):
+            current_item['rubric'] = {}
+        elif line.startswith('Sample:'):
+            current_item['sample_answer'] = line.split(':', 1)[1].strip()
+        elif line.startswith('-') and 'rubric' in current_item:
+            score, colon, criteria = line.lstrip('- ').partition(':')
+            if colon:
+                current_item['rubric'][score.strip()] = criteria.strip()
+    if current_item.get('question'):
+        items.append(finish(current_item))
+    return items
+
+
+def reference_progress_analysis(text: str) -> Any:
+    from joyland.integrations.education import StudentProgress
+
+    mastered, growth, recommendations = [], [], []
+    current_section = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower().startswith('mastered'):
+            current_section = mastered
+        elif line.lower().startswith('growth'):
+            current_section = growth
+        elif line.lower().startswith('recommend'):
+            current_section = recommendations
+        elif line.startswith('-') and current_section is not None:
+            current_section.append(line.lstrip('- '))
+    return StudentProgress(
+        student_id='s', subject='subject', objectives_mastered=mastered,
+        areas_for_growth=growth, recent_assessments=[], recommendations=recommendations
+    )
+
+
+def reference_activities(text: str) -> Dict[str, List[str]]:
+    activities = {'support': [], 'standard': [], 'extension': []}
+    current_level = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower().startswith('support'):
+            current_level = 'support'
+        elif line.lower().startswith('standard'):
+            current_level = 'standard'
+        elif line.lower().startswith('extension'):
+            current_level = 'extension'
+        elif line.startswith('-') and current_level:
+            activities[current_level].append(line.lstrip('- '))
+    return activities
+
+
+def reference_student_analysis(text: str) -> Dict[str, Any]:
+    result = {
+        'recommended_class_level': '',
+        'learning_style': '',
+        'academic_interests': [],
+        'support_needs': [],
+    }
+    current_section = ''
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if line.lower().startswith('recommend'):
+            current_section = 'recommended_class_level'
+            result[current_section] = line.split(':', 1)[1].strip() if ':' in line else line
+        elif line.lower().startswith('learning style'):
+            current_section = 'learning_style'
+            result[current_section] = line.split(':', 1)[1].strip() if ':' in line else line
+        elif line.lower().startswith('academic'):
+            current_section = 'academic_interests'
+            result[current_section] = []
+        elif line.lower().startswith('support'):
+            current_section = 'support_needs'
+            result[current_section] = []
+        elif line.startswith('-') and current_section in ['academic_interests', 'support_needs']:
+            result[current_section].append(line.lstrip('- '))
+    return result
+
+
+def reference_workload_analysis(text: str) -> Dict[str, Any]:
+    analysis = {'total_hours': 0, 'warnings': [], 'recommendations': []}
+    for line in text.strip().split('\n'):
+        line = line.strip()
+        if line.lower().startswith('total hours:'):
+            try:
+                analysis['total_hours'] = float(line.split(':')[1].strip().split()[0])
+            except (ValueError, IndexError):
+                pass
+        elif line.startswith('Warning:') or line.startswith('⚠'):
+            analysis['warnings'].append(line.split(':', 1)[1].strip() if ':' in line else line)
+        elif line.startswith('Recommendation:') or line.startswith('→'):
+            analysis['recommendations'].append(
+                line.split(':', 1)[1].strip() if ':' in line else line
+            )
+    return analysis
+
+
+# Synthetic corpus
+
+_WORDS = (
+    'students solve linear equations graph functions explain reasoning compare fractions '
+    'evaluate evidence design experiment practise vocabulary with peers using manipulatives'
+).split()
+_PADDING = ['', ' ', '  ', '\t', ' \t', '\r', '\u00a0', '\u2003']
+_LINES: Dict[str, List[str]] = {
+    'term_plan': ['Description: {t}', 'Skills: {t}, {t}, {t}', 'Assessment:', '- {t}',
+                  '-- {t}', 'Objective {n}', '', '', 'Notes: {t}', '-'],
+    'assessment': ['Question: {t}', 'Rubric:', '- {n}: {t}', '- {t}', 'Sample: {t}', '',
+                   'Question {n}', '- - {n}:{t}', ''],
+    'progress': ['Mastered objectives:', 'GROWTH areas', 'Recommendations:', '- {t}', '{t}',
+                 '', '-{t}', 'recommended next steps'],
+    'activities': ['Support level:', 'STANDARD', 'Extension tasks', '- {t}', '{t}', '',
+                   '- - {t}', 'Supporting resources: {t}'],
+    'student': ['Recommended class level: Grade {n}', 'Learning style: {t}', 'Academic interests:',
+                'Support needs', '- {t}', '{t}', '', 'recommendation {t}', 'learning style visual'],
+    'workload': ['Total hours: {n} per week', 'TOTAL HOURS: {n}:30', 'Total hours: about {n}',
+                 'Warning: {t}', '⚠ {t}', 'Recommendation: {t}', '→ {t}', '{t}', ''],
+}
+
+
+def _text(rng: random.Random) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(1, 12)))
+
+
+def make_response(kind: str, lines: int, rng: random.Random) -> str:
+    """A synthetic response of ``lines`` lines mixing valid, noisy and odd input."""
+    out = []
+    for _ in range(lines):
+        template = rng.choice(_LINES[kind])
+        line = template.format(t=_text(rng), n=rng.randint(1, 40))
+        out.append(rng.choice(_PADDING) + line + rng.choice(_PADDING))
+    return '\n'.join(out)
+
+
+def make_corpus(responses: int, lines: int, seed: int = 7) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    return {kind: [make_response(kind, lines, rng) for _ in range(responses)] for kind in _LINES}
+
+
+def current_parsers() -> Dict[str, Callable[[str], Any]]:
+    """The production parsers, called as the services call them."""
+    from joyland.integrations.education import EducationalAIService
+    from joyland.integrations.openai import OpenAIClient
+
+    service = EducationalAIService(None)
+    client = OpenAIClient.__new__(OpenAIClient)
+    return {
+        'term_plan': service._parse_term_plan,
+        'assessment': service._parse_assessment_items,
+        'progress': lambda text: service._parse_progress_analysis(text, 's', 'subject'),
+        'activities': service._parse_activities,
+        'student': client._parse_student_analysis,
+        'workload': client._parse_workload_analysis,
+    }
+
+
+REFERENCE_PARSERS: Dict[str, Callable[[str], Any]] = {
+    'term_plan': reference_term_plan,
+    'assessment': reference_assessment_items,
+    'progress': reference_progress_analysis,
+    'activities': reference_activities,
+    'student': reference_student_analysis,
+    'workload': reference_workload_analysis,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--responses', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=400)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'joyland.settings')
+    import django
+    django.setup()
+
+    corpus = make_corpus(args.responses, args.lines)
+    current = current_parsers()
+    size = sum(len(text) for texts in corpus.values() for text in texts)
+    print(f"{args.responses} responses x {args.lines} lines per parser, {size / 1e6:.1f} MB total")
+    print(f"{'parser':<12}{'reference':>12}{'current':>12}{'speedup':>10}")
+
+    for kind, texts in corpus.items():
+        reference = REFERENCE_PARSERS[kind]
+        for text in texts:
+            assert current[kind](text) == reference(text), kind
+
+        def run(parse: Callable[[str], Any], texts: List[str]) -> float:
+            return min(
+                timeit.repeat(lambda: [parse(text) for text in texts], number=1, repeat=args.repeat)
+            )
+
+        before, after = run(reference, texts), run(current[kind], texts)
+        print(f"{kind:<12}{before * 1000:>10.1f}ms{after * 1000:>10.1f}ms{before / after:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
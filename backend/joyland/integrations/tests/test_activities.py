@@ -0,0 +1,73 @@
+"""Tests for per-level fan-out of differentiated activities."""
+
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+
+from core.models import AIResult
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.similarity import semantic_cache
+
+PROFILE = {'support': 5, 'standard': 15, 'extension': 8}
+
+
+def make_service():
+    ai = MagicMock()
+    ai.model = 'gpt-4'
+
+    def complete(prompt, **kwargs):
+        if 'extension-level' in prompt and ai.fail_extension:
+            raise RuntimeError('upstream failed')
+        level = prompt.split('Create activities for ')[1].split('-level')[0]
+        return {'choices': [{'text': f'- {level} activity\n- {level} follow-up\n'}]}
+
+    ai.fail_extension = False
+    ai.complete.side_effect = complete
+    return EducationalAIService(ai)
+
+
+class ActivityFanOutTests(TestCase):
+    def setUp(self):
+        semantic_cache.clear()
+
+    @override_settings(AI_RESULT_STORE=False)
+    def test_levels_are_requested_separately_and_merged(self):
+        service = make_service()
+        activities = service.generate_differentiated_activities(
+            'Solve equations', PROFILE, fan_out=True
+        )
+
+        self.assertEqual(service.ai.complete.call_count, 3)
+        self.assertEqual(list(activities), ['support', 'standard', 'extension'])
+        self.assertEqual(activities['standard'], ['standard activity', 'standard follow-up'])
+
+    @override_settings(AI_RESULT_STORE=False)
+    def test_failed_level_does_not_affect_others(self):
+        service = make_service()
+        service.ai.fail_extension = True
+        activities = service.generate_differentiated_activities(
+            'Solve equations', PROFILE, fan_out=True
+        )
+
+        self.assertEqual(activities['support'], ['support activity', 'support follow-up'])
+        self.assertEqual(
+            activities['extension'], ['Activity generation failed - please plan manually']
+        )
+
+    def test_each_level_is_stored_independently(self):
+        service = make_service()
+        service.generate_level_activities('Solve equations', 'support', 5)
+        service.generate_level_activities('Solve equations', 'extension', 8)
+        service.generate_level_activities('Solve equations', 'support', 5)
+
+        self.assertEqual(service.ai.complete.call_count, 2)
+        self.assertEqual(AIResult.objects.count(), 2)
+
+    def test_refresh_regenerates_one_level(self):
+        service = make_service()
+        service.generate_level_activities('Solve equations', 'support', 5)
+        service.generate_level_activities('Solve equations', 'support', 5, refresh=True)
+
+        self.assertEqual(service.ai.complete.call_count, 2)
+        self.assertEqual(AIResult.objects.count(), 1)
+        self.assertEqual(AIResult.objects.get().hits, 0)
@@ -0,0 +1,122 @@
+"""Tests for micro-batching of small concurrent completions."""
+
+import threading
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from joyland.integrations import routing
+from joyland.integrations.batching import (
+    MicroBatcher,
+    build_batch_prompt,
+    micro_batcher,
+    split_batch_response,
+)
+from joyland.integrations.openai import OpenAIClient
+
+
+def completion(text):
+    return {'model': 'm', 'choices': [{'text': text, 'finish_reason': 'stop'}]}
+
+
+def run_concurrently(batcher, prompts, send):
+    results = [None] * len(prompts)
+
+    def worker(i):
+        results[i] = batcher.submit('group', prompts[i], 100, send)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(prompts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+class SplitTests(TestCase):
+    def test_round_trip(self):
+        prompt = build_batch_prompt(['first', 'second'])
+        self.assertIn('### REQUEST 1\nfirst', prompt)
+        self.assertIn('### REQUEST 2\nsecond', prompt)
+        text = '### RESPONSE 1\nAlpha\n\n### RESPONSE 2:\nBeta\nmore'
+        self.assertEqual(split_batch_response(text, 2), ['Alpha', 'Beta\nmore'])
+
+    def test_missing_or_reordered_markers_fail(self):
+        self.assertIsNone(split_batch_response('### RESPONSE 1\nA', 2))
+        self.assertIsNone(split_batch_response('### RESPONSE 2\nB\n### RESPONSE 1\nA', 2))
+        self.assertIsNone(split_batch_response('### RESPONSE 1\n\n### RESPONSE 2\nB', 2))
+
+
+class MicroBatcherTests(TestCase):
+    def test_concurrent_requests_share_one_call(self):
+        batcher = MicroBatcher(window=0.5, max_size=3)
+        calls = []
+
+        def send(prompt, max_tokens):
+            calls.append((prompt, max_tokens))
+            return completion('### RESPONSE 1\none\n### RESPONSE 2\ntwo\n### RESPONSE 3\nthree')
+
+        results = run_concurrently(batcher, ['a', 'b', 'c'], send)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][1], 300)
+        self.assertEqual(
+            sorted(r['choices'][0]['text'] for r in results), ['one', 'three', 'two']
+        )
+        self.assertEqual(batcher.stats()['batched_requests'], 3)
+
+    def test_single_request_is_sent_unchanged(self):
+        batcher = MicroBatcher(window=0.01)
+        calls = []
+
+        def send(prompt, max_tokens):
+            calls.append(prompt)
+            return completion('plain')
+
+        result = batcher.submit('group', 'only', 100, send)
+        self.assertEqual(calls, ['only'])
+        self.assertEqual(result['choices'][0]['text'], 'plain')
+
+    def test_unsplittable_response_falls_back_to_individual_calls(self):
+        batcher = MicroBatcher(window=0.5, max_size=2)
+        calls = []
+        lock = threading.Lock()
+
+        def send(prompt, max_tokens):
+            with lock:
+                calls.append(prompt)
+            if prompt.startswith('Answer each'):
+                return completion('I merged both answers together.')
+            return completion(f'answer to {prompt}')
+
+        results = run_concurrently(batcher, ['a', 'b'], send)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(
+            sorted(r['choices'][0]['text'] for r in results), ['answer to a', 'answer to b']
+        )
+        self.assertEqual(batcher.stats()['fallbacks'], 2)
+
+    def test_upstream_error_is_raised(self):
+        batcher = MicroBatcher(window=0.01)
+
+        def send(prompt, max_tokens):
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            batcher.submit('group', 'a', 100, send)
+
+
+@override_settings(
+    AI_MICRO_BATCHING=True, AI_BATCH_TASKS=[routing.ANNOUNCEMENT_DRAFT],
+    AI_BATCH_WINDOW=0.01, AI_SINGLE_FLIGHT=False, AI_MODEL_ROUTING=False
+)
+class ClientBatchingTests(TestCase):
+    @patch('joyland.integrations.openai.openai.Completion.create')
+    def test_only_configured_tasks_without_extra_params_are_batched(self, mock_create):
+        mock_create.return_value = completion('text')
+        client = OpenAIClient(model='m')
+        with patch.object(micro_batcher, 'submit', wraps=micro_batcher.submit) as submit:
+            client.complete('draft', task=routing.ANNOUNCEMENT_DRAFT)
+            client.complete('plan', task=routing.TERM_PLAN)
+            client.complete('draft', task=routing.ANNOUNCEMENT_DRAFT, stop=['\n'])
+        self.assertEqual(submit.call_count, 1)
+        self.assertEqual(mock_create.call_count, 3)
@@ -0,0 +1,93 @@
+"""Tests for token budgeting of AI prompts."""
+
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from joyland.integrations import routing
+from joyland.integrations.budget import (
+    UsageRecorder,
+    estimate_tokens,
+    get_budget,
+    max_tokens_for,
+    token_usage,
+    trim_lines,
+    trim_text,
+)
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.openai import OpenAIClient
+
+
+class EstimateTests(TestCase):
+    def test_estimate_errs_on_the_high_side(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        # A tokenizer gives 4 for each of these
+        self.assertEqual(estimate_tokens('Solve the equation.'), 6)
+        self.assertEqual(estimate_tokens('photosynthesis'), 4)
+
+    def test_trim_text(self):
+        text = ' '.join(['word'] * 100)
+        trimmed = trim_text(text, 10)
+        self.assertTrue(trimmed.endswith('[...]'))
+        self.assertLessEqual(estimate_tokens(trimmed), 15)
+        self.assertEqual(trim_text('short', 10), 'short')
+
+    def test_trim_lines_keeps_most_recent(self):
+        lines = [f'Assessment {i}: 5/10 - fine' for i in range(1, 101)]
+        kept = trim_lines(lines, 100)
+        self.assertEqual(kept[-1], 'Assessment 100: 5/10 - fine')
+        self.assertRegex(kept[0], r'^\(\d+ entries omitted\)$')
+        self.assertLessEqual(sum(estimate_tokens(line) for line in kept), 100)
+
+    def test_trim_lines_keeps_first(self):
+        kept = trim_lines(['a b c'] * 50, 40, keep='first', summarize=lambda d: f'{len(d)} more')
+        self.assertEqual(kept[0], 'a b c')
+        self.assertTrue(kept[-1].endswith('more'))
+
+    @override_settings(AI_TOKEN_BUDGETS={routing.ASSESSMENT: (100, 250)})
+    def test_budget_overrides(self):
+        self.assertEqual(max_tokens_for(routing.ASSESSMENT), 250)
+        self.assertEqual(get_budget('unknown'), get_budget(routing.DEFAULT_TASK))
+
+
+class BudgetedCallTests(TestCase):
+    def setUp(self):
+        token_usage.reset()
+
+    @override_settings(AI_SINGLE_FLIGHT=False, AI_MODEL_ROUTING=False)
+    @patch('joyland.integrations.openai.openai.Completion.create')
+    def test_max_tokens_follows_task_and_usage_is_recorded(self, mock_create):
+        mock_create.return_value = {
+            'choices': [{'text': 'Hello'}],
+            'usage': {'prompt_tokens': 9, 'completion_tokens': 3},
+        }
+        OpenAIClient(model='m').complete('Draft a short note', task=routing.ANNOUNCEMENT_DRAFT)
+
+        self.assertEqual(mock_create.call_args.kwargs['max_tokens'],
+                         max_tokens_for(routing.ANNOUNCEMENT_DRAFT))
+        stats = token_usage.stats()[routing.ANNOUNCEMENT_DRAFT]
+        self.assertEqual(stats['prompt_tokens'], 9)
+        self.assertEqual(stats['estimated_prompt_tokens'], estimate_tokens('Draft a short note'))
+        self.assertIsNotNone(stats['estimate_ratio'])
+
+    def test_long_history_stays_within_budget(self):
+        ai = MagicMock()
+        ai.complete.return_value = {'choices': [{'text': ''}]}
+        history = [{'score': 7, 'max': 10, 'notes': 'steady progress on fractions ' * 3}] * 500
+        EducationalAIService(ai).analyze_student_progress(
+            {'student_id': 's1', 'assessments': history, 'teacher_notes': 'note ' * 2000},
+            'Mathematics'
+        )
+        prompt = ai.complete.call_args[0][0]
+        self.assertLessEqual(
+            estimate_tokens(prompt), get_budget(routing.PROGRESS_ANALYSIS).prompt_tokens
+        )
+        self.assertIn('earlier assessments omitted; average score 70%', prompt)
+        self.assertIn('Assessment 500:', prompt)
+
+    def test_recorder_ignores_missing_usage(self):
+        recorder = UsageRecorder()
+        recorder.record(routing.TERM_PLAN, 100, None)
+        stats = recorder.stats()[routing.TERM_PLAN]
+        self.assertEqual((stats['calls'], stats['measured_calls']), (1, 0))
+        self.assertIsNone(stats['estimate_ratio'])
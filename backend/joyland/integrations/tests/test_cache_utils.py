@@ -0,0 +1,226 @@
+"""Tests for AI result caching utilities."""
+
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from joyland.cache_utils import (
+    TEACHER_SCOPE,
+    AIOperationCache,
+    cache_ai_result,
+    cache_key_from_args,
+    canonical_key,
+    invalidate_tag,
+    normalize_text,
+    tag_versions,
+)
+from joyland.integrations.education import LearningObjective
+
+
+class CanonicalKeyTests(TestCase):
+    """Test normalized key derivation."""
+
+    def test_normalize_text(self):
+        """Case, whitespace and trailing punctuation are ignored."""
+        self.assertEqual(
+            normalize_text('  Solve   Linear\nEquations. '),
+            'solve linear equations'
+        )
+
+    def test_equivalent_inputs_share_key(self):
+        """Cosmetically different objectives produce the same key."""
+        self.assertEqual(
+            canonical_key('assessment', objective='Solve linear equations', model='gpt-4'),
+            canonical_key('assessment', objective='solve  linear equations.', model='gpt-4')
+        )
+
+    def test_prompt_version_changes_key(self):
+        """Bumping the prompt version invalidates old keys."""
+        old = canonical_key('term_plan', subject='Mathematics')
+        with override_settings(AI_PROMPT_VERSION='2'):
+            self.assertNotEqual(old, canonical_key('term_plan', subject='Mathematics'))
+
+
+class AIOperationCacheScopeTests(TestCase):
+    """Test teacher and shared cache scopes."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_teacher_scope_is_private_by_default(self):
+        """Without the shared scope, plans are not visible to other teachers."""
+        AIOperationCache.cache_term_plan(1, 'Mathematics', '9th', 2, ['plan'], model='gpt-4')
+        self.assertEqual(
+            AIOperationCache.get_cached_term_plan(1, 'mathematics', '9th', 2, model='gpt-4'),
+            ['plan']
+        )
+        self.assertIsNone(
+            AIOperationCache.get_cached_term_plan(2, 'Mathematics', '9th', 2, model='gpt-4')
+        )
+
+    @override_settings(AI_SHARED_CACHE=True)
+    def test_shared_scope_serves_other_teachers(self):
+        """A plan generated by one teacher is reused by another."""
+        AIOperationCache.cache_term_plan(1, 'Mathematics', '9th', 2, ['plan'], model='gpt-4')
+        self.assertEqual(
+            AIOperationCache.get_cached_term_plan(2, 'Mathematics ', '9TH', 2, model='gpt-4'),
+            ['plan']
+        )
+        stats = AIOperationCache.get_hit_rates()
+        self.assertEqual(stats['term_plan']['shared']['hits'], 1)
+        self.assertEqual(stats['term_plan']['teacher']['misses'], 1)
+
+    @override_settings(AI_SHARED_CACHE=True)
+    def test_teacher_override_wins(self):
+        """A teacher-scope entry is layered on top of the shared one."""
+        AIOperationCache.cache_assessment(1, 'Solve equations', 'formative', 'standard',
+                                          ['shared'], model='gpt-4')
+        AIOperationCache.cache_assessment(2, 'Solve equations', 'formative', 'standard',
+                                          ['mine'], scope=TEACHER_SCOPE, model='gpt-4')
+        self.assertEqual(
+            AIOperationCache.get_cached_assessment(2, 'solve equations', 'formative',
+                                                   'standard', model='gpt-4'),
+            ['mine']
+        )
+        self.assertEqual(
+            AIOperationCache.get_cached_assessment(3, 'Solve equations', 'formative',
+                                                   'standard', model='gpt-4'),
+            ['shared']
+        )
+
+
+class TagInvalidationTests(TestCase):
+    """Test generation-counter invalidation."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_clear_teacher_cache(self):
+        """Only the cleared teacher's entries become misses."""
+        AIOperationCache.cache_term_plan(1, 'Mathematics', '9th', 2, ['a'], model='gpt-4')
+        AIOperationCache.cache_term_plan(2, 'Mathematics', '9th', 2, ['b'], model='gpt-4')
+        AIOperationCache.clear_teacher_cache(1)
+        self.assertIsNone(
+            AIOperationCache.get_cached_term_plan(1, 'Mathematics', '9th', 2, model='gpt-4')
+        )
+        self.assertEqual(
+            AIOperationCache.get_cached_term_plan(2, 'Mathematics', '9th', 2, model='gpt-4'), ['b']
+        )
+
+    @override_settings(AI_SHARED_CACHE=True)
+    def test_clear_subject_cache_reaches_shared_scope(self):
+        """Invalidating a subject drops its plans in every scope."""
+        AIOperationCache.cache_term_plan(1, 'Mathematics', '9th', 2, ['maths'], model='gpt-4')
+        AIOperationCache.cache_term_plan(1, 'Science', '9th', 2, ['science'], model='gpt-4')
+        AIOperationCache.clear_subject_cache(' mathematics')
+        self.assertIsNone(
+            AIOperationCache.get_cached_term_plan(3, 'Mathematics', '9th', 2, model='gpt-4')
+        )
+        self.assertEqual(
+            AIOperationCache.get_cached_term_plan(3, 'Science', '9th', 2, model='gpt-4'),
+            ['science']
+        )
+
+    def test_clear_prompt_version_cache(self):
+        AIOperationCache.cache_assessment(1, 'Solve equations', 'formative', 'standard',
+                                          ['items'], model='gpt-4')
+        AIOperationCache.clear_prompt_version_cache()
+        self.assertIsNone(AIOperationCache.get_cached_assessment(
+            1, 'Solve equations', 'formative', 'standard', model='gpt-4'
+        ))
+
+    def test_evicted_counter_does_not_revive_entries(self):
+        """A lost counter is reseeded rather than restarting at an old value."""
+        before = tag_versions(['teacher:1'])['teacher:1']
+        invalidate_tag('teacher:1')
+        cache.delete('ai_tag:teacher:1')
+        self.assertNotIn(tag_versions(['teacher:1'])['teacher:1'], (before, before + 1))
+
+
+class Planner:
+    def __init__(self, model='gpt-4'):
+        self.calls = 0
+        self.model = model
+
+    def cache_identity(self):
+        return self.model
+
+    @cache_ai_result(timeout=60, compress_threshold=100)
+    def plan(self, objective):
+        self.calls += 1
+        return ['step'] * 50
+
+    @cache_ai_result(timeout=60, negative_timeout=60)
+    def failing(self):
+        self.calls += 1
+        raise RuntimeError('upstream down')
+
+    @cache_ai_result(timeout=1, stale_timeout=60)
+    def versioned(self):
+        self.calls += 1
+        return self.calls
+
+
+class CacheAIResultTests(TestCase):
+    """Test the cache_ai_result decorator."""
+
+    def setUp(self):
+        cache.clear()
+        self.objective = LearningObjective('Solve equations', 'Mathematics', '9th', [], [])
+
+    def test_dataclass_and_dict_arguments_are_canonical(self):
+        """Equal dataclasses and reordered dicts share a key."""
+        copy = LearningObjective('Solve equations', 'Mathematics', '9th', [], [])
+        self.assertEqual(cache_key_from_args(self.objective), cache_key_from_args(copy))
+        self.assertEqual(
+            cache_key_from_args({'a': 1, 'b': 2}), cache_key_from_args({'b': 2, 'a': 1})
+        )
+
+    def test_methods_hit_across_instances(self):
+        """``self`` does not leak its memory address into the key."""
+        first, second = Planner(), Planner()
+        first.plan(self.objective)
+        self.assertEqual(second.plan(self.objective), ['step'] * 50)
+        self.assertEqual(second.calls, 0)
+
+    def test_instances_with_different_configuration_do_not_share(self):
+        Planner('gpt-4').plan(self.objective)
+        other = Planner('gpt-5-mini')
+        other.plan(self.objective)
+        self.assertEqual(other.calls, 1)
+
+    def test_small_results_are_not_serialized_to_measure(self):
+        with patch('joyland.cache_utils.pickle') as pickle:
+            self.assertEqual(Planner().versioned(), 1)
+        pickle.dumps.assert_not_called()
+
+    def test_large_results_are_compressed(self):
+        """Results above the threshold are stored compressed and restored intact."""
+        with patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            Planner().plan(self.objective)
+        self.assertTrue(cache_set.call_args[0][1]['zlib'])
+        self.assertEqual(Planner().plan(self.objective), ['step'] * 50)
+
+    def test_failures_are_cached_briefly(self):
+        planner = Planner()
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                planner.failing()
+        self.assertEqual(planner.calls, 1)
+
+    def test_stale_result_is_served_while_refreshing(self):
+        planner = Planner()
+        self.assertEqual(planner.versioned(), 1)
+        time.sleep(1.1)
+        with patch('joyland.cache_utils.close_old_connections') as close_connections:
+            self.assertEqual(planner.versioned(), 1)
+            for _ in range(50):
+                if planner.calls == 2:
+                    break
+                time.sleep(0.02)
+            time.sleep(0.05)
+        self.assertEqual(planner.versioned(), 2)
+        # The refresh thread releases its database connection
+        self.assertEqual(close_connections.call_count, 2)
@@ -0,0 +1,78 @@
+"""Tests for the persistent embedding store."""
+
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from joyland.integrations.embeddings import OBJECTIVE, EmbeddingStore, item_id
+from joyland.integrations.openai import OpenAIClient
+
+
+def fake_embed_many(texts, batch_size=100):
+    """Deterministic 4-d vectors: one-hot on text length modulo 4."""
+    return [[1.0 if i == len(t) % 4 else 0.0 for i in range(4)] for t in texts]
+
+
+class EmbedManyTests(TestCase):
+    """Test batched embedding requests."""
+
+    @patch('openai.Embedding.create')
+    def test_batches_texts_and_restores_order(self, mock_embed):
+        """Texts are sent in batches and results follow input order."""
+        mock_embed.side_effect = lambda model, input, **kwargs: {'data': [
+            {'index': i, 'embedding': [float(len(t))]} for i, t in reversed(list(enumerate(input)))
+        ]}
+        vectors = OpenAIClient(model='gpt-4').embed_many(['a', 'bb', 'ccc'], batch_size=2)
+
+        self.assertEqual(mock_embed.call_count, 2)
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0]])
+
+
+class EmbeddingStoreTests(TestCase):
+    """Test persistence, change detection and search."""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.client = MagicMock()
+        self.client.embed_many.side_effect = fake_embed_many
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def store(self):
+        return EmbeddingStore(self.path, dim=4, client=self.client)
+
+    def test_unchanged_texts_are_not_reembedded(self):
+        """Only new or edited texts are sent to the API."""
+        store = self.store()
+        self.assertEqual(store.upsert({'objective:1': 'abcd', 'objective:2': 'abc'}), 2)
+        self.assertEqual(store.upsert({'objective:1': 'abcd', 'objective:2': 'abcde'}), 1)
+        self.assertEqual(self.client.embed_many.call_count, 2)
+
+    def test_store_reloads_from_disk(self):
+        """Vectors and ids survive reopening the store."""
+        self.store().upsert({item_id(OBJECTIVE, i): 'x' * i for i in range(100)})
+        reopened = self.store()
+        self.assertEqual(len(reopened), 100)
+        self.assertEqual(reopened.upsert({item_id(OBJECTIVE, 5): 'x' * 5}), 0)
+        self.assertEqual(list(reopened.vector('objective:5')), [0.0, 1.0, 0.0, 0.0])
+
+    def test_search_ranks_by_cosine_and_filters_kind(self):
+        """Search returns the closest vectors of the requested kind."""
+        store = self.store()
+        store.upsert({'objective:a': 'abcd', 'announcement:1': 'abcd', 'objective:b': 'ab'})
+        results = store.search(query='wxyz', k=2, kind=OBJECTIVE)
+        self.assertEqual(results[0], ('objective:a', 1.0))
+        self.assertEqual([key for key, _ in results], ['objective:a', 'objective:b'])
+
+    def test_removed_rows_are_reused(self):
+        """Removing an id frees its row for the next insert."""
+        store = self.store()
+        store.upsert({'objective:a': 'a', 'objective:b': 'bb'})
+        store.remove('objective:a')
+        store.upsert({'objective:c': 'ccc'})
+        self.assertNotIn('objective:a', store)
+        self.assertEqual(store.keys(OBJECTIVE), ['objective:b', 'objective:c'])
+        self.assertEqual(store.search('xxx', k=1)[0][0], 'objective:c')
@@ -0,0 +1,122 @@
+"""Tests for the local fake OpenAI server."""
+
+import json
+import random
+import threading
+import urllib.error
+import urllib.request
+
+from django.test import SimpleTestCase
+
+from joyland.integrations.batching import build_batch_prompt, split_batch_response
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.fake_openai import (
+    FakeOpenAIConfig,
+    FakeOpenAIServer,
+    embedding_vector,
+    generate_completion,
+    parse_errors,
+    parse_latency,
+)
+from joyland.integrations.structured import SCHEMAS
+
+
+class FakeServerTestCase(SimpleTestCase):
+    config = FakeOpenAIConfig()
+
+    def setUp(self):
+        self.server = FakeOpenAIServer(('127.0.0.1', 0), self.config)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def post(self, path, payload):
+        request = urllib.request.Request(
+            self.server.url + path, data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json', 'Authorization': 'Bearer fake'}
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read().decode()
+
+
+class CompletionTests(FakeServerTestCase):
+    def test_completion_is_parseable_and_deterministic(self):
+        prompt = 'Create a detailed term plan for Mathematics (9th Grade, Term 1).'
+        first = json.loads(self.post('/completions', {'model': 'gpt-4', 'prompt': prompt}))
+        second = json.loads(self.post('/completions', {'model': 'gpt-4', 'prompt': prompt}))
+
+        text = first['choices'][0]['text']
+        self.assertEqual(text, second['choices'][0]['text'])
+        self.assertGreater(first['usage']['total_tokens'], 0)
+        self.assertEqual(len(EducationalAIService(None)._parse_term_plan(text)), 4)
+        self.assertEqual(self.server.stats()['completions'], 2)
+
+    def test_stream_reassembles_to_completion(self):
+        prompt = 'Create formative assessment items for: photosynthesis'
+        body = self.post('/completions', {'prompt': prompt, 'stream': True})
+        events = [line[len('data: '):] for line in body.split('\n\n') if line.startswith('data: ')]
+
+        self.assertEqual(events[-1], '[DONE]')
+        text = ''.join(json.loads(event)['choices'][0]['text'] for event in events[:-1])
+        self.assertEqual(text, generate_completion(prompt))
+
+    def test_embeddings_follow_input_order(self):
+        response = json.loads(
+            self.post('/embeddings', {'input': ['fractions', 'solving equations']})
+        )
+        self.assertEqual([item['index'] for item in response['data']], [0, 1])
+        self.assertEqual(len(response['data'][0]['embedding']), 1536)
+
+
+class InjectedErrorTests(FakeServerTestCase):
+    config = FakeOpenAIConfig(errors='429:1')
+
+    def test_errors_are_injected(self):
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.post('/completions', {'prompt': 'hello'})
+        self.assertEqual(ctx.exception.code, 429)
+        self.assertEqual(json.loads(ctx.exception.read())['error']['type'], 'rate_limit_error')
+        self.assertEqual(self.server.stats()['errors'], 1)
+
+
+class GenerationTests(SimpleTestCase):
+    def test_json_prompts_get_valid_objects(self):
+        prompt = f"Create a detailed term plan\n\n{SCHEMAS['term_plan'].instructions}"
+        self.assertTrue(SCHEMAS['term_plan'].validate(generate_completion(prompt))['objectives'])
+        prompt = f"Create items\n\n{SCHEMAS['assessment'].instructions}"
+        self.assertTrue(SCHEMAS['assessment'].validate(generate_completion(prompt))['items'])
+
+    def test_batched_prompts_get_one_answer_each(self):
+        prompts = [
+            'Create a school announcement: sports day', 'Analyze this teaching workload data:'
+        ]
+        answers = split_batch_response(generate_completion(build_batch_prompt(prompts)), 2)
+        self.assertEqual(answers, [generate_completion(prompt) for prompt in prompts])
+
+    def test_canned_replies_take_precedence(self):
+        self.assertEqual(
+            generate_completion('Create a term plan', {'term plan': 'canned'}), 'canned'
+        )
+
+    def test_similar_texts_have_similar_embeddings(self):
+        a, b, c = (embedding_vector(text, 64) for text in (
+            'solve linear equations', 'solve linear equations with graphs', 'poetry analysis'
+        ))
+
+        def dot(x, y):
+            return sum(p * q for p, q in zip(x, y))
+
+        self.assertGreater(dot(a, b), dot(a, c))
+
+    def test_specs(self):
+        rng = random.Random(1)
+        self.assertEqual(parse_latency('0.25')(rng), 0.25)
+        self.assertTrue(0.1 <= parse_latency('uniform:0.1,0.2')(rng) <= 0.2)
+        self.assertGreater(parse_latency('lognormal:1,0.5')(rng), 0)
+        self.assertEqual(parse_errors('429:0.1, timeout:0.05'), [('429', 0.1), ('timeout', 0.05)])
+        for spec in ('gamma:1', 'uniform:1'):
+            with self.assertRaises(ValueError):
+                parse_latency(spec)
+        with self.assertRaises(ValueError):
+            parse_errors('429:0.7,500:0.5')
@@ -0,0 +1,107 @@
+"""Tests for the offline template fallback."""
+
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+
+from core.models import AIResult
+from joyland.integrations import offline
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.resilience import CircuitOpenError, DeadlineExceeded
+from joyland.integrations.similarity import semantic_cache
+
+
+class AuthenticationError(Exception):
+    """Stands in for the OpenAI library's error for a missing API key."""
+
+
+def make_service(error):
+    ai = MagicMock()
+    ai.model = 'gpt-4'
+    ai.complete.side_effect = error
+    ai.stream_complete.side_effect = error
+    return EducationalAIService(ai)
+
+
+class OfflineTemplateTests(TestCase):
+    def test_term_plan_is_deterministic(self):
+        first = offline.term_plan('Mathematics', '9th', 2)
+        self.assertEqual(first, offline.term_plan('Mathematics', '9th', 2))
+        self.assertEqual(len(first), 4)
+        for fields in first:
+            self.assertTrue(fields['description'])
+            self.assertEqual(len(fields['assessment_criteria']), 3)
+            self.assertEqual(fields['term'], 2)
+
+    def test_term_plan_skips_covered_topics(self):
+        plan = offline.term_plan(
+            'Mathematics', '9th', 1, ['Solve linear equations (9th Mathematics)']
+        )
+        self.assertFalse(any('linear equations' in fields['description'] for fields in plan))
+
+    def test_unknown_subject_uses_generic_topics(self):
+        plan = offline.term_plan('Underwater basket weaving', '3rd', 1)
+        self.assertEqual(len(plan), 4)
+
+    def test_assessment_uses_level_verbs(self):
+        items = offline.assessment('Photosynthesis', 'formative', 'extension')
+        self.assertEqual(len(items), 3)
+        verbs = set(offline.BLOOM_VERBS['analyze'] + offline.BLOOM_VERBS['evaluate']
+                    + offline.BLOOM_VERBS['create'])
+        for item in items:
+            self.assertTrue(any(verb in item['question'].lower() for verb in verbs))
+            self.assertEqual(set(item['rubric']), {'1', '3', '5'})
+
+    def test_should_use_offline(self):
+        self.assertTrue(offline.should_use_offline(CircuitOpenError()))
+        self.assertTrue(offline.should_use_offline(DeadlineExceeded()))
+        self.assertTrue(offline.should_use_offline(AuthenticationError()))
+        self.assertFalse(offline.should_use_offline(RuntimeError()))
+        with override_settings(AI_OFFLINE_FALLBACK=False):
+            self.assertFalse(offline.should_use_offline(CircuitOpenError()))
+
+
+class ServiceFallbackTests(TestCase):
+    def setUp(self):
+        semantic_cache.clear()
+
+    def test_open_circuit_serves_offline_term_plan(self):
+        service = make_service(CircuitOpenError('down'))
+        objectives = service.generate_term_plan('Physics', '10th', 1)
+
+        self.assertTrue(service.used_offline_fallback)
+        self.assertEqual(len(objectives), 4)
+        self.assertEqual(objectives[0].subject_area, 'Physics')
+        self.assertEqual(AIResult.objects.count(), 0)
+
+    def test_deadline_serves_offline_assessment_without_caching(self):
+        service = make_service(DeadlineExceeded('slow'))
+        items = service.generate_assessment('Explain photosynthesis', 'formative')
+
+        self.assertTrue(service.used_offline_fallback)
+        self.assertEqual(items[0].learning_objective, 'Explain photosynthesis')
+        self.assertIsNone(semantic_cache.lookup(
+            ('assessment', '', '', 'formative', 'standard'), 'Explain photosynthesis'
+        ))
+
+    def test_missing_key_serves_offline_activities(self):
+        service = make_service(AuthenticationError('No API key provided'))
+        activities = service.generate_differentiated_activities('Solve equations', {'support': 3})
+        self.assertEqual(set(activities), {'support', 'standard', 'extension'})
+        self.assertTrue(all(activities.values()))
+
+        fanned = make_service(AuthenticationError('No API key provided'))
+        by_level = fanned.generate_differentiated_activities('Solve equations', {}, fan_out=True)
+        self.assertEqual(by_level, activities)
+
+    def test_stream_falls_back_before_first_token(self):
+        service = make_service(CircuitOpenError('down'))
+        events = list(service.stream_assessment('Solve equations', 'formative'))
+
+        self.assertEqual([kind for kind, _ in events], ['item'] * 3)
+        self.assertTrue(service.used_offline_fallback)
+
+    def test_other_errors_do_not_fall_back(self):
+        service = make_service(RuntimeError('bad request'))
+        self.assertEqual(service.generate_term_plan('Physics', '10th', 1), [])
+        self.assertFalse(service.used_offline_fallback)
@@ -0,0 +1,37 @@
+"""The single-pass response parsers must match the line-by-line reference."""
+
+from django.test import SimpleTestCase
+
+from joyland.integrations.tests.bench_parsers import REFERENCE_PARSERS, current_parsers, make_corpus
+
+EDGE_CASES = [
+    '',
+    '\n\n',
+    '-',
+    '- - -',
+    '  -\t indented bullet  ',
+    'Description:\nSkills:\nAssessment:\n-\n',
+    'Question: q\nRubric:\n- no colon\n- 3 : fine \n\nQuestion: next',
+    'MASTERED\n- a\nGrowth\n-b\nrecommendations: -c\n- d',
+    'Maſtered\n- long s is not an s for str.lower()\n',
+    'Support\n- s\nSTANDARD work\n- t\nextension\n- e\nsupporting\n- s2',
+    'Recommended: Year 5\nLearning Style\nAcademic:\n- maths\nSupport:\n- reading\n- ',
+    'Key stage\nTotal Hours: 12:30\nTOTAL HOURS: lots\nWarning no colon\n⚠: odd\n→ rest',
+    'İmastered\n- dotted capital I lowers to two characters',
+    'Description: a\r\n- b\r\nAssessment:\r\n- c\r\n\r\nDescription: d',
+]
+
+
+class ParserEquivalenceTests(SimpleTestCase):
+    def test_parsers_match_reference_on_synthetic_corpus(self):
+        current = current_parsers()
+        for kind, texts in make_corpus(responses=20, lines=120).items():
+            for text in texts:
+                self.assertEqual(current[kind](text), REFERENCE_PARSERS[kind](text), kind)
+
+    def test_parsers_match_reference_on_edge_cases(self):
+        current = current_parsers()
+        for kind, reference in REFERENCE_PARSERS.items():
+            for text in EDGE_CASES:
+                with self.subTest(kind=kind, text=text):
+                    self.assertEqual(current[kind](text), reference(text))
@@ -0,0 +1,119 @@
+"""Tests for incremental student progress analysis."""
+
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+
+from core.models import ProgressSnapshot
+from joyland.integrations.education import EducationalAIService
+
+ANALYSIS_TEXT = (
+    'Mastered:\n- fractions\n'
+    'Growth:\n- decimals\n'
+    'Recommendations:\n- practice decimals\n'
+)
+
+
+def assessment(n):
+    return {'score': n % 10, 'max': 10, 'notes': f'quiz {n}'}
+
+
+class IncrementalProgressTests(TestCase):
+    def setUp(self):
+        self.ai = MagicMock()
+        self.ai.complete.return_value = {'choices': [{'text': ANALYSIS_TEXT}]}
+        self.service = EducationalAIService(self.ai)
+        self.history = [assessment(n) for n in range(1, 6)]
+
+    def analyze(self, history, notes='Works hard'):
+        return self.service.analyze_student_progress(
+            {'student_id': 's1', 'assessments': history, 'teacher_notes': notes}, 'Mathematics'
+        )
+
+    def last_prompt(self):
+        return self.ai.complete.call_args[0][0]
+
+    def test_unchanged_history_reuses_analysis(self):
+        first = self.analyze(self.history)
+        second = self.analyze(list(self.history))
+        self.assertEqual(self.ai.complete.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second.objectives_mastered, ['fractions'])
+
+    def test_new_assessments_send_only_the_delta(self):
+        self.analyze(self.history)
+        self.analyze(self.history + [assessment(6), assessment(7)])
+
+        prompt = self.last_prompt()
+        self.assertIn('Previous Analysis (assessments 1-5)', prompt)
+        self.assertIn('Mastered: fractions', prompt)
+        self.assertIn('Assessment 6: 6/10 - quiz 6', prompt)
+        self.assertNotIn('quiz 5', prompt)
+        self.assertEqual(ProgressSnapshot.objects.get().assessment_count, 7)
+
+    def test_changed_notes_trigger_an_update(self):
+        self.analyze(self.history)
+        self.analyze(self.history, notes='Struggling lately')
+        self.assertEqual(self.ai.complete.call_count, 2)
+        self.assertIn('No new assessments', self.last_prompt())
+        self.assertIn('Struggling lately', self.last_prompt())
+
+    def test_rewritten_history_is_reanalysed_in_full(self):
+        self.analyze(self.history)
+        edited = [assessment(9)] + self.history[1:]
+        self.analyze(edited)
+        self.assertIn('Assessment History:', self.last_prompt())
+        self.assertIn('Assessment 1: 9/10 - quiz 9', self.last_prompt())
+
+    def test_failed_analysis_is_not_stored(self):
+        self.ai.complete.side_effect = RuntimeError('down')
+        self.analyze(self.history)
+        self.assertFalse(ProgressSnapshot.objects.exists())
+
+    @override_settings(AI_INCREMENTAL_PROGRESS=False)
+    def test_can_be_disabled(self):
+        self.analyze(self.history)
+        self.analyze(self.history)
+        self.assertEqual(self.ai.complete.call_count, 2)
+
+
+@override_settings(AI_INCREMENTAL_PROGRESS=False)
+class ClassProgressTests(TestCase):
+    def setUp(self):
+        self.ai = MagicMock()
+        self.ai.complete.return_value = {'choices': [{'text': ANALYSIS_TEXT}]}
+        self.service = EducationalAIService(self.ai)
+
+    def students(self, count):
+        return [
+            {'student_id': f's{n}', 'assessments': [assessment(n)], 'teacher_notes': ''}
+            for n in range(count)
+        ]
+
+    def test_every_student_is_analysed(self):
+        results = list(
+            self.service.analyze_class_progress(self.students(6), 'Mathematics', max_workers=3)
+        )
+        self.assertEqual(sorted(r.student_id for r in results), [f's{n}' for n in range(6)])
+        self.assertEqual(self.ai.complete.call_count, 6)
+
+    def test_failed_student_does_not_stop_the_class(self):
+        students = self.students(3)
+        del students[1]['student_id']
+        results = list(self.service.analyze_class_progress(students, 'Mathematics'))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(
+            [r.recommendations for r in results if r.student_id is None],
+            [['Analysis failed - please review manually']]
+        )
+
+    def test_summary_aggregates_the_class(self):
+        results = list(self.service.analyze_class_progress(self.students(4), 'Mathematics'))
+        results.append(self.service._failed_progress('s9', 'Mathematics'))
+        summary = self.service.summarize_class_progress(results)
+
+        self.assertEqual(summary['students'], 5)
+        self.assertEqual(summary['analysed'], 4)
+        self.assertEqual(summary['failed'], 1)
+        self.assertEqual(summary['common_mastered'], [{'objective': 'fractions', 'students': 4}])
+        self.assertEqual(summary['common_growth_areas'], [{'area': 'decimals', 'students': 4}])
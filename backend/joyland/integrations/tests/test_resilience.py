@@ -0,0 +1,134 @@
+"""Tests for rate limiting, retries and circuit breaking of AI calls."""
+
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ResilientCaller,
+    TokenBucket,
+    get_resilient_caller,
+    is_retryable,
+)
+
+
+class RateLimitError(Exception):
+    """Stand-in for the SDK's rate limit error."""
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+def make_caller(**kwargs):
+    options = {
+        'bucket': TokenBucket(rate=1000, capacity=1000),
+        'breaker': CircuitBreaker(failure_threshold=3, reset_timeout=60),
+        'max_retries': 2,
+        'base_delay': 0.01,
+        'max_delay': 0.01,
+        'deadline': 5,
+    }
+    options.update(kwargs)
+    return ResilientCaller(**options)
+
+
+class RetryableTests(TestCase):
+    def test_classification(self):
+        """Rate limits and server errors retry; client errors do not."""
+        self.assertTrue(is_retryable(RateLimitError()))
+        self.assertTrue(is_retryable(HTTPError(503)))
+        self.assertTrue(is_retryable(TimeoutError()))
+        self.assertFalse(is_retryable(HTTPError(400)))
+        self.assertFalse(is_retryable(ValueError()))
+
+
+@patch('joyland.integrations.resilience.time.sleep')
+class ResilientCallerTests(TestCase):
+    def test_retries_transient_errors(self, mock_sleep):
+        """A 429 burst is retried with backoff and then succeeds."""
+        caller = make_caller()
+        fn = MagicMock(side_effect=[RateLimitError(), RateLimitError(), 'ok'])
+
+        self.assertEqual(caller.call(fn), 'ok')
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(caller.stats()['retries'], 2)
+
+    def test_non_retryable_errors_raise_immediately(self, mock_sleep):
+        caller = make_caller()
+        fn = MagicMock(side_effect=HTTPError(400))
+
+        with self.assertRaises(HTTPError):
+            caller.call(fn)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(caller.stats()['circuit_state'], CircuitBreaker.CLOSED)
+
+    def test_circuit_opens_and_fails_fast(self, mock_sleep):
+        """After repeated failures the upstream is not called at all."""
+        caller = make_caller(max_retries=0)
+        fn = MagicMock(side_effect=HTTPError(502))
+        for _ in range(3):
+            with self.assertRaises(HTTPError):
+                caller.call(fn)
+
+        with self.assertRaises(CircuitOpenError):
+            caller.call(fn)
+        self.assertEqual(fn.call_count, 3)
+        stats = caller.stats()
+        self.assertEqual(stats['circuit_state'], CircuitBreaker.OPEN)
+        self.assertEqual(stats['circuit_rejections'], 1)
+
+    def test_half_open_trial_closes_circuit(self, mock_sleep):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        caller = make_caller(breaker=breaker, max_retries=0)
+        with self.assertRaises(HTTPError):
+            caller.call(MagicMock(side_effect=HTTPError(500)))
+
+        self.assertEqual(caller.call(MagicMock(return_value='ok')), 'ok')
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_deadline_bounds_retries(self, mock_sleep):
+        caller = make_caller(base_delay=10, max_delay=10, max_retries=5)
+        with self.assertRaises(DeadlineExceeded):
+            caller.call(MagicMock(side_effect=RateLimitError()), deadline=1)
+        self.assertEqual(caller.stats()['deadline_exceeded'], 1)
+
+    def test_rate_limit_rejects_when_wait_exceeds_deadline(self, mock_sleep):
+        caller = make_caller(bucket=TokenBucket(rate=0.001, capacity=1))
+        caller.call(MagicMock(return_value='ok'))
+        with self.assertRaises(DeadlineExceeded):
+            caller.call(MagicMock(return_value='ok'), deadline=1)
+        self.assertEqual(caller.stats()['rate_limit_rejections'], 1)
+
+
+class TokenBucketTests(TestCase):
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=1, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertGreater(bucket.try_acquire(), 0)
+
+
+class OpenAIClientResilienceTests(TestCase):
+    def setUp(self):
+        get_resilient_caller().reset()
+
+    def tearDown(self):
+        get_resilient_caller().reset()
+
+    @patch('joyland.integrations.resilience.time.sleep')
+    @patch('openai.Completion.create')
+    def test_complete_retries_rate_limits(self, mock_complete, mock_sleep):
+        mock_complete.side_effect = [RateLimitError(), {'choices': [{'text': 'ok'}]}]
+        response = OpenAIClient(model='gpt-4').complete('Retry me')
+
+        self.assertEqual(response['choices'][0]['text'], 'ok')
+        self.assertEqual(mock_complete.call_count, 2)
+        self.assertIn('request_timeout', mock_complete.call_args.kwargs)
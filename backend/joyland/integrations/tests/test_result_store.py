@@ -0,0 +1,119 @@
+"""Tests for the persistent AI result store."""
+
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import AIResult, AITagInvalidation
+from joyland.cache_utils import AIOperationCache
+from joyland.integrations import routing
+from joyland.integrations.education import EducationalAIService, LearningObjective
+from joyland.integrations.result_store import AIResultStore
+
+PLAN_TEXT = (
+    'Description: Solve linear equations\n'
+    'Skills: algebra, reasoning\n'
+    'Assessment:\n- solves 2x + 3 = 7\n'
+)
+
+
+def make_service(text=PLAN_TEXT, teacher_id=None):
+    ai = MagicMock()
+    ai.model = 'gpt-4'
+    ai.complete.return_value = {
+        'choices': [{'text': text}],
+        'usage': {'prompt_tokens': 120, 'completion_tokens': 40},
+    }
+    return EducationalAIService(ai, teacher_id=teacher_id)
+
+
+class AIResultStoreTests(TestCase):
+    def test_generation_is_stored_and_reused(self):
+        service = make_service()
+        first = service.generate_term_plan('Mathematics', '9th', 1)
+        second = make_service().generate_term_plan('mathematics ', '9th', 1)
+
+        self.assertEqual(service.ai.complete.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIsInstance(second[0], LearningObjective)
+
+        row = AIResult.objects.get()
+        self.assertEqual(row.task, routing.TERM_PLAN)
+        self.assertEqual(row.prompt_tokens, 120)
+        self.assertEqual(row.completion_tokens, 40)
+        self.assertEqual(row.hits, 1)
+        self.assertEqual(row.raw_text, PLAN_TEXT)
+
+    def test_key_covers_model_and_prompt_version(self):
+        inputs = {'subject': 'Mathematics'}
+        base = AIResultStore.key(routing.TERM_PLAN, 'gpt-4', inputs)
+        self.assertNotEqual(base, AIResultStore.key(routing.TERM_PLAN, 'gpt-5-mini', inputs))
+        with override_settings(AI_PROMPT_VERSION='2'):
+            self.assertNotEqual(base, AIResultStore.key(routing.TERM_PLAN, 'gpt-4', inputs))
+
+    def test_duplicate_saves_keep_one_row(self):
+        for text in ('first', 'second'):
+            AIResultStore.save(routing.ASSESSMENT, 'gpt-4', {'objective': 'x'}, text, [])
+        self.assertEqual(AIResult.objects.get().raw_text, 'first')
+
+    def test_empty_results_are_not_stored(self):
+        make_service(text='nothing useful').generate_term_plan('Mathematics', '9th', 1)
+        self.assertFalse(AIResult.objects.exists())
+
+    @override_settings(AI_RESULT_STORE=False)
+    def test_store_can_be_disabled(self):
+        service = make_service()
+        service.generate_term_plan('Mathematics', '9th', 1)
+        service.generate_term_plan('Mathematics', '9th', 1)
+        self.assertEqual(service.ai.complete.call_count, 2)
+
+    def test_clearing_teacher_cache_regenerates_stored_results(self):
+        service = make_service(teacher_id=7)
+        service.generate_term_plan('Mathematics', '9th', 1)
+        service.generate_term_plan('Mathematics', '9th', 1)
+        self.assertEqual(service.ai.complete.call_count, 1)
+
+        AIOperationCache.clear_teacher_cache(7)
+        self.assertFalse(service.has_stored_term_plan('Mathematics', '9th', 1))
+        service.generate_term_plan('Mathematics', '9th', 1)
+        service.generate_term_plan('Mathematics', '9th', 1)
+
+        self.assertEqual(service.ai.complete.call_count, 2)
+        self.assertEqual(AIResult.objects.count(), 1)
+
+    def test_clearing_subject_cache_regenerates_assessments(self):
+        service = make_service(text='Question: What is 2x if x = 3?\nAnswer: 6\n')
+        objective = LearningObjective('Double numbers', 'Mathematics', '9th', [], [])
+        service.generate_assessment(objective, 'formative')
+
+        AIOperationCache.clear_subject_cache('History')
+        service.generate_assessment(objective, 'formative')
+        self.assertEqual(service.ai.complete.call_count, 1)
+
+        AIOperationCache.clear_subject_cache('mathematics')
+        service.generate_assessment(objective, 'formative')
+        self.assertEqual(service.ai.complete.call_count, 2)
+
+    def test_clears_outlive_the_django_cache(self):
+        """A clear seen by one worker holds for others and after a restart."""
+        service = make_service(teacher_id=7)
+        service.generate_term_plan('Mathematics', '9th', 1)
+        AIOperationCache.clear_teacher_cache(7)
+        self.assertTrue(AITagInvalidation.objects.filter(tag='teacher:7').exists())
+
+        cache.clear()
+        self.assertFalse(service.has_stored_term_plan('Mathematics', '9th', 1))
+        service.generate_term_plan('Mathematics', '9th', 1)
+        self.assertEqual(service.ai.complete.call_count, 2)
+
+    def test_prune_removes_unused_results(self):
+        AIResultStore.save(routing.TERM_PLAN, 'gpt-4', {'term': 1}, 'old', [])
+        AIResultStore.save(routing.TERM_PLAN, 'gpt-4', {'term': 2}, 'recent', [])
+        AIResult.objects.filter(raw_text='old').update(
+            last_used_at=timezone.now() - timedelta(days=200)
+        )
+        self.assertEqual(AIResultStore.prune(180), 1)
+        self.assertEqual(list(AIResult.objects.values_list('raw_text', flat=True)), ['recent'])
@@ -0,0 +1,150 @@
+"""Tests for latency-aware model routing and hedged requests."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from joyland.integrations import routing
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.routing import LatencyTracker, ModelRouter
+
+
+def seed(router, model, task, latency, ok=True, count=20):
+    for _ in range(count):
+        router.tracker.record(model, task, latency, ok)
+
+
+@override_settings(AI_FAST_MODEL='fast', AI_ROUTER_MIN_SAMPLES=20)
+class ModelRouterTests(TestCase):
+    def setUp(self):
+        self.router = ModelRouter()
+
+    def test_fast_tasks_prefer_fast_model(self):
+        self.assertEqual(self.router.choose('quality', routing.ANNOUNCEMENT_DRAFT), 'fast')
+        self.assertEqual(self.router.choose('quality', routing.TERM_PLAN), 'quality')
+
+    def test_fast_tasks_follow_measured_latency(self):
+        seed(self.router, 'fast', routing.ANNOUNCEMENT_DRAFT, 3.0)
+        seed(self.router, 'quality', routing.ANNOUNCEMENT_DRAFT, 1.0)
+        self.assertEqual(self.router.choose('quality', routing.ANNOUNCEMENT_DRAFT), 'quality')
+
+    def test_unhealthy_model_is_skipped(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 1.0, ok=False)
+        self.assertEqual(self.router.choose('quality', routing.TERM_PLAN), 'fast')
+
+    def test_tracker_percentiles(self):
+        tracker = LatencyTracker()
+        for latency in range(1, 101):
+            tracker.record('m', 't', float(latency), ok=True)
+        tracker.record('m', 't', 0.1, ok=False)
+        summary = tracker.summary('m', 't')
+        self.assertEqual(summary['p50'], 51.0)
+        self.assertEqual(summary['p95'], 95.0)
+        self.assertAlmostEqual(summary['error_rate'], 1 / 101)
+
+    @override_settings(AI_HEDGE_REQUESTS=True)
+    def test_hedge_answers_slow_request(self):
+        """A request outliving p95 is duplicated and the faster reply wins."""
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.05)
+
+        def request(model):
+            if threading.current_thread().name == 'ai-call':
+                time.sleep(1.0)
+                return 'slow'
+            return 'hedge'
+
+        started = time.monotonic()
+        result = self.router.call('quality', routing.TERM_PLAN, request)
+
+        self.assertEqual(result, 'hedge')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.router.stats()['hedged'], 1)
+        self.assertEqual(self.router.stats()['hedge_wins'], 1)
+
+    @override_settings(AI_HEDGE_REQUESTS=True)
+    def test_hedge_covers_failed_request(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.05)
+
+        def request(model):
+            if threading.current_thread().name == 'ai-call':
+                time.sleep(0.1)
+                raise TimeoutError('upstream stalled')
+            time.sleep(0.2)
+            return 'hedge'
+
+        self.assertEqual(self.router.call('quality', routing.TERM_PLAN, request), 'hedge')
+        self.assertEqual(self.router.stats()['hedge_wins'], 1)
+
+    @override_settings(AI_HEDGE_REQUESTS=True)
+    def test_original_error_is_raised_when_both_fail(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.05)
+
+        def request(model):
+            time.sleep(0.1)
+            if threading.current_thread().name == 'ai-call':
+                raise TimeoutError('original')
+            raise ConnectionError('hedge')
+
+        with self.assertRaisesMessage(TimeoutError, 'original'):
+            self.router.call('quality', routing.TERM_PLAN, request)
+        self.assertEqual(self.router.stats()['hedge_wins'], 0)
+
+    @override_settings(AI_HEDGE_REQUESTS=True)
+    def test_original_finishing_first_keeps_its_result(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.05)
+
+        def request(model):
+            if threading.current_thread().name == 'ai-call':
+                time.sleep(0.1)
+                return 'original'
+            time.sleep(0.5)
+            return 'hedge'
+
+        self.assertEqual(self.router.call('quality', routing.TERM_PLAN, request), 'original')
+        self.assertEqual(self.router.stats()['hedged'], 1)
+        self.assertEqual(self.router.stats()['hedge_wins'], 0)
+
+    @override_settings(AI_HEDGE_REQUESTS=True)
+    def test_fast_request_is_not_hedged(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.5)
+        self.assertEqual(self.router.call('quality', routing.TERM_PLAN, lambda m: m), 'quality')
+        time.sleep(0.6)
+        self.assertEqual(self.router.stats()['hedged'], 0)
+
+    def test_no_hedging_by_default(self):
+        seed(self.router, 'quality', routing.TERM_PLAN, 0.01)
+        self.assertEqual(self.router.call('quality', routing.TERM_PLAN, lambda m: m), 'quality')
+        self.assertEqual(self.router.stats()['hedged'], 0)
+
+
+class OpenAIClientRoutingTests(TestCase):
+    @override_settings(AI_FAST_MODEL='fast-model', OPENAI_DEFAULT_MODEL='gpt-4',
+                       ENABLE_GPT5_MINI=False)
+    @patch('openai.Completion.create')
+    def test_task_routes_model(self, mock_complete):
+        mock_complete.return_value = {'choices': [{'text': 'Dear parents'}]}
+        client = OpenAIClient()
+        client.draft_announcement('Sports day', 'parents', ['Friday'])
+        self.assertEqual(mock_complete.call_args.kwargs['model'], 'fast-model')
+
+        client.complete('Plan', task=routing.TERM_PLAN)
+        self.assertEqual(mock_complete.call_args.kwargs['model'], 'gpt-4')
+
+    @patch('joyland.integrations.openai.model_router')
+    @patch('openai.Completion.create')
+    def test_streams_record_latency_samples(self, mock_complete, router):
+        mock_complete.return_value = iter([{'choices': [{'text': 'Dear'}]}])
+        self.assertEqual(
+            list(OpenAIClient(model='custom').stream_complete('Hi', task='x')), ['Dear']
+        )
+        router.record.assert_called_once()
+        self.assertEqual(router.record.call_args.args[:2], ('custom', 'x'))
+        self.assertTrue(router.record.call_args.kwargs['ok'])
+
+    @patch('openai.Completion.create')
+    def test_pinned_model_bypasses_routing(self, mock_complete):
+        mock_complete.return_value = {'choices': [{'text': 'Hi'}]}
+        OpenAIClient(model='custom').draft_announcement('Sports day', 'parents', [])
+        self.assertEqual(mock_complete.call_args.kwargs['model'], 'custom')
@@ -0,0 +1,168 @@
+"""Tests for the offline semantic prompt cache."""
+
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from joyland.cache_utils import AIOperationCache
+from joyland.integrations.education import (
+    AssessmentItem,
+    EducationalAIService,
+    LearningObjective,
+)
+from joyland.integrations.similarity import SemanticCache, SimilarityIndex, semantic_cache
+
+
+class SimilarityIndexTests(TestCase):
+    """Test vectorisation and cosine search."""
+
+    def setUp(self):
+        self.index = SimilarityIndex()
+        for text in ['solve linear equations', 'Graph quadratic functions',
+                     'Add and subtract fractions']:
+            self.index.add(text, text)
+
+    def test_rephrased_objective_is_closest(self):
+        """A rephrasing ranks its original first."""
+        score, text, _ = self.index.search('Solving linear equations in one variable')[0]
+        self.assertEqual(text, 'solve linear equations')
+        self.assertGreater(score, 0.6)
+
+    def test_identical_text_scores_one(self):
+        """Case and inflection differences still match exactly."""
+        score, _, _ = self.index.search('Graphing quadratic functions')[0]
+        self.assertAlmostEqual(score, 1.0, places=4)
+
+    def test_weighted_matrix_is_rebuilt_only_after_insert(self):
+        """Searches reuse the cached idf-weighted matrix until the next add."""
+        self.index.search('fractions')
+        cached = self.index._weighted
+        self.index.search('equations')
+        self.assertIs(self.index._weighted, cached)
+        self.index.add('Describe the water cycle', 'water')
+        self.assertEqual(self.index.search('water cycle')[0][1], 'Describe the water cycle')
+        self.assertIsNot(self.index._weighted, cached)
+
+    def test_eviction_keeps_index_bounded(self):
+        """The oldest entries are dropped beyond max_entries."""
+        index = SimilarityIndex(max_entries=2)
+        for text in ['one', 'two', 'three']:
+            index.add(text, text)
+        self.assertEqual(len(index), 2)
+        self.assertNotIn('one', [text for _, text, _ in index.search('one', k=2)])
+
+
+@override_settings(AI_SEMANTIC_CACHE=True)
+class SemanticCacheTests(TestCase):
+    """Test thresholded lookups and statistics."""
+
+    def test_threshold_controls_hits(self):
+        """Only matches at or above the threshold are returned."""
+        cache = SemanticCache(threshold=0.55)
+        cache.store('maths', 'solve linear equations', ['items'])
+        self.assertEqual(
+            cache.lookup('maths', 'Solving linear equations in one variable'), ['items']
+        )
+        self.assertIsNone(cache.lookup('maths', 'Describe the water cycle'))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['threshold'], 0.55)
+        self.assertFalse(stats['recent'][-1]['hit'])
+
+    def test_swapped_content_words_never_match(self):
+        """Objectives differing in an operation or concept are not reused."""
+        cache = SemanticCache(threshold=0.5)
+        cache.store('maths', 'Add fractions with unlike denominators', ['add'])
+        cache.store('maths', 'Solve linear equations in one variable', ['equations'])
+        self.assertIsNone(cache.lookup('maths', 'Subtract fractions with unlike denominators'))
+        self.assertIsNone(cache.lookup('maths', 'Multiply fractions with unlike denominators'))
+        self.assertIsNone(cache.lookup('maths', 'Solve linear inequalities in one variable'))
+        self.assertEqual(
+            cache.lookup('maths', 'Adding fractions with unlike denominators'), ['add']
+        )
+
+    def test_default_threshold_is_conservative(self):
+        """Rephrasings with extra qualifiers miss at the default threshold."""
+        cache = SemanticCache()
+        cache.store('maths', 'Solve linear equations in one variable', ['items'])
+        self.assertIsNone(cache.lookup('maths', 'Subtract fractions'))
+        self.assertEqual(
+            cache.lookup('maths', 'Solving linear equations in one variable'), ['items']
+        )
+        self.assertGreaterEqual(cache.threshold, 0.85)
+
+    def test_buckets_are_isolated(self):
+        """Results are only reused within the same context."""
+        cache = SemanticCache(threshold=0.5)
+        cache.store(('assessment', 'mathematics'), 'solve linear equations', ['items'])
+        self.assertIsNone(cache.lookup(('assessment', 'physics'), 'solve linear equations'))
+
+    def test_entries_from_older_tag_versions_miss(self):
+        cache = SemanticCache(threshold=0.5)
+        cache.store('maths', 'solve linear equations', ['old'], {'subject:maths': 1})
+        self.assertIsNone(
+            cache.lookup('maths', 'solve linear equations', {'subject:maths': 2})
+        )
+        self.assertEqual(
+            cache.lookup('maths', 'solve linear equations', {'subject:maths': 1}), ['old']
+        )
+
+    @override_settings(AI_SEMANTIC_CACHE_THRESHOLD=0.5)
+    @patch.object(EducationalAIService, '_parse_assessment_items')
+    def test_clears_and_prompt_versions_bypass_near_duplicates(self, mock_parse):
+        """Cache clears, prompt versions and models each start afresh."""
+        semantic_cache.clear()
+        self.addCleanup(semantic_cache.clear)
+        mock_parse.return_value = [
+            AssessmentItem('What is x if 2x = 4?', 'Mathematics', '9th',
+                           'Solve linear equations', {'5': 'x = 2'})
+        ]
+        ai = MagicMock()
+        ai.model = 'gpt-4'
+        ai.complete.return_value = {'choices': [{'text': 'Question: What is x if 2x = 4?'}]}
+        service = EducationalAIService(ai)
+
+        def generate(text):
+            objective = LearningObjective(text, 'Mathematics', '9th', [], [])
+            service.generate_assessment(objective, 'formative')
+
+        with override_settings(AI_RESULT_STORE=False):
+            generate('Solve linear equations')
+            AIOperationCache.clear_subject_cache('Mathematics')
+            generate('Solving linear equations in one variable')
+            self.assertEqual(ai.complete.call_count, 2)
+
+            with override_settings(AI_PROMPT_VERSION='2'):
+                generate('Solving linear equations')
+            self.assertEqual(ai.complete.call_count, 3)
+
+            ai.model = 'gpt-4o'
+            generate('Solving linear equations')
+            self.assertEqual(ai.complete.call_count, 4)
+
+    @override_settings(AI_SEMANTIC_CACHE_THRESHOLD=0.5)
+    @patch.object(EducationalAIService, '_parse_assessment_items')
+    def test_generate_assessment_reuses_near_duplicate(self, mock_parse):
+        """EducationalAIService skips the upstream call for a rephrased objective."""
+        semantic_cache.clear()
+        mock_parse.return_value = [
+            AssessmentItem('What is x if 2x = 4?', 'Mathematics', '9th',
+                           'Solve linear equations', {'5': 'x = 2'})
+        ]
+        ai = MagicMock()
+        ai.complete.return_value = {'choices': [{'text': 'Question: What is x if 2x = 4?'}]}
+        service = EducationalAIService(ai)
+
+        def objective(text):
+            return LearningObjective(text, 'Mathematics', '9th', [], [])
+
+        first = service.generate_assessment(objective('Solve linear equations'), 'formative')
+        second = service.generate_assessment(
+            objective('Solving linear equations in one variable'), 'formative'
+        )
+        self.assertEqual([item.question for item in first], [item.question for item in second])
+        self.assertEqual(second[0].learning_objective, 'Solving linear equations in one variable')
+        self.assertEqual(ai.complete.call_count, 1)
+        semantic_cache.clear()
@@ -0,0 +1,108 @@
+"""Tests for single-flight request coalescing."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.singleflight import SingleFlight, flight_key
+
+
+class FlightKeyTests(TestCase):
+    """Test coalescing key derivation."""
+
+    def test_whitespace_is_normalized(self):
+        """Prompts differing only in whitespace share a key."""
+        self.assertEqual(
+            flight_key('gpt-4', 'Plan  for\n Mathematics ', max_tokens=10),
+            flight_key('gpt-4', 'Plan for Mathematics', max_tokens=10)
+        )
+
+    def test_model_and_params_are_part_of_key(self):
+        """Different models or parameters never coalesce."""
+        base = flight_key('gpt-4', 'prompt', max_tokens=10)
+        self.assertNotEqual(base, flight_key('gpt-5-mini', 'prompt', max_tokens=10))
+        self.assertNotEqual(base, flight_key('gpt-4', 'prompt', max_tokens=20))
+
+
+class SingleFlightTests(TestCase):
+    """Test in-process and cross-worker coalescing."""
+
+    def setUp(self):
+        cache.clear()
+        self.group = SingleFlight(namespace='test_inflight', poll_interval=0.01)
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Concurrent callers with the same key run the function once."""
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return {'choices': [{'text': 'shared'}]}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.group.do('k', slow)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r == results[0] for r in results))
+
+    def test_errors_propagate_and_clear_flight(self):
+        """Upstream errors are raised and do not poison the key."""
+        def boom():
+            raise RuntimeError('upstream down')
+
+        with self.assertRaises(RuntimeError):
+            self.group.do('k', boom)
+        # The flight is cleared so a later call runs again
+        self.assertEqual(self.group.do('k', lambda: 'ok'), 'ok')
+
+    def test_follows_leader_in_another_worker(self):
+        """A result published by another worker's leader is reused."""
+        lock_key = 'test_inflight:lock:k'
+        cache.set(lock_key, 'other-flight', 60)
+        cache.set(f'{lock_key}:result:other-flight', {'result': 'from-worker-2'}, 60)
+
+        result = self.group.do('k', lambda: self.fail('should not call upstream'))
+        self.assertEqual(result, 'from-worker-2')
+
+
+class OpenAIClientCoalescingTests(TestCase):
+    """Test that OpenAIClient.complete coalesces identical requests."""
+
+    def setUp(self):
+        cache.clear()
+
+    @patch('openai.Completion.create')
+    def test_identical_concurrent_completions_call_upstream_once(self, mock_complete):
+        """Concurrent identical completions share one upstream request."""
+        def slow_create(**kwargs):
+            time.sleep(0.1)
+            return {'choices': [{'text': 'plan'}]}
+        mock_complete.side_effect = slow_create
+
+        client = OpenAIClient(model='gpt-4')
+        threads = [
+            threading.Thread(target=client.complete, args=('Term plan',))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_complete.call_count, 1)
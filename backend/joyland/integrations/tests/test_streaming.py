@@ -0,0 +1,81 @@
+"""Tests for streamed AI generations."""
+
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.streaming import IncrementalParser, sse_event
+
+TERM_PLAN = """Description: Solve linear equations
+Skills: algebra, reasoning
+Assessment:
+- Solves one-step equations
+
+Description: Graph linear functions
+Skills: graphing
+Assessment:
+- Plots points accurately
+"""
+
+
+def tokens(text, size=7):
+    """Split text into fixed-size fragments, like a token stream."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class IncrementalParserTests(TestCase):
+    """Test block-at-a-time parsing of streamed text."""
+
+    def test_items_emitted_when_block_closes(self):
+        """Each block is parsed as soon as its blank line arrives."""
+        parser = IncrementalParser(lambda block: [block])
+        self.assertEqual(list(parser.feed('first\nline\n')), [])
+        self.assertEqual(list(parser.feed('\nsecond')), ['first\nline'])
+        self.assertEqual(list(parser.close()), ['second'])
+
+    def test_stream_matches_batch_parse(self):
+        """Streaming yields the same objectives as parsing the whole text."""
+        service = EducationalAIService(MagicMock())
+        service.ai.stream_complete.return_value = iter(tokens(TERM_PLAN))
+
+        streamed = [
+            value for kind, value in service.stream_term_plan('Mathematics', '9th', 2)
+            if kind == 'objective'
+        ]
+        expected = service._parse_term_plan(TERM_PLAN, 'Mathematics', '9th', 2)
+        self.assertEqual(streamed, expected)
+        self.assertEqual(len(streamed), 2)
+        self.assertEqual(streamed[0].subject_area, 'Mathematics')
+
+    def test_first_objective_precedes_remaining_tokens(self):
+        """The first objective is yielded before the stream finishes."""
+        service = EducationalAIService(MagicMock())
+        service.ai.stream_complete.return_value = iter(tokens(TERM_PLAN))
+
+        kinds = [kind for kind, _ in service.stream_term_plan('Mathematics', '9th', 2)]
+        self.assertLess(kinds.index('objective'), len(kinds) - 2)
+        self.assertIn('token', kinds[kinds.index('objective'):])
+
+
+class StreamCompleteTests(TestCase):
+    """Test OpenAIClient.stream_complete."""
+
+    @patch('openai.Completion.create')
+    def test_yields_text_fragments(self, mock_complete):
+        """Chunk texts are relayed in order and empty chunks skipped."""
+        mock_complete.return_value = iter([
+            {'choices': [{'text': 'Desc'}]},
+            {'choices': [{'text': ''}]},
+            {'choices': [{'text': 'ription'}]},
+        ])
+        fragments = list(OpenAIClient(model='gpt-4').stream_complete('prompt'))
+
+        self.assertEqual(fragments, ['Desc', 'ription'])
+        self.assertTrue(mock_complete.call_args.kwargs['stream'])
+
+    def test_sse_event_format(self):
+        """Events are formatted per the SSE wire format."""
+        self.assertEqual(sse_event('done', {'cached': False}),
+                         'event: done\ndata: {"cached": false}\n\n')
@@ -0,0 +1,126 @@
+"""Tests for structured JSON output and schema validation."""
+
+import json
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase, override_settings
+
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.structured import (
+    SCHEMAS,
+    SchemaError,
+    complete_structured,
+    structured_stats,
+)
+
+
+def reply(text):
+    return {'choices': [{'text': text}]}
+
+
+class SchemaTests(SimpleTestCase):
+    def test_valid_reply_is_normalized(self):
+        data = SCHEMAS['assessment'].validate(
+            '```json\n'
+            '{"items": [{"question": " Solve x ", "rubric": {"1": "tries"}, "extra": 1}]}\n'
+            '```'
+        )
+        self.assertEqual(data, {'items': [{'question': 'Solve x', 'rubric': {'1': 'tries'}}]})
+
+    def test_errors_report_the_path(self):
+        cases = {
+            '{"items": [{"rubric": {}}]}': 'assessment.items[0].question: missing',
+            '{"items": []}': 'assessment.items: expected at least one item',
+            '{"items": [{"question": "q", "rubric": {"1": 3}}]}':
+                'assessment.items[0].rubric.1: expected a string',
+            'Question: what?': 'reply contains no JSON object',
+        }
+        for text, message in cases.items():
+            with self.assertRaisesMessage(SchemaError, message):
+                SCHEMAS['assessment'].validate(text)
+
+    def test_numbers_reject_booleans(self):
+        with self.assertRaises(SchemaError):
+            SCHEMAS['workload_analysis'].validate(
+                '{"total_hours": true, "warnings": [], "recommendations": []}'
+            )
+
+
+@override_settings(AI_JSON_OUTPUT=True)
+class CompleteStructuredTests(SimpleTestCase):
+    def setUp(self):
+        structured_stats.reset()
+        self.complete = MagicMock()
+
+    def run_workload(self):
+        return complete_structured(
+            self.complete, 'Analyze', 'workload_analysis', parse_text=lambda text: {'parsed': text}
+        )[0]
+
+    def test_prompt_asks_for_json(self):
+        self.complete.return_value = reply(
+            '{"total_hours": 20, "warnings": [], "recommendations": ["rest"]}'
+        )
+        self.assertEqual(
+            self.run_workload(), {'total_hours': 20.0, 'warnings': [], 'recommendations': ['rest']}
+        )
+        self.assertIn('"total_hours": 0', self.complete.call_args[0][0])
+        self.assertEqual(structured_stats.stats()['workload_analysis']['valid'], 1)
+
+    def test_invalid_reply_is_retried_once(self):
+        self.complete.side_effect = [
+            reply('{"total_hours": "lots"}'),
+            reply('{"total_hours": 20, "warnings": [], "recommendations": []}'),
+        ]
+        self.assertEqual(self.run_workload()['total_hours'], 20.0)
+        self.assertIn(
+            'workload_analysis.total_hours: expected a number', self.complete.call_args[0][0]
+        )
+        self.assertEqual(structured_stats.stats()['workload_analysis']['retried'], 1)
+
+    def test_text_mode_is_the_last_resort(self):
+        self.complete.side_effect = [reply('{"total'), reply('{"total'), reply('Total hours: 20')]
+        self.assertEqual(self.run_workload(), {'parsed': 'Total hours: 20'})
+        self.assertEqual(self.complete.call_count, 3)
+        self.assertEqual(self.complete.call_args[0][0], 'Analyze')
+        self.assertEqual(structured_stats.stats()['workload_analysis']['fallback'], 1)
+
+    @override_settings(AI_JSON_OUTPUT=False)
+    def test_text_mode_is_unchanged(self):
+        self.complete.return_value = reply('Total hours: 20')
+        self.assertEqual(self.run_workload(), {'parsed': 'Total hours: 20'})
+        self.assertEqual(self.complete.call_args[0][0], 'Analyze')
+
+
+@override_settings(AI_JSON_OUTPUT=True, AI_RESULT_STORE=False)
+class ServiceJsonModeTests(SimpleTestCase):
+    def test_assessment_items_are_built_from_json(self):
+        ai = MagicMock()
+        ai.complete.return_value = reply(json.dumps({'items': [
+            {'question': 'Solve 2x = 4', 'rubric': {'5': 'x = 2'}, 'sample_answer': 'x = 2'},
+        ]}))
+        items = EducationalAIService(ai).generate_assessment('Solve linear equations', 'formative')
+
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].question, 'Solve 2x = 4')
+        self.assertEqual(items[0].rubric, {'5': 'x = 2'})
+        self.assertEqual(items[0].learning_objective, 'Solve linear equations')
+
+    def test_malformed_json_falls_back_to_text_items(self):
+        ai = MagicMock()
+        ai.complete.side_effect = [
+            reply('{"items": [{"question": "Solve'),
+            reply('{"items": []}'),
+            reply('Question: Solve 2x = 4\nRubric:\n- 5: x = 2\nSample answer: x = 2'),
+        ]
+        items = EducationalAIService(ai).generate_assessment('Solve linear equations', 'formative')
+
+        self.assertEqual([item.question for item in items], ['Solve 2x = 4'])
+        self.assertNotIn('JSON', ai.complete.call_args[0][0])
+
+    def test_rubric_line_without_colon_does_not_fail_text_parsing(self):
+        service = EducationalAIService(MagicMock())
+        items = service._parse_assessment_items(
+            'Question: Solve x\nRubric:\n- full marks\n- 5: correct'
+        )
+        self.assertEqual(items[0].rubric, {'5': 'correct'})
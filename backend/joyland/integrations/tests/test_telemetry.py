@@ -0,0 +1,130 @@
+"""Tests for AI call telemetry."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from joyland.integrations import routing
+from joyland.integrations.budget import token_usage
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.resilience import get_resilient_caller
+from joyland.integrations.result_store import AIResultStore
+from joyland.integrations.telemetry import (
+    AITelemetry,
+    Histogram,
+    collect_metrics,
+    render_prometheus,
+    telemetry,
+)
+
+
+class HistogramTests(TestCase):
+    def test_buckets_and_quantiles(self):
+        histogram = Histogram((0.5, 1.0, 5.0))
+        for value in (0.2, 0.5, 0.7, 3.0, 9.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], [(0.5, 2), (1.0, 3), (5.0, 4)])
+        self.assertEqual(snapshot['count'], 5)
+        self.assertAlmostEqual(snapshot['sum'], 13.4)
+        self.assertEqual(snapshot['p50'], 1.0)
+        self.assertIsNone(snapshot['p99'])
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class RecorderTests(TestCase):
+    def test_calls_tokens_errors_and_caches(self):
+        recorder = AITelemetry()
+        recorder.record_call(
+            'complete', 'term_plan', 0.3, {'prompt_tokens': 10, 'completion_tokens': 40}
+        )
+        recorder.record_call('complete', 'term_plan', 1.2, error=TimeoutError())
+        recorder.record_cache('result_store', True)
+        recorder.record_cache('result_store', False)
+
+        snapshot = recorder.snapshot()
+        calls = snapshot['calls']['complete/term_plan']
+        self.assertEqual((calls['calls'], calls['errors'], calls['error_rate']), (2, 1, 0.5))
+        self.assertEqual((calls['prompt_tokens'], calls['completion_tokens']), (10, 40))
+        self.assertEqual(snapshot['errors'], [
+            {'operation': 'complete', 'task': 'term_plan', 'error': 'TimeoutError', 'count': 1}
+        ])
+        self.assertEqual(snapshot['caches']['result_store']['hit_rate'], 0.5)
+
+
+@override_settings(AI_SINGLE_FLIGHT=False, AI_MAX_RETRIES=0)
+class ClientInstrumentationTests(TestCase):
+    def setUp(self):
+        telemetry.reset()
+        get_resilient_caller().reset()
+
+    @patch('openai.Completion.create')
+    def test_complete_and_embed_are_recorded(self, mock_complete):
+        mock_complete.return_value = {
+            'choices': [{'text': 'ok'}],
+            'usage': {'prompt_tokens': 12, 'completion_tokens': 3},
+        }
+        OpenAIClient(model='gpt-4').complete('Plan a term', task=routing.TERM_PLAN)
+        with patch('openai.Embedding.create', side_effect=ValueError('bad input')):
+            with self.assertRaises(ValueError):
+                OpenAIClient(model='gpt-4').embed('text')
+
+        snapshot = telemetry.snapshot()
+        self.assertEqual(snapshot['calls']['complete/term_plan']['prompt_tokens'], 12)
+        self.assertEqual(snapshot['calls']['embed/embedding']['errors'], 1)
+        self.assertEqual(snapshot['errors'][0]['error'], 'ValueError')
+
+    @override_settings(AI_SINGLE_FLIGHT=True)
+    @patch('openai.Completion.create')
+    def test_coalesced_calls_count_tokens_once(self, mock_complete):
+        """Single-flight followers add latency samples but no tokens."""
+        def slow_create(**kwargs):
+            time.sleep(0.1)
+            return {'choices': [{'text': 'ok'}], 'usage': {'prompt_tokens': 12}}
+        mock_complete.side_effect = slow_create
+        token_usage.reset()
+        self.addCleanup(token_usage.reset)
+
+        client = OpenAIClient(model='gpt-4')
+        threads = [
+            threading.Thread(target=client.complete, args=('Plan a term',),
+                             kwargs={'task': routing.TERM_PLAN})
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mock_complete.call_count, 1)
+        snapshot = telemetry.snapshot()
+        calls = snapshot['calls']['complete/term_plan']
+        self.assertEqual((calls['calls'], calls['prompt_tokens']), (3, 12))
+        self.assertEqual(snapshot['caches']['single_flight'], {
+            'hits': 2, 'misses': 1, 'hit_rate': 2 / 3
+        })
+        self.assertEqual(token_usage.stats()[routing.TERM_PLAN]['prompt_tokens'], 12)
+
+    def test_result_store_lookups_are_recorded(self):
+        AIResultStore.get(routing.TERM_PLAN, 'gpt-4', {'subject': 'Physics'})
+        self.assertEqual(telemetry.snapshot()['caches']['result_store']['misses'], 1)
+
+    @patch('openai.Completion.create')
+    def test_prometheus_export(self, mock_complete):
+        mock_complete.return_value = {'choices': [{'text': 'ok'}], 'usage': {'prompt_tokens': 5}}
+        OpenAIClient(model='gpt-4').complete('Plan a term', task=routing.TERM_PLAN)
+
+        text = render_prometheus(collect_metrics())
+        self.assertIn('# TYPE joyland_ai_call_duration_seconds histogram', text)
+        self.assertIn(
+            'joyland_ai_call_duration_seconds_bucket'
+            '{operation="complete",task="term_plan",le="+Inf"} 1',
+            text
+        )
+        self.assertIn(
+            'joyland_ai_tokens_total{operation="complete",task="term_plan",kind="prompt"} 5', text
+        )
+        self.assertIn('joyland_ai_circuit_open 0', text)
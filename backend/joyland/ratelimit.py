@@ -0,0 +1,224 @@
+"""Fair-share concurrency and rate limiting for AI endpoints.
+
+State lives in the Django cache, so limits are shared by every worker only
+when ``CACHES`` points at a shared backend; with the default per-process
+cache each worker enforces them separately (``manage.py check`` warns about
+this, see ``core.checks``). Each request to a limited view must pass three
+checks:
+
+* a per-user request rate (sliding window built from two fixed-window
+  counters, which only needs the atomic ``add``/``incr`` every cache
+  backend provides);
+* a per-user cap on concurrent AI requests;
+* a global cap on concurrent AI requests. Views that fan out (class
+  analysis) are charged one global slot per upstream call they run at
+  once, so the cap tracks upstream load rather than HTTP requests.
+
+Users who already hold a slot may only fill the global cap up to
+AI_LIGHT_USER_RESERVE below it; the reserved slots are kept for users with
+nothing in flight. Freed capacity therefore goes to light users first and
+the median teacher's latency stays flat while a few heavy users are
+throttled. Nothing waits inside the request: when no slot is free the
+response is 429 with a Retry-After header.
+"""
+
+import logging
+import math
+import time
+from functools import wraps
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai_limit'
+# Counters expire so a crashed worker cannot leak slots forever
+SLOT_TIMEOUT = 600
+
+
+def _incr(key: str, timeout: int = SLOT_TIMEOUT, delta: int = 1) -> int:
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired between add and incr
+        cache.add(key, delta, timeout)
+        return delta
+
+
+def _decr(key: str, delta: int = 1) -> None:
+    try:
+        if cache.decr(key, delta) < 0:
+            cache.set(key, 0, SLOT_TIMEOUT)
+    except ValueError:
+        pass
+
+
+def check_rate(scope: str, limit: int, period: int = 60) -> Tuple[bool, int]:
+    """Count a request against a sliding-window rate limit.
+
+    Args:
+        scope: Identity being limited (e.g. ``user:42``)
+        limit: Requests allowed per period
+        period: Window length in seconds
+
+    Returns:
+        (allowed, seconds until retrying makes sense)
+    """
+    now = time.time()
+    window = int(now // period)
+    elapsed = (now % period) / period
+    current_key = f"{KEY_PREFIX}:rate:{scope}:{window}"
+    previous = cache.get(f"{KEY_PREFIX}:rate:{scope}:{window - 1}", 0)
+    current = _incr(current_key, timeout=period * 2)
+
+    # Weight the previous window by how much of it still overlaps
+    estimated = previous * (1 - elapsed) + current
+    if estimated <= limit:
+        return True, 0
+    _decr(current_key)
+    return False, max(1, math.ceil(period * (1 - elapsed)))
+
+
+class ConcurrencySlot:
+    """A held per-user and global concurrency slot; release exactly once."""
+
+    def __init__(self, user_key: str, global_key: str, weight: int = 1):
+        self.user_key = user_key
+        self.global_key = global_key
+        self.weight = weight
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            _decr(self.user_key)
+            _decr(self.global_key, self.weight)
+
+
+def acquire_slot(user_id: int, weight: int = 1) -> Optional[ConcurrencySlot]:
+    """Try to take a concurrency slot for ``user_id``.
+
+    Args:
+        user_id: User making the request
+        weight: Upstream calls the request runs at once; charged against
+            the global cap (the per-user cap counts the request once)
+
+    Returns:
+        The held slot, or None if the user must back off
+    """
+    user_limit = getattr(settings, 'AI_USER_CONCURRENCY', 2)
+    global_limit = getattr(settings, 'AI_GLOBAL_CONCURRENCY', 20)
+    user_key = f"{KEY_PREFIX}:inflight:user:{user_id}"
+    global_key = f"{KEY_PREFIX}:inflight:global"
+    weight = max(1, min(weight, global_limit))
+
+    in_flight = _incr(user_key)
+    if in_flight > user_limit:
+        _decr(user_key)
+        return None
+
+    # Users with a request already in flight cannot take the reserved slots
+    limit = global_limit
+    if in_flight > 1:
+        limit -= getattr(settings, 'AI_LIGHT_USER_RESERVE', 2)
+    # Checked before incrementing so a full cap is not inflated by rejections
+    if cache.get(global_key, 0) + weight <= limit:
+        if _incr(global_key, delta=weight) <= limit:
+            return ConcurrencySlot(user_key, global_key, weight)
+        # Lost a race for the last slots
+        _decr(global_key, weight)
+    _decr(user_key)
+    return None
+
+
+class ReleasingStream:
+    """Streaming body that releases a slot once exhausted, failed or closed.
+
+    Django calls ``close()`` on a streaming body when the response is
+    closed, which also covers clients that disconnect before the first
+    chunk (a generator's ``finally`` would not run if it never started).
+    """
+
+    def __init__(self, content: Iterable[Any], slot: ConcurrencySlot):
+        self._content = iter(content)
+        self._slot = slot
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._content)
+        except BaseException:
+            # Includes StopIteration at the end of the stream
+            self._slot.release()
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._content, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._slot.release()
+
+
+def too_many_requests(retry_after: int) -> JsonResponse:
+    response = JsonResponse(
+        {'error': 'Too many AI requests, please try again shortly'}, status=429
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def ai_rate_limit(
+    view: Optional[Callable[..., HttpResponse]] = None,
+    *,
+    upstream_calls: Optional[Callable[[HttpRequest], int]] = None
+) -> Callable:
+    """Apply per-user and global AI limits to a view.
+
+    Use as ``@ai_rate_limit``, or as ``@ai_rate_limit(upstream_calls=...)``
+    for views that run several upstream calls at once; the callable
+    returns that number for a request and it is charged against the global
+    concurrency cap. Streaming responses keep their slot until the
+    response is closed.
+    """
+    if view is None:
+        return lambda view: ai_rate_limit(view, upstream_calls=upstream_calls)
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not getattr(settings, 'AI_RATE_LIMITS_ENABLED', True):
+            return view(request, *args, **kwargs)
+
+        user_id = request.user.id
+        allowed, retry_after = check_rate(
+            f"user:{user_id}", getattr(settings, 'AI_USER_RATE_PER_MINUTE', 10)
+        )
+        if not allowed:
+            logger.info('AI rate limit hit for user %s', user_id)
+            return too_many_requests(retry_after)
+
+        slot = acquire_slot(user_id, upstream_calls(request) if upstream_calls else 1)
+        if slot is None:
+            logger.info('AI concurrency limit hit for user %s', user_id)
+            return too_many_requests(getattr(settings, 'AI_RETRY_AFTER', 5))
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+
+        if getattr(response, 'streaming', False):
+            response.streaming_content = ReleasingStream(response.streaming_content, slot)
+        else:
+            slot.release()
+        return response
+
+    return wrapper
@@ -69,6 +69,20 @@ DATABASES = {
     }
 }
 
+# Cache. The default local-memory cache is private to each process, so AI
+# rate limits and cross-worker single-flight only hold across workers with
+# a shared backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://127.0.0.1:6379/1, or
+# django.core.cache.backends.db.DatabaseCache (run `manage.py createcachetable`)
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('CACHE_LOCATION', default=config('CACHE_URL', default='')),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -147,9 +161,89 @@ DEFAULT_FROM_EMAIL = 'no-reply@joyland.local'
 # OpenAI Integration (optional)
 OPENAI_API_KEY = config('OPENAI_API_KEY', default=None)
 OPENAI_DEFAULT_MODEL = config('OPENAI_DEFAULT_MODEL', default='gpt-4')
+# Alternative API endpoint, e.g. the local stand-in from `manage.py run_fake_openai`
+OPENAI_API_BASE = config('OPENAI_API_BASE', default=None)
 ENABLE_GPT5_MINI = config('ENABLE_GPT5_MINI', default=False, cast=bool)
+# Coalesce identical in-flight completions (within and across workers)
+AI_SINGLE_FLIGHT = config('AI_SINGLE_FLIGHT', default=True, cast=bool)
+AI_SINGLE_FLIGHT_LOCK_TIMEOUT = config('AI_SINGLE_FLIGHT_LOCK_TIMEOUT', default=120, cast=int)
+# Resilience for upstream AI calls: client-side rate limit, retries, circuit breaker
+AI_RATE_LIMIT_PER_MINUTE = config('AI_RATE_LIMIT_PER_MINUTE', default=60, cast=int)
+AI_RATE_LIMIT_BURST = config('AI_RATE_LIMIT_BURST', default=10, cast=int)
+AI_MAX_RETRIES = config('AI_MAX_RETRIES', default=3, cast=int)
+AI_RETRY_BASE_DELAY = config('AI_RETRY_BASE_DELAY', default=0.5, cast=float)
+AI_RETRY_MAX_DELAY = config('AI_RETRY_MAX_DELAY', default=8.0, cast=float)
+AI_CIRCUIT_FAILURE_THRESHOLD = config('AI_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+AI_CIRCUIT_RESET_TIMEOUT = config('AI_CIRCUIT_RESET_TIMEOUT', default=30, cast=int)
+AI_CALL_DEADLINE = config('AI_CALL_DEADLINE', default=60.0, cast=float)
+AI_REQUEST_TIMEOUT = config('AI_REQUEST_TIMEOUT', default=20.0, cast=float)
+# Latency-aware model routing and hedged requests
+AI_MODEL_ROUTING = config('AI_MODEL_ROUTING', default=True, cast=bool)
+AI_FAST_MODEL = config('AI_FAST_MODEL', default='gpt-5-mini')
+AI_FAST_TASKS = config(
+    'AI_FAST_TASKS', default='announcement_draft,admission_questions,student_analysis', cast=Csv()
+)
+AI_ROUTER_MIN_SAMPLES = config('AI_ROUTER_MIN_SAMPLES', default=20, cast=int)
+AI_ROUTER_MAX_ERROR_RATE = config('AI_ROUTER_MAX_ERROR_RATE', default=0.5, cast=float)
+AI_HEDGE_REQUESTS = config('AI_HEDGE_REQUESTS', default=False, cast=bool)
+# Per-teacher fair-share limits on AI endpoints (shared across workers via a shared CACHES backend)
+AI_RATE_LIMITS_ENABLED = config('AI_RATE_LIMITS_ENABLED', default=True, cast=bool)
+AI_USER_RATE_PER_MINUTE = config('AI_USER_RATE_PER_MINUTE', default=10, cast=int)
+AI_USER_CONCURRENCY = config('AI_USER_CONCURRENCY', default=2, cast=int)
+AI_GLOBAL_CONCURRENCY = config('AI_GLOBAL_CONCURRENCY', default=20, cast=int)
+# Global slots kept for teachers with no AI request in flight
+AI_LIGHT_USER_RESERVE = config('AI_LIGHT_USER_RESERVE', default=2, cast=int)
+AI_RETRY_AFTER = config('AI_RETRY_AFTER', default=5, cast=int)
+# Micro-batch small concurrent completions into one multi-part prompt
+AI_MICRO_BATCHING = config('AI_MICRO_BATCHING', default=False, cast=bool)
+AI_BATCH_TASKS = config(
+    'AI_BATCH_TASKS', default='announcement_draft,admission_questions,activities', cast=Csv()
+)
+AI_BATCH_WINDOW = config('AI_BATCH_WINDOW', default=0.05, cast=float)
+AI_BATCH_MAX_SIZE = config('AI_BATCH_MAX_SIZE', default=8, cast=int)
+AI_BATCH_MAX_TOKENS = config('AI_BATCH_MAX_TOKENS', default=4000, cast=int)
+# Persist AI generations in the database (see core.models.AIResult)
+AI_RESULT_STORE = config('AI_RESULT_STORE', default=True, cast=bool)
+AI_RESULT_MAX_AGE_DAYS = config('AI_RESULT_MAX_AGE_DAYS', default=180, cast=int)
+# Per-task token budget overrides: {'task': (prompt_tokens, output_tokens)}
+AI_TOKEN_BUDGETS = {}
+# Re-analyse student progress incrementally (see core.models.ProgressSnapshot)
+AI_INCREMENTAL_PROGRESS = config('AI_INCREMENTAL_PROGRESS', default=True, cast=bool)
+# Speculatively prefetch assessments/activities after a term plan (needs run_workers)
+AI_PREFETCH_FOLLOWUPS = config('AI_PREFETCH_FOLLOWUPS', default=False, cast=bool)
+AI_PREFETCH_MAX_PER_TEACHER = config('AI_PREFETCH_MAX_PER_TEACHER', default=5, cast=int)
+# Request each differentiation level separately and concurrently
+AI_ACTIVITIES_FAN_OUT = config('AI_ACTIVITIES_FAN_OUT', default=False, cast=bool)
+# Class-wide progress analysis: analyses in flight at once, and class size cap
+AI_CLASS_ANALYSIS_CONCURRENCY = config('AI_CLASS_ANALYSIS_CONCURRENCY', default=4, cast=int)
+AI_CLASS_ANALYSIS_MAX_STUDENTS = config('AI_CLASS_ANALYSIS_MAX_STUDENTS', default=60, cast=int)
+# Admin workload analysis: analyses in flight, seconds to wait, result cache lifetime
+AI_WORKLOAD_CONCURRENCY = config('AI_WORKLOAD_CONCURRENCY', default=4, cast=int)
+AI_WORKLOAD_ACTION_TIMEOUT = config('AI_WORKLOAD_ACTION_TIMEOUT', default=20, cast=float)
+AI_WORKLOAD_CACHE_TIMEOUT = config('AI_WORKLOAD_CACHE_TIMEOUT', default=86400, cast=int)
+# Ask for JSON replies validated against per-task schemas (text parsers as fallback)
+AI_JSON_OUTPUT = config('AI_JSON_OUTPUT', default=False, cast=bool)
+# Answer from curriculum templates when the AI service is down, slow or unconfigured
+AI_OFFLINE_FALLBACK = config('AI_OFFLINE_FALLBACK', default=True, cast=bool)
+# Bearer token for scraping /metrics/ (staff can always view it)
+AI_METRICS_TOKEN = config('AI_METRICS_TOKEN', default=None)
+# Bump when prompts change so cached generations are not reused
+AI_PROMPT_VERSION = config('AI_PROMPT_VERSION', default='1')
+# Share AI results across teachers (per-teacher entries still take precedence)
+AI_SHARED_CACHE = config('AI_SHARED_CACHE', default=False, cast=bool)
+# Reuse assessments/activities generated for near-identical objectives
+AI_SEMANTIC_CACHE = config('AI_SEMANTIC_CACHE', default=False, cast=bool)
+AI_SEMANTIC_CACHE_THRESHOLD = config('AI_SEMANTIC_CACHE_THRESHOLD', default=0.85, cast=float)
+# Persistent embedding store (memory-mapped float32 matrix + id map)
+OPENAI_EMBEDDING_MODEL = config('OPENAI_EMBEDDING_MODEL', default='text-embedding-ada-002')
+AI_EMBEDDING_DIR = config('AI_EMBEDDING_DIR', default=str(BASE_DIR / 'var' / 'embeddings'))
+AI_EMBEDDING_DIM = config('AI_EMBEDDING_DIM', default=1536, cast=int)
+
+# Background job queue (drained by `manage.py run_workers`)
+JOBS_ALWAYS_EAGER = config('JOBS_ALWAYS_EAGER', default=False, cast=bool)
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=10, cast=int)
 
 # Feature Flags
 FEATURE_ROLE_AWARE_LOGIN = config('FEATURE_ROLE_AWARE_LOGIN', default=True, cast=bool)
 FEATURE_SHARED_LOGIN_TEMPLATE = config('FEATURE_SHARED_LOGIN_TEMPLATE', default=True, cast=bool)
-FEATURE_HIDE_GENERIC_REGISTRATION = config('FEATURE_HIDE_GENERIC_REGISTRATION', default=False, cast=bool)
+# Per-teacher fair-share limits on AI endpoints (per worker unless CACHES is shared)
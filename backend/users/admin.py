@@ -9,9 +9,37 @@ from django.utils.encoding import force_bytes
 from django.template.loader import render_to_string
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+from concurrent.futures import ThreadPoolExecutor, wait
+import json
+import logging
+import threading
+from joyland.cache_utils import canonical_key
 from .models import User, StudentProfile, StaffProfile, PrincipalProfile
 from .admin_site import custom_admin_site
 
+logger = logging.getLogger(__name__)
+
+# Workload analyses from every admin request share one bounded pool
+_workload_executor = None
+_workload_executor_lock = threading.Lock()
+
+
+def get_workload_executor():
+    """Return the pool that runs workload analyses (AI_WORKLOAD_CONCURRENCY threads)."""
+    global _workload_executor
+    with _workload_executor_lock:
+        if _workload_executor is None:
+            _workload_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'AI_WORKLOAD_CONCURRENCY', 4),
+                thread_name_prefix='ai-workload'
+            )
+        return _workload_executor
+
 
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
@@ -40,6 +68,8 @@ class StaffProfileAdmin(admin.ModelAdmin):
     list_display = ('username', 'get_full_name', 'email', 'is_active', 'workload_status')
     search_fields = ('username', 'first_name', 'last_name', 'email')
     actions = ['analyze_workload']
+    # In-flight markers expire in case a worker dies mid-analysis
+    RUNNING_TIMEOUT = 600
     
     def workload_status(self, obj):
         """Display workload status with color coding."""
@@ -67,7 +97,15 @@ class StaffProfileAdmin(admin.ModelAdmin):
         return 22  # Placeholder
     
     def analyze_workload(self, request, queryset):
-        """Analyze selected teachers' workloads using AI."""
+        """Analyze selected teachers' workloads using AI.
+
+        Teachers are analysed concurrently on a pool shared by all admin
+        requests (AI_WORKLOAD_CONCURRENCY at a time) and results are cached
+        per teacher, keyed on their assignment data. Whatever finishes
+        within AI_WORKLOAD_ACTION_TIMEOUT is shown; the rest keep running
+        and are served from cache on the next run. A teacher whose analysis
+        is still running is not submitted again.
+        """
         # Import the AI client lazily to avoid heavy imports at module load time
         try:
             from joyland.integrations.openai import OpenAIClient
@@ -76,47 +114,114 @@ class StaffProfileAdmin(admin.ModelAdmin):
 
         ai_client = OpenAIClient() if OpenAIClient is not None else None
 
+        results, pending, running = {}, {}, []
         for teacher in queryset:
-            try:
-                # Get teacher's assignments
-                assignments = self._get_teacher_assignments(teacher)
-                # Get AI analysis (if available)
-                analysis = ai_client.analyze_teacher_workload(assignments) if ai_client else {'warnings': [], 'recommendations': []}
-                
-                if analysis['warnings']:
-                    self.message_user(
-                        request,
-                        format_html(
-                            'Workload warnings for {}: {}',
-                            teacher.get_full_name(),
-                            '<br>'.join(f'• {w}' for w in analysis['warnings'])
-                        ),
-                        level=messages.WARNING
-                    )
-                
-                if analysis['recommendations']:
-                    self.message_user(
-                        request,
-                        format_html(
-                            'Recommendations for {}: {}',
-                            teacher.get_full_name(),
-                            '<br>'.join(f'• {r}' for r in analysis['recommendations'])
-                        ),
-                        level=messages.INFO
-                    )
-                
-            except Exception as e:
+            assignments = self._get_teacher_assignments(teacher)
+            key = self._workload_cache_key(teacher, assignments)
+            cached = cache.get(key)
+            if cached is not None:
+                results[teacher] = cached
+            elif ai_client is None:
+                results[teacher] = {'warnings': [], 'recommendations': []}
+            elif cache.add(key + ':running', True, self.RUNNING_TIMEOUT):
+                pending[teacher] = (key, assignments)
+            else:
+                # An earlier run is still analysing this teacher
+                running.append(teacher)
+
+        unfinished = running
+        if pending:
+            executor = get_workload_executor()
+            futures = {
+                executor.submit(
+                    self._analyze_teacher_workload, ai_client, key, assignments
+                ): teacher
+                for teacher, (key, assignments) in pending.items()
+            }
+            done, not_done = wait(
+                futures, timeout=getattr(settings, 'AI_WORKLOAD_ACTION_TIMEOUT', 20)
+            )
+            # Unfinished analyses carry on in the background and land in the cache
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    results[futures[future]] = e
+            unfinished += [futures[future] for future in not_done]
+
+        for teacher in queryset:
+            analysis = results.get(teacher)
+            if analysis is None:
+                continue
+            if isinstance(analysis, Exception):
                 logger.error(
                     'Failed to analyze workload for teacher: %s',
                     teacher.username,
-                    exc_info=e
+                    exc_info=analysis
                 )
                 self.message_user(
                     request,
                     f'Error analyzing workload for {teacher.get_full_name()}',
                     level=messages.ERROR
                 )
-    
+                continue
+
+            if analysis['warnings']:
+                self.message_user(
+                    request,
+                    format_html(
+                        'Workload warnings for {}: {}',
+                        teacher.get_full_name(),
+                        format_html_join(
+                            mark_safe('<br>'), '• {}', ((w,) for w in analysis['warnings'])
+                        )
+                    ),
+                    level=messages.WARNING
+                )
+
+            if analysis['recommendations']:
+                self.message_user(
+                    request,
+                    format_html(
+                        'Recommendations for {}: {}',
+                        teacher.get_full_name(),
+                        format_html_join(
+                            mark_safe('<br>'), '• {}',
+                            ((r,) for r in analysis['recommendations'])
+                        )
+                    ),
+                    level=messages.INFO
+                )
+
+        if unfinished:
+            self.message_user(
+                request,
+                'Analysis still running for {}. Run the action again shortly to see the '
+                'results.'.format(
+                    ', '.join(teacher.get_full_name() or teacher.username for teacher in unfinished)
+                ),
+                level=messages.INFO
+            )
+
+    @staticmethod
+    def _workload_cache_key(teacher, assignments):
+        return 'workload_analysis:' + canonical_key(
+            'workload', teacher=teacher.pk, assignments=json.dumps(assignments, sort_keys=True)
+        )
+
+    @staticmethod
+    def _analyze_teacher_workload(ai_client, key, assignments):
+        """Run one analysis in a worker thread and cache a usable result."""
+        try:
+            analysis = ai_client.analyze_teacher_workload(assignments)
+            # Failed analyses come back with no hours or recommendations
+            if analysis.get('total_hours') or analysis.get('recommendations'):
+                cache.set(key, analysis, getattr(settings, 'AI_WORKLOAD_CACHE_TIMEOUT', 86400))
+            return analysis
+        finally:
+            cache.delete(key + ':running')
+            close_old_connections()
+
     analyze_workload.short_description = "Analyze selected teachers' workload"
     
     def _get_teacher_assignments(self, teacher):
@@ -1,6 +1,7 @@
 from django.contrib.admin import AdminSite
 from django.template.response import TemplateResponse
 from django.urls import path
+from joyland.integrations.telemetry import collect_metrics
 from .models import User, StudentProfile
 
 
@@ -12,7 +13,30 @@ class JoylandAdminSite(AdminSite):
     def get_urls(self):
         urls = super().get_urls()
         # keep default urls
-        return urls
+        return [
+            path('ai-telemetry/', self.admin_view(self.ai_telemetry), name='ai_telemetry'),
+        ] + urls
+
+    def ai_telemetry(self, request):
+        # AI call latency, tokens, errors and cache hit rates for this worker
+        metrics = collect_metrics()
+        caches = [
+            {'name': name, **counts} for name, counts in metrics['caches'].items()
+        ] + [
+            {'name': f"{kind} ({scope})", **counts}
+            for kind, scopes in metrics['operation_cache'].items()
+            for scope, counts in scopes.items()
+        ] + [{'name': 'semantic', **metrics['semantic_cache']}]
+        context = {
+            **self.each_context(request),
+            'title': 'AI telemetry',
+            'calls': [{'name': name, **entry} for name, entry in metrics['calls'].items()],
+            'errors': metrics['errors'],
+            'caches': caches,
+            'resilience': metrics['resilience'],
+            'structured': metrics['structured'],
+        }
+        return TemplateResponse(request, 'admin/ai_telemetry.html', context)
 
     def index(self, request, extra_context=None):
         # provide simple role counts
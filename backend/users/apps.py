@@ -5,3 +5,7 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'Users'
+
+    def ready(self):
+        # Register background tasks with the job queue
+        from . import tasks  # noqa: F401
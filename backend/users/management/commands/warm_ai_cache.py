@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from joyland.integrations.education import EducationalAIService
+from joyland.integrations.openai import OpenAIClient
+from users.models import User
+from users.views.teacher import get_current_term, get_previous_objectives, get_teacher_subjects
+
+
+class Command(BaseCommand):
+    help = ('Pre-generate term plans and default assessments for every subject/grade taught, '
+            'so the start-of-term spike is served from the AI result store. Safe to re-run: '
+            'stored generations are skipped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', type=int, default=None,
+                            help='Term to warm (default: the current term)')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Upstream AI calls in flight at once')
+        parser.add_argument('--teacher', default=None,
+                            help='Only warm the subjects of this username')
+        parser.add_argument('--assessment-type', default='formative')
+        parser.add_argument('--level', default='standard')
+        parser.add_argument('--skip-assessments', action='store_true',
+                            help='Only warm term plans')
+
+    def handle(self, *args, **options):
+        term = options['term'] or get_current_term()
+        teachers = User.objects.filter(role='teacher', is_active=True)
+        if options['teacher']:
+            teachers = teachers.filter(username=options['teacher'])
+            if not teachers.exists():
+                raise CommandError(f"No active teacher named {options['teacher']!r}")
+
+        # One plan per subject/grade; the first teacher found supplies prior objectives
+        matrix = {}
+        for teacher in teachers:
+            for subject, grades in get_teacher_subjects(teacher).items():
+                for grade in grades:
+                    matrix.setdefault((subject, grade), teacher)
+        if not matrix:
+            self.stdout.write('Nothing to warm.')
+            return
+
+        # Template stand-ins would be counted as warmed without being stored
+        service = EducationalAIService(OpenAIClient(), offline_fallback=False)
+        counts = {'generated': 0, 'skipped': 0, 'failed': 0}
+        started = time.monotonic()
+        self.stdout.write(
+            f"Warming {len(matrix)} term plan(s) for term {term} "
+            f"with concurrency {options['concurrency']}"
+        )
+
+        def plan(subject, grade, teacher):
+            try:
+                existing = get_previous_objectives(teacher, subject, grade)
+                stored = service.has_stored_term_plan(subject, grade, term, existing)
+                objectives = service.generate_term_plan(subject, grade, term, existing)
+                return stored, [obj.description for obj in objectives]
+            finally:
+                close_old_connections()
+
+        def assessment(description):
+            try:
+                stored = service.has_stored_assessment(
+                    description, options['assessment_type'], options['level']
+                )
+                items = service.generate_assessment(
+                    description, options['assessment_type'], options['level']
+                )
+                return stored, items
+            finally:
+                close_old_connections()
+
+        def record(label, stored, ok):
+            key = 'skipped' if stored else 'generated' if ok else 'failed'
+            counts[key] += 1
+            self.stdout.write(f"  [{key}] {label}")
+
+        executor = ThreadPoolExecutor(max_workers=options['concurrency'])
+        pending = {
+            executor.submit(plan, subject, grade, teacher): ('plan', f"{subject} {grade}")
+            for (subject, grade), teacher in matrix.items()
+        }
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, label = pending.pop(future)
+                    try:
+                        stored, result = future.result()
+                    except Exception as e:
+                        counts['failed'] += 1
+                        self.stderr.write(f"  [failed] {label}: {e}")
+                        continue
+                    record(f"{kind}: {label}", stored, bool(result))
+                    if kind == 'plan' and not options['skip_assessments']:
+                        for description in result:
+                            pending[executor.submit(assessment, description)] = (
+                                'assessment', description[:60]
+                            )
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            self.stderr.write('Interrupted; re-run to resume (stored results are skipped).')
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.monotonic() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {total} item(s) in {elapsed:.1f}s "
+            f"({total / elapsed if elapsed else 0:.2f}/s): "
+            f"{counts['generated']} generated, {counts['skipped']} already stored, "
+            f"{counts['failed']} failed"
+        ))
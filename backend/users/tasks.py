@@ -0,0 +1,127 @@
+"""Background AI tasks for the teacher portal (drained by ``manage.py run_workers``).
+
+After a term plan is generated, teachers almost always ask for an assessment
+and differentiated activities for each objective next. When
+``AI_PREFETCH_FOLLOWUPS`` is on, those are generated speculatively as
+low-priority jobs so the follow-up requests are served from cache.
+
+Each teacher has a prefetch generation stored in the cache. Scheduling a new
+prefetch or cancelling replaces it, and queued or running jobs from an older
+generation do nothing.
+"""
+
+import logging
+import uuid
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.jobs import enqueue, task
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_TASK = 'ai.prefetch_followups'
+# Background work yields to registration and other user-facing jobs
+PREFETCH_PRIORITY = 500
+DEFAULT_ASSESSMENT_TYPE = 'formative'
+DEFAULT_LEVEL = 'standard'
+
+
+def _generation_key(teacher_id: int) -> str:
+    return f"ai_prefetch:{teacher_id}"
+
+
+def schedule_followup_prefetch(user, objectives: Iterable[str]) -> int:
+    """Queue speculative assessment/activity generation for ``objectives``.
+
+    Supersedes any prefetch still queued for the teacher. At most
+    ``AI_PREFETCH_MAX_PER_TEACHER`` objectives are prefetched.
+
+    Returns:
+        Number of jobs queued
+    """
+    if not getattr(settings, 'AI_PREFETCH_FOLLOWUPS', False):
+        return 0
+    if getattr(settings, 'JOBS_ALWAYS_EAGER', False):
+        # Speculative work must never run inline in the request
+        return 0
+
+    cancel_followup_prefetch(user.id)
+    generation = uuid.uuid4().hex
+    cache.set(_generation_key(user.id), generation, 86400)
+
+    limit = getattr(settings, 'AI_PREFETCH_MAX_PER_TEACHER', 5)
+    queued = 0
+    for objective in list(dict.fromkeys(o for o in objectives if o))[:limit]:
+        enqueue(
+            PREFETCH_TASK,
+            {'teacher_id': user.id, 'objective': objective, 'generation': generation},
+            priority=PREFETCH_PRIORITY,
+            max_attempts=1,
+        )
+        queued += 1
+    logger.info('Queued %s follow-up prefetch job(s) for teacher %s', queued, user.id)
+    return queued
+
+
+def cancel_followup_prefetch(teacher_id: int) -> int:
+    """Cancel a teacher's outstanding prefetch.
+
+    Queued jobs are deleted; jobs already running see the stale generation
+    and stop before their next upstream call.
+
+    Returns:
+        Number of queued jobs deleted
+    """
+    cache.delete(_generation_key(teacher_id))
+    deleted, _ = Job.objects.filter(
+        task=PREFETCH_TASK, status=Job.STATUS_QUEUED, payload__teacher_id=teacher_id
+    ).delete()
+    return deleted
+
+
+def _is_current(teacher_id: int, generation: str) -> bool:
+    return cache.get(_generation_key(teacher_id)) == generation
+
+
+@task(PREFETCH_TASK)
+def prefetch_followups(teacher_id: int, objective: str, generation: str) -> None:
+    """Generate and cache the default assessment and activities for an objective."""
+    from joyland.cache_utils import AIOperationCache
+    from joyland.integrations.education import EducationalAIService
+    from joyland.integrations.openai import OpenAIClient
+
+    from .models import User
+    from .views.teacher import assessment_item_payload, get_class_profile, get_class_profiles
+
+    if not _is_current(teacher_id, generation):
+        logger.debug('Skipping cancelled prefetch for teacher %s', teacher_id)
+        return
+
+    # Template stand-ins must not land in the per-teacher cache as AI output
+    service = EducationalAIService(OpenAIClient(), offline_fallback=False, teacher_id=teacher_id)
+    if AIOperationCache.get_cached_assessment(
+        teacher_id=teacher_id, objective=objective,
+        assessment_type=DEFAULT_ASSESSMENT_TYPE, level=DEFAULT_LEVEL
+    ) is None:
+        items = service.generate_assessment(
+            objective=objective,
+            assessment_type=DEFAULT_ASSESSMENT_TYPE,
+            student_level=DEFAULT_LEVEL
+        )
+        if items:
+            AIOperationCache.cache_assessment(
+                teacher_id=teacher_id, objective=objective,
+                assessment_type=DEFAULT_ASSESSMENT_TYPE, level=DEFAULT_LEVEL,
+                assessment_data=[assessment_item_payload(item) for item in items]
+            )
+
+    # Activities land in the persistent result store, keyed like the view's request
+    for class_id in get_class_profiles(User.objects.get(pk=teacher_id)):
+        if not _is_current(teacher_id, generation):
+            return
+        service.generate_differentiated_activities(
+            objective=objective, class_profile=get_class_profile(class_id)
+        )
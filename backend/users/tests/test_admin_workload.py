@@ -0,0 +1,101 @@
+"""Tests for the staff workload analysis admin action."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..admin import StaffProfileAdmin
+from ..admin_site import custom_admin_site
+from ..models import StaffProfile
+
+ANALYSIS = {
+    'total_hours': 14,
+    'warnings': ['Back-to-back classes'],
+    'recommendations': ['Spread lessons'],
+}
+
+
+class AnalyzeWorkloadActionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for n in range(3):
+            StaffProfile.objects.create_user(
+                username=f'teacher{n}', email=f't{n}@joyland.edu', password='testpass123',
+                role='teacher', first_name=f'Teacher{n}'
+            )
+        self.admin = StaffProfileAdmin(StaffProfile, custom_admin_site)
+        self.request = RequestFactory().post('/')
+        self.messages = []
+        self.admin.message_user = lambda request, message, level=None: self.messages.append(message)
+
+    def cache_keys(self):
+        return [
+            self.admin._workload_cache_key(teacher, self.admin._get_teacher_assignments(teacher))
+            for teacher in StaffProfile.objects.all()
+        ]
+
+    def run_action(self):
+        self.admin.analyze_workload(self.request, StaffProfile.objects.order_by('username'))
+
+    @patch(
+        'joyland.integrations.openai.OpenAIClient.analyze_teacher_workload', return_value=ANALYSIS
+    )
+    def test_results_are_cached_per_teacher(self, mock_analyze):
+        self.run_action()
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertEqual(len(self.messages), 6)
+        self.assertIn('Teacher0', str(self.messages[0]))
+
+        self.messages.clear()
+        self.run_action()
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertEqual(len(self.messages), 6)
+
+    @patch('joyland.integrations.openai.OpenAIClient.analyze_teacher_workload')
+    def test_failed_analyses_are_not_cached(self, mock_analyze):
+        mock_analyze.return_value = {
+            'total_hours': 0,
+            'warnings': ['Analysis failed - please review manually'],
+            'recommendations': [],
+        }
+        self.run_action()
+        self.run_action()
+        self.assertEqual(mock_analyze.call_count, 6)
+
+    @override_settings(AI_WORKLOAD_ACTION_TIMEOUT=0.2)
+    @patch('joyland.integrations.openai.OpenAIClient.analyze_teacher_workload')
+    def test_running_analyses_are_not_resubmitted(self, mock_analyze):
+        release = threading.Event()
+        lock, calls = threading.Lock(), []
+
+        def analyze(assignments):
+            with lock:
+                calls.append(assignments)
+                first = len(calls) == 1
+            if first:
+                release.wait(5)
+            return ANALYSIS
+
+        mock_analyze.side_effect = analyze
+        self.run_action()
+        self.assertIn('Analysis still running for', self.messages[-1])
+        self.assertEqual(len(self.messages), 5)
+
+        # The slow teacher is still in flight: reported, not analysed again
+        self.messages.clear()
+        self.run_action()
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertIn('Analysis still running for', self.messages[-1])
+
+        release.set()
+        for _ in range(100):
+            if not any(cache.get(key + ':running') for key in self.cache_keys()):
+                break
+            time.sleep(0.02)
+        self.messages.clear()
+        self.run_action()
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertEqual(len(self.messages), 6)
@@ -0,0 +1,97 @@
+"""Tests for speculative follow-up prefetch after term plans."""
+
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.jobs import claim_next, run_job
+from core.models import Job
+from joyland.cache_utils import AIOperationCache
+from joyland.integrations.education import AssessmentItem, EducationalAIService, LearningObjective
+from joyland.integrations.resilience import CircuitOpenError
+
+from ..models import User
+from ..tasks import PREFETCH_PRIORITY, PREFETCH_TASK, schedule_followup_prefetch
+
+
+def objective(description):
+    return LearningObjective(description, 'Mathematics', '9th', [], [])
+
+
+@override_settings(
+    AI_PREFETCH_FOLLOWUPS=True, JOBS_ALWAYS_EAGER=False, AI_PREFETCH_MAX_PER_TEACHER=2
+)
+class FollowupPrefetchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.teacher = User.objects.create_user(
+            username='prefetcher', email='p@joyland.edu', password='testpass123', role='teacher'
+        )
+        self.client.force_login(self.teacher)
+
+    @patch.object(EducationalAIService, 'generate_term_plan')
+    def test_term_plan_queues_capped_low_priority_jobs(self, mock_plan):
+        mock_plan.return_value = [objective('A'), objective('B'), objective('C')]
+        response = self.client.post(
+            reverse('generate_term_plan'),
+            data=json.dumps({'subject': 'Mathematics', 'grade_level': '9th', 'term': 1}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        jobs = Job.objects.filter(task=PREFETCH_TASK)
+        self.assertEqual([job.payload['objective'] for job in jobs], ['A', 'B'])
+        self.assertTrue(all(job.priority == PREFETCH_PRIORITY for job in jobs))
+
+    def test_new_plan_supersedes_queued_prefetch(self):
+        schedule_followup_prefetch(self.teacher, ['Old'])
+        schedule_followup_prefetch(self.teacher, ['New'])
+        self.assertEqual(
+            list(Job.objects.values_list('payload__objective', flat=True)), ['New']
+        )
+
+    @patch.object(EducationalAIService, 'generate_differentiated_activities')
+    @patch.object(EducationalAIService, 'generate_assessment')
+    def test_prefetch_fills_assessment_cache(self, mock_assessment, mock_activities):
+        mock_assessment.return_value = [
+            AssessmentItem('Q?', 'Mathematics', '9th', 'A', {'5': 'all correct'})
+        ]
+        schedule_followup_prefetch(self.teacher, ['Solve equations'])
+        self.assertTrue(run_job(claim_next('w1')))
+
+        cached = AIOperationCache.get_cached_assessment(
+            self.teacher.id, 'Solve equations', 'formative', 'standard'
+        )
+        self.assertEqual(cached[0]['question'], 'Q?')
+        self.assertTrue(mock_activities.called)
+
+    @patch('joyland.integrations.openai.OpenAIClient.complete')
+    def test_open_circuit_caches_nothing(self, mock_complete):
+        """Offline templates are not prefetched into the assessment cache."""
+        mock_complete.side_effect = CircuitOpenError('AI service circuit is open')
+        schedule_followup_prefetch(self.teacher, ['Solve equations'])
+        self.assertTrue(run_job(claim_next('w1')))
+
+        self.assertTrue(mock_complete.called)
+        self.assertIsNone(AIOperationCache.get_cached_assessment(
+            self.teacher.id, 'Solve equations', 'formative', 'standard'
+        ))
+
+    @patch.object(EducationalAIService, 'generate_assessment')
+    def test_cancel_stops_queued_and_claimed_jobs(self, mock_assessment):
+        schedule_followup_prefetch(self.teacher, ['A', 'B'])
+        claimed = claim_next('w1')
+
+        response = self.client.post(reverse('cancel_prefetch'))
+        self.assertEqual(json.loads(response.content), {'cancelled': 1})
+
+        run_job(claimed)
+        mock_assessment.assert_not_called()
+
+    @override_settings(AI_PREFETCH_FOLLOWUPS=False)
+    def test_disabled_by_default(self):
+        self.assertEqual(schedule_followup_prefetch(self.teacher, ['A']), 0)
+        self.assertFalse(Job.objects.exists())
@@ -1,4 +1,4 @@
-from django.test import TestCase, RequestFactory, Client
+from django.test import TestCase, RequestFactory, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.contrib.admin.sites import AdminSite
 from django.urls import reverse
@@ -36,6 +36,7 @@ class RegistrationFormTests(TestCase):
         self.assertTrue(form.is_valid())
 
 
+@override_settings(JOBS_ALWAYS_EAGER=True)
 class RegistrationHelpersTests(TestCase):
     def setUp(self):
         self.valid_data = {
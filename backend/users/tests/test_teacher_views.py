@@ -1,16 +1,21 @@
 """Unit tests for teacher views."""
 
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 import json
+import time
 from unittest.mock import patch, MagicMock
 from ..models import User
 from joyland.integrations.education import EducationalAIService
+from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.resilience import CircuitOpenError
 
 
 class TeacherViewsTest(TestCase):
     def setUp(self):
         """Set up test data."""
+        cache.clear()
         self.client = Client()
         
         # Create a teacher user
@@ -176,6 +181,122 @@ class TeacherViewsTest(TestCase):
         self.assertIn('activities', data)
         mock_generate.assert_called_once()
 
+    @patch.object(EducationalAIService, 'generate_level_activities')
+    def test_regenerate_single_activity_level(self, mock_generate):
+        """Test a single differentiation level can be regenerated."""
+        mock_generate.return_value = ['Paired practice with worked examples']
+
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('get_differentiated_activities'),
+            data=json.dumps({
+                'objective': self.test_objective,
+                'class_id': 'math-9a',
+                'level': 'support',
+                'regenerate': True
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data['activities'], {'support': ['Paired practice with worked examples']})
+        self.assertTrue(mock_generate.call_args.kwargs['refresh'])
+
+    @patch.object(OpenAIClient, 'complete', side_effect=CircuitOpenError('down'))
+    def test_term_plan_offline_fallback_is_flagged_and_not_cached(self, mock_complete):
+        """Test an unavailable AI service is answered from offline templates."""
+        self.client.force_login(self.teacher)
+        for _ in range(2):
+            response = self.client.post(
+                reverse('generate_term_plan'),
+                data=json.dumps({
+                    'subject': self.test_subject,
+                    'grade_level': self.test_grade,
+                    'term': self.test_term
+                }),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertTrue(data['offline'])
+            self.assertFalse(data['cached'])
+            self.assertTrue(data['objectives'])
+        self.assertEqual(mock_complete.call_count, 2)
+
+    @patch.object(EducationalAIService, 'stream_term_plan')
+    def test_stream_term_plan(self, mock_stream):
+        """Test term plan streaming endpoint emits SSE events."""
+        mock_stream.return_value = iter([
+            ('token', 'Description: Master quadratic equations'),
+            ('objective', MagicMock(
+                description='Master quadratic equations',
+                skills=['solving equations'],
+                assessment_criteria=['Can solve basic equations']
+            )),
+        ])
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('stream_term_plan'), {
+            'subject': 'Physics',
+            'grade_level': self.test_grade,
+            'term': self.test_term
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: token', body)
+        self.assertIn('event: objective', body)
+        self.assertIn('Master quadratic equations', body)
+        self.assertTrue(body.endswith('event: done\ndata: {"cached": false}\n\n'))
+
+        response = self.client.get(reverse('stream_term_plan'), {'subject': 'Physics'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch.object(EducationalAIService, 'analyze_student_progress')
+    def test_analyze_class_streams_students_and_summary(self, mock_analyze):
+        """Test class analysis streams one event per student and a summary."""
+        mock_analyze.side_effect = lambda student_data, subject_area, timeframe: MagicMock(
+            student_id=student_data['student_id'],
+            objectives_mastered=['Solve linear equations'],
+            areas_for_growth=['Factorising'],
+            recommendations=['Practice factorising']
+        )
+
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('analyze_class'),
+            data=json.dumps({'subject': self.test_subject, 'student_ids': ['a', 'b', 'c']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('event: student'), 3)
+        self.assertIn('event: summary', body)
+        self.assertIn('"common_growth_areas": [{"area": "Factorising", "students": 3}]', body)
+        self.assertTrue(body.endswith('event: done\ndata: {"students": 3}\n\n'))
+
+        response = self.client.post(
+            reverse('analyze_class'),
+            data=json.dumps({'subject': self.test_subject}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(AI_CLASS_ANALYSIS_MAX_STUDENTS=3)
+    @patch.object(EducationalAIService, 'analyze_student_progress')
+    def test_analyze_class_validates_student_ids(self, mock_analyze):
+        """student_ids must be a short, non-empty list of ids."""
+        self.client.force_login(self.teacher)
+        invalid = ('abc', {'a': 1}, [], [['a']], [None], [True], [''], ['a', 'b', 'c', 'd'])
+        for student_ids in invalid:
+            response = self.client.post(
+                reverse('analyze_class'),
+                data=json.dumps({'subject': self.test_subject, 'student_ids': student_ids}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400, student_ids)
+        mock_analyze.assert_not_called()
+
     def test_missing_required_fields(self):
         """Test handling of missing required fields."""
         self.client.force_login(self.teacher)
@@ -230,4 +351,104 @@ class TeacherViewsTest(TestCase):
         )
         self.assertEqual(response.status_code, 500)
         data = json.loads(response.content)
-        self.assertIn('error', data)
\ No newline at end of file
+        self.assertIn('error', data)
+
+    @override_settings(AI_USER_RATE_PER_MINUTE=2)
+    @patch.object(EducationalAIService, 'generate_differentiated_activities')
+    def test_rate_limit_returns_429(self, mock_generate):
+        """Requests over the per-teacher rate get 429 with Retry-After."""
+        mock_generate.return_value = {}
+        self.client.force_login(self.teacher)
+        payload = json.dumps({'objective': self.test_objective, 'class_id': 'class-1'})
+        statuses = [
+            self.client.post(
+                reverse('get_differentiated_activities'),
+                data=payload,
+                content_type='application/json'
+            )
+            for _ in range(3)
+        ]
+        self.assertEqual([r.status_code for r in statuses], [200, 200, 429])
+        self.assertGreaterEqual(int(statuses[-1]['Retry-After']), 1)
+
+    @override_settings(AI_USER_CONCURRENCY=1)
+    def test_concurrency_limit_returns_429(self):
+        """A teacher already holding a slot cannot start another AI request."""
+        from joyland.ratelimit import acquire_slot
+
+        slot = acquire_slot(self.teacher.id)
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('generate_term_plan'),
+            data=json.dumps({
+                'subject': self.test_subject,
+                'grade_level': self.test_grade,
+                'term': self.test_term
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        slot.release()
+
+    @override_settings(AI_USER_CONCURRENCY=1)
+    @patch.object(EducationalAIService, 'stream_term_plan')
+    def test_stream_closed_before_reading_releases_slot(self, mock_stream):
+        """A stream the client abandons before the first chunk frees its slot."""
+        from joyland.ratelimit import acquire_slot
+
+        mock_stream.return_value = iter([])
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('stream_term_plan'), {
+            'subject': 'Physics', 'grade_level': self.test_grade, 'term': self.test_term
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(acquire_slot(self.teacher.id))
+        response.close()
+        self.assertIsNotNone(acquire_slot(self.teacher.id))
+
+    @override_settings(AI_USER_CONCURRENCY=1)
+    @patch.object(EducationalAIService, 'stream_term_plan')
+    def test_finished_stream_releases_slot(self, mock_stream):
+        from joyland.ratelimit import acquire_slot
+
+        mock_stream.return_value = iter([])
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('stream_term_plan'), {
+            'subject': 'Physics', 'grade_level': self.test_grade, 'term': self.test_term
+        })
+        b''.join(response.streaming_content)
+        self.assertIsNotNone(acquire_slot(self.teacher.id))
+
+    @override_settings(AI_GLOBAL_CONCURRENCY=4, AI_CLASS_ANALYSIS_CONCURRENCY=4)
+    def test_class_analysis_is_charged_per_upstream_call(self):
+        """Class analysis needs a global slot for each parallel student analysis."""
+        from joyland.ratelimit import acquire_slot
+
+        held = acquire_slot(self.student.id)
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse('analyze_class'),
+            data=json.dumps({'subject': self.test_subject, 'student_ids': ['a']}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 429)
+        held.release()
+
+    @override_settings(AI_GLOBAL_CONCURRENCY=3, AI_LIGHT_USER_RESERVE=1, AI_USER_CONCURRENCY=3)
+    def test_reserved_slots_go_to_light_users(self):
+        """A user with a request in flight cannot take the reserved slots."""
+        from joyland.ratelimit import acquire_slot
+
+        held = [acquire_slot(self.teacher.id), acquire_slot(self.teacher.id)]
+        self.assertTrue(all(held))
+        started = time.monotonic()
+        self.assertIsNone(acquire_slot(self.teacher.id))
+        # Rejections are immediate and leave the global counter untouched
+        self.assertLess(time.monotonic() - started, 0.05)
+        light = acquire_slot(self.student.id)
+        self.assertIsNotNone(light)
+        self.assertIsNone(acquire_slot(self.student.id))
+        for slot in held + [light]:
+            slot.release()
+        self.assertIsNotNone(acquire_slot(self.student.id))
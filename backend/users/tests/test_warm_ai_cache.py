@@ -0,0 +1,46 @@
+"""Tests for the warm_ai_cache management command."""
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from joyland.integrations.education import EducationalAIService, LearningObjective
+
+from ..models import User
+
+
+@patch.object(EducationalAIService, 'generate_assessment', return_value=['item'])
+@patch.object(EducationalAIService, 'generate_term_plan')
+class WarmAICacheTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='warm', email='w@joyland.edu', password='testpass123', role='teacher'
+        )
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command('warm_ai_cache', stdout=out, **options)
+        return out.getvalue()
+
+    def test_warms_plans_and_assessments(self, mock_plan, mock_assessment):
+        mock_plan.return_value = [
+            LearningObjective('Solve equations', 'Mathematics', '9th', [], [])
+        ]
+        with patch.object(EducationalAIService, 'has_stored_term_plan', return_value=False), \
+                patch.object(EducationalAIService, 'has_stored_assessment', return_value=False):
+            output = self.run_command(concurrency=2)
+
+        # get_teacher_subjects lists three subject/grade pairs
+        self.assertEqual(mock_plan.call_count, 3)
+        self.assertEqual(mock_plan.call_args[0][2], 2)
+        self.assertEqual(mock_assessment.call_count, 3)
+        self.assertIn('6 generated, 0 already stored, 0 failed', output)
+
+    def test_rerun_skips_stored_results(self, mock_plan, mock_assessment):
+        mock_plan.return_value = []
+        with patch.object(EducationalAIService, 'has_stored_term_plan', return_value=True):
+            output = self.run_command(term=3, skip_assessments=True)
+        self.assertIn('0 generated, 3 already stored', output)
+        mock_assessment.assert_not_called()
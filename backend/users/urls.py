@@ -16,8 +16,12 @@ urlpatterns = [
     path('portal/teacher/', teacher.teacher_dashboard, name='teacher_dashboard'),
     path('portal/teacher/generate-term-plan/', teacher.generate_term_plan, name='generate_term_plan'),
     path('portal/teacher/generate-assessment/', teacher.generate_assessment, name='generate_assessment'),
+    path('portal/teacher/stream-term-plan/', teacher.stream_term_plan, name='stream_term_plan'),
+    path('portal/teacher/stream-assessment/', teacher.stream_assessment, name='stream_assessment'),
     path('portal/teacher/analyze-student/', teacher.analyze_student, name='analyze_student'),
+    path('portal/teacher/analyze-class/', teacher.analyze_class, name='analyze_class'),
     path('portal/teacher/get-differentiated-activities/', teacher.get_differentiated_activities, name='get_differentiated_activities'),
+    path('portal/teacher/cancel-prefetch/', teacher.cancel_prefetch, name='cancel_prefetch'),
     path('portal/student/', views.student_dashboard, name='student_dashboard'),
     path('portal/parent/', views.parent_dashboard, name='parent_dashboard'),
     path('portal/admin/create-user/', views.admin_create_user, name='admin_create_user'),
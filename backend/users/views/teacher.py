@@ -1,17 +1,21 @@
 """Teacher dashboard with AI-powered planning tools."""
 
 from typing import Dict, Any, List
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render
-from django.http import JsonResponse, HttpRequest, HttpResponse
+from django.http import JsonResponse, HttpRequest, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 import json
 import logging
 
-from joyland.integrations.education import EducationalAIService
+from joyland.integrations.education import ACTIVITY_LEVELS, EducationalAIService
 from joyland.integrations.openai import OpenAIClient
+from joyland.integrations.streaming import sse_event
 from joyland.cache_utils import AIOperationCache
+from joyland.ratelimit import ai_rate_limit
 from ..models import User
+from ..tasks import cancel_followup_prefetch, schedule_followup_prefetch
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +37,7 @@ def teacher_dashboard(request: HttpRequest) -> HttpResponse:
 
 @user_passes_test(is_teacher)
 @require_http_methods(['POST'])
+@ai_rate_limit
 def generate_term_plan(request: HttpRequest) -> JsonResponse:
     """Generate a term plan using AI."""
     try:
@@ -58,7 +63,7 @@ def generate_term_plan(request: HttpRequest) -> JsonResponse:
             logger.debug(f"Returning cached term plan for {subject} {grade_level}")
             return JsonResponse({'objectives': cached, 'cached': True})
         
-        ai_service = EducationalAIService(OpenAIClient())
+        ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
         objectives = ai_service.generate_term_plan(
             subject=subject,
             grade_level=grade_level,
@@ -66,14 +71,10 @@ def generate_term_plan(request: HttpRequest) -> JsonResponse:
             existing_objectives=get_previous_objectives(request.user, subject, grade_level)
         )
         
-        result = [
-            {
-                'description': obj.description,
-                'skills': obj.skills,
-                'assessment_criteria': obj.assessment_criteria
-            }
-            for obj in objectives
-        ]
+        result = [objective_payload(obj) for obj in objectives]
+        if ai_service.used_offline_fallback:
+            # Template stand-in: don't cache it or prefetch from it
+            return JsonResponse({'objectives': result, 'cached': False, 'offline': True})
         
         # Cache the result
         AIOperationCache.cache_term_plan(
@@ -83,6 +84,8 @@ def generate_term_plan(request: HttpRequest) -> JsonResponse:
             term=term,
             plan_data=result
         )
+        # Warm the likely follow-up requests in the background
+        schedule_followup_prefetch(request.user, [obj['description'] for obj in result])
         
         return JsonResponse({
             'objectives': result,
@@ -98,6 +101,7 @@ def generate_term_plan(request: HttpRequest) -> JsonResponse:
 
 @user_passes_test(is_teacher)
 @require_http_methods(['POST'])
+@ai_rate_limit
 def generate_assessment(request: HttpRequest) -> JsonResponse:
     """Generate an assessment for a learning objective."""
     try:
@@ -123,22 +127,16 @@ def generate_assessment(request: HttpRequest) -> JsonResponse:
             logger.debug(f"Returning cached assessment for objective")
             return JsonResponse({'assessment_items': cached, 'cached': True})
         
-        ai_service = EducationalAIService(OpenAIClient())
+        ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
         items = ai_service.generate_assessment(
             objective=objective,
             assessment_type=assessment_type,
             student_level=student_level
         )
         
-        result = [
-            {
-                'question': item.question,
-                'rubric': item.rubric,
-                'sample_answer': item.sample_answer,
-                'max_score': item.max_score
-            }
-            for item in items
-        ]
+        result = [assessment_item_payload(item) for item in items]
+        if ai_service.used_offline_fallback:
+            return JsonResponse({'assessment_items': result, 'cached': False, 'offline': True})
         
         # Cache the result
         AIOperationCache.cache_assessment(
@@ -161,8 +159,162 @@ def generate_assessment(request: HttpRequest) -> JsonResponse:
         )
 
 
+def objective_payload(obj) -> Dict[str, Any]:
+    """Serialize a LearningObjective for the dashboard."""
+    return {
+        'description': obj.description,
+        'skills': obj.skills,
+        'assessment_criteria': obj.assessment_criteria
+    }
+
+
+def assessment_item_payload(item) -> Dict[str, Any]:
+    """Serialize an AssessmentItem for the dashboard."""
+    return {
+        'question': item.question,
+        'rubric': item.rubric,
+        'sample_answer': item.sample_answer,
+        'max_score': item.max_score
+    }
+
+
+def progress_payload(progress) -> Dict[str, Any]:
+    """Serialize a StudentProgress for the dashboard."""
+    return {
+        'student_id': progress.student_id,
+        'mastered': progress.objectives_mastered,
+        'growth_areas': progress.areas_for_growth,
+        'recommendations': progress.recommendations
+    }
+
+
+def sse_response(events) -> StreamingHttpResponse:
+    """Wrap an iterator of formatted events in an unbuffered SSE response."""
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx buffering the stream
+    return response
+
+
+@user_passes_test(is_teacher)
+@require_http_methods(['GET'])
+@ai_rate_limit
+def stream_term_plan(request: HttpRequest) -> HttpResponse:
+    """Stream a term plan as server-sent events.
+
+    Emits ``token`` events with raw text, an ``objective`` event as soon as
+    each objective is complete, and a final ``done`` event.
+    """
+    subject = request.GET.get('subject')
+    grade_level = request.GET.get('grade_level')
+    term = request.GET.get('term')
+
+    if not all([subject, grade_level, term]):
+        return JsonResponse({'error': 'Missing required fields'}, status=400)
+
+    teacher_id = request.user.id
+    existing = get_previous_objectives(request.user, subject, grade_level)
+
+    def events():
+        cached = AIOperationCache.get_cached_term_plan(
+            teacher_id=teacher_id, subject=subject, grade=grade_level, term=term
+        )
+        if cached:
+            for payload in cached:
+                yield sse_event('objective', payload)
+            yield sse_event('done', {'cached': True})
+            return
+
+        result = []
+        try:
+            ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
+            for kind, value in ai_service.stream_term_plan(
+                subject=subject, grade_level=grade_level, term=int(term),
+                existing_objectives=existing
+            ):
+                if kind == 'token':
+                    yield sse_event('token', {'text': value})
+                else:
+                    result.append(objective_payload(value))
+                    yield sse_event('objective', result[-1])
+        except Exception as e:
+            logger.error('Failed to stream term plan', exc_info=e)
+            yield sse_event('error', {'error': 'Failed to generate plan'})
+            return
+
+        if ai_service.used_offline_fallback:
+            yield sse_event('done', {'cached': False, 'offline': True})
+            return
+        if result:
+            AIOperationCache.cache_term_plan(
+                teacher_id=teacher_id, subject=subject, grade=grade_level,
+                term=term, plan_data=result
+            )
+            schedule_followup_prefetch(request.user, [obj['description'] for obj in result])
+        yield sse_event('done', {'cached': False})
+
+    return sse_response(events())
+
+
+@user_passes_test(is_teacher)
+@require_http_methods(['GET'])
+@ai_rate_limit
+def stream_assessment(request: HttpRequest) -> HttpResponse:
+    """Stream assessment items for an objective as server-sent events."""
+    objective = request.GET.get('objective')
+    assessment_type = request.GET.get('type', 'formative')
+    student_level = request.GET.get('level', 'standard')
+
+    if not objective:
+        return JsonResponse({'error': 'Missing learning objective'}, status=400)
+
+    teacher_id = request.user.id
+
+    def events():
+        cached = AIOperationCache.get_cached_assessment(
+            teacher_id=teacher_id, objective=objective,
+            assessment_type=assessment_type, level=student_level
+        )
+        if cached:
+            for payload in cached:
+                yield sse_event('item', payload)
+            yield sse_event('done', {'cached': True})
+            return
+
+        result = []
+        try:
+            ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
+            for kind, value in ai_service.stream_assessment(
+                objective=objective, assessment_type=assessment_type,
+                student_level=student_level
+            ):
+                if kind == 'token':
+                    yield sse_event('token', {'text': value})
+                else:
+                    result.append(assessment_item_payload(value))
+                    yield sse_event('item', result[-1])
+        except Exception as e:
+            logger.error('Failed to stream assessment', exc_info=e)
+            yield sse_event('error', {'error': 'Failed to generate assessment'})
+            return
+
+        if ai_service.used_offline_fallback:
+            yield sse_event('done', {'cached': False, 'offline': True})
+            return
+        if result:
+            AIOperationCache.cache_assessment(
+                teacher_id=teacher_id, objective=objective,
+                assessment_type=assessment_type, level=student_level,
+                assessment_data=result
+            )
+        yield sse_event('done', {'cached': False})
+
+    return sse_response(events())
+
+
 @user_passes_test(is_teacher)
 @require_http_methods(['POST'])
+@ai_rate_limit
 def analyze_student(request: HttpRequest) -> JsonResponse:
     """Analyze a student's progress using AI."""
     try:
@@ -179,7 +331,7 @@ def analyze_student(request: HttpRequest) -> JsonResponse:
         # Get student data from your actual database
         student_data = get_student_data(student_id, subject)
         
-        ai_service = EducationalAIService(OpenAIClient())
+        ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
         progress = ai_service.analyze_student_progress(
             student_data=student_data,
             subject_area=subject
@@ -198,8 +350,72 @@ def analyze_student(request: HttpRequest) -> JsonResponse:
         )
 
 
+def class_analysis_calls(request: HttpRequest) -> int:
+    # analyze_class runs up to this many student analyses at once
+    return getattr(settings, 'AI_CLASS_ANALYSIS_CONCURRENCY', 4)
+
+
+@user_passes_test(is_teacher)
+@require_http_methods(['POST'])
+@ai_rate_limit(upstream_calls=class_analysis_calls)
+def analyze_class(request: HttpRequest) -> HttpResponse:
+    """Analyze every student in a class, streamed as server-sent events.
+
+    Accepts a ``class_id`` or an explicit ``student_ids`` list. Emits a
+    ``student`` event as each analysis completes, then a ``summary`` event
+    with class-level aggregates and a final ``done`` event.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    subject = data.get('subject')
+    if 'student_ids' in data:
+        student_ids = data['student_ids']
+        if not isinstance(student_ids, list) or not all(
+            isinstance(student_id, (str, int)) and not isinstance(student_id, bool)
+            and str(student_id).strip()
+            for student_id in student_ids
+        ):
+            return JsonResponse({'error': 'student_ids must be a list of ids'}, status=400)
+    else:
+        student_ids = get_class_students(data['class_id']) if data.get('class_id') else []
+
+    if not subject or not student_ids:
+        return JsonResponse({'error': 'Missing required fields'}, status=400)
+    limit = getattr(settings, 'AI_CLASS_ANALYSIS_MAX_STUDENTS', 60)
+    if len(student_ids) > limit:
+        return JsonResponse({'error': f'At most {limit} students per request'}, status=400)
+
+    students_data = [
+        get_student_data(student_id, subject) for student_id in dict.fromkeys(student_ids)
+    ]
+    timeframe = data.get('timeframe', 'term')
+
+    def events():
+        results = []
+        try:
+            ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
+            for progress in ai_service.analyze_class_progress(
+                students_data, subject_area=subject, timeframe=timeframe
+            ):
+                results.append(progress)
+                yield sse_event('student', progress_payload(progress))
+        except Exception as e:
+            logger.error('Failed to analyze class progress', exc_info=e)
+            yield sse_event('error', {'error': 'Failed to analyze progress'})
+            return
+        yield sse_event('summary', ai_service.summarize_class_progress(results))
+        yield sse_event('done', {'students': len(results)})
+
+    return sse_response(events())
+
+
 @user_passes_test(is_teacher)
 @require_http_methods(['POST'])
+@ai_rate_limit
 def get_differentiated_activities(request: HttpRequest) -> JsonResponse:
     """Get differentiated activities for a learning objective."""
     try:
@@ -216,12 +432,26 @@ def get_differentiated_activities(request: HttpRequest) -> JsonResponse:
         # Get actual class profile from your database
         class_profile = get_class_profile(class_id)
         
-        ai_service = EducationalAIService(OpenAIClient())
-        activities = ai_service.generate_differentiated_activities(
-            objective=objective,
-            class_profile=class_profile
-        )
+        ai_service = EducationalAIService(OpenAIClient(), teacher_id=request.user.id)
+        level = data.get('level')
+        if level:
+            # Regenerate a single level without touching the others
+            if level not in ACTIVITY_LEVELS:
+                return JsonResponse({'error': 'Invalid level'}, status=400)
+            activities = {level: ai_service.generate_level_activities(
+                objective=objective,
+                level=level,
+                student_count=class_profile.get(level, 0),
+                refresh=bool(data.get('regenerate'))
+            )}
+        else:
+            activities = ai_service.generate_differentiated_activities(
+                objective=objective,
+                class_profile=class_profile
+            )
         
+        if ai_service.used_offline_fallback:
+            return JsonResponse({'activities': activities, 'offline': True})
         return JsonResponse({'activities': activities})
     except Exception as e:
         logger.error('Failed to generate activities', exc_info=e)
@@ -231,6 +461,13 @@ def get_differentiated_activities(request: HttpRequest) -> JsonResponse:
         )
 
 
+@user_passes_test(is_teacher)
+@require_http_methods(['POST'])
+def cancel_prefetch(request: HttpRequest) -> JsonResponse:
+    """Cancel the teacher's outstanding follow-up prefetch."""
+    return JsonResponse({'cancelled': cancel_followup_prefetch(request.user.id)})
+
+
 # Helper functions that would connect to your actual database
 def get_teacher_subjects(user: User) -> Dict[str, list]:
     """Get subjects taught by teacher."""
@@ -306,6 +543,12 @@ def get_student_data(
     }
 
 
+def get_class_students(class_id: str) -> List[str]:
+    """Get the ids of the students enrolled in a class."""
+    # This would query your class roster system
+    return [f"{class_id}-{number:02d}" for number in range(1, 29)]
+
+
 def get_class_profile(class_id: str) -> Dict[str, int]:
     """Get student level distribution for a class."""
     # This would query your class roster system